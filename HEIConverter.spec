@@ -1,5 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# Profils de construction :
+#   pyinstaller HEIConverter.spec               exécutable unique (onefile)
+#   pyinstaller HEIConverter.spec -- --onedir   dossier dist/HEIConverter (onedir)
+#
+# L'exécutable unique se déballe dans un dossier temporaire à chaque
+# lancement ; le profil onedir démarre directement, sans UPX (décompression
+# à chaque chargement) et avec le bytecode optimisé. Le démarrage se mesure
+# avec python -m heiconverter.bench --startup --gui <exécutable>.
+import argparse
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true")
+profile = parser.parse_args()
 
 a = Analysis(
     ['converter.py'],
@@ -10,30 +23,59 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Dépendances facultatives de Pillow inutiles ici
+    excludes=['numpy', 'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'IPython'],
     noarchive=False,
-    optimize=0,
+    optimize=1 if profile.onedir else 0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='HEIConverter',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon=['logo.ico'],
-)
+if profile.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='HEIConverter',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['logo.ico'],
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='HEIConverter',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='HEIConverter',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['logo.ico'],
+    )
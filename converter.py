@@ -1,16 +1,93 @@
+import time
+STARTED = time.perf_counter()  # avant les imports, pour la mesure du démarrage
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
 from tkinter import ttk
-from PIL import Image, ImageTk
-from pillow_heif import register_heif_opener
+import dataclasses
+import json
+import multiprocessing
 import os
-import shutil
+import queue
 import sys
-from ctypes import windll
-from pathlib import Path
+import tempfile
+
+# Pillow (ImageTk), le décodeur HEIF et ctypes ne sont importés qu'au premier
+# besoin : ces imports coûteraient aussi à chaque processus de travail de
+# l'exécutable PyInstaller, qui réexécute les imports de ce fichier.
+
+from heiconverter import ConversionJob, ConversionOptions
+from heiconverter.batch import SCHEDULER_FINAL_EVENTS, JobQueue, Scheduler
+from heiconverter.encoders import ENCODERS
+from heiconverter.engine import default_worker_count
+from heiconverter.failures import FAILED_NAME, FailedFiles
+from heiconverter.job import FINAL_EVENTS
+from heiconverter.logbook import LOG_NAME, LogBook
+from heiconverter.preview import PREVIEW_SIZE, ThumbnailCache
+from heiconverter.report import REPORT_NAME, STARTUP_REPORT_NAME
+
+# Formats de sortie et préréglages de vitesse d'encodage
+FORMAT_LABELS = {
+    "jpeg": "JPEG (.jpg)",
+    "webp": "WebP (.webp)",
+    "avif": "AVIF (.avif)",
+    "png": "PNG (.png)",
+    "heif": "HEIF d'origine (.heic)",
+}
+SPEED_LABELS = {
+    "fast": "Rapide",
+    "balanced": "Équilibré",
+    "small": "Fichiers plus petits",
+}
+
+# Libellés des modes de copie des fichiers non HEIC
+COPY_MODE_LABELS = {
+    "copy": "Copie classique",
+    "hardlink": "Lien physique (aucun espace disque)",
+    "reflink": "Clone copy-on-write",
+    "fast": "Copie rapide",
+    "skip": "Ne pas copier",
+}
+
+JOB_STATUS_LABELS = {
+    "pending": "⏳ en attente",
+    "running": "🔄 en cours",
+    "done": "✅ terminée",
+    "error": "❌ erreur",
+    "cancelled": "⏹ annulée",
+}
+
+DEDUP_LABELS = {
+    "off": "Convertir chaque fichier",
+    "hardlink": "Convertir une fois, puis lier",
+    "copy": "Convertir une fois, puis copier",
+    "list": "Signaler sans convertir",
+}
+
+# Images exportées de chaque fichier HEIC
+IMAGE_LABELS = {
+    "primary": "Image principale",
+    "all": "Toutes les images (rafales, Live)",
+    "aux": "Toutes, avec profondeur et auxiliaires",
+}
+
+# Tailles des images produites
+SIZE_CHOICES = {
+    "Taille originale": ("full",),
+    "Web (2048 px)": ("web",),
+    "Miniature (320 px)": ("thumbnail",),
+    "Originale + web + miniature": ("full", "web", "thumbnail"),
+}
 
-register_heif_opener()
+# Cadence de rafraîchissement de l'interface pendant une conversion
+UI_REFRESH_MS = 100
+MAX_EVENTS_PER_REFRESH = 2000
+
+# Bandeau d'aperçu : miniatures affichées et cadence maximale de rafraîchissement
+PREVIEW_COUNT = 8
+PREVIEW_REFRESH_MS = 500
+FILE_TIMEOUT_SECONDS = 300  # avec l'option, une image plus longue à convertir est abandonnée
 
 def get_resource_path(relative_path):
     """Obtient le chemin vers une ressource, que ce soit en mode dev ou exe"""
@@ -32,24 +109,28 @@ class ModernHEICConverter:
         self.create_variables()
         self.create_styles()
         self.create_widgets()
+        self.job = None
         
     def setup_window(self):
         """Configuration de la fenêtre principale avec un design moderne"""
 
-        try:
-            # Définit un ID unique pour l'application
-            myappid = 'benoitwattinne.heicconverter.version1.0'
-            windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
-        except:
-            pass
+        if sys.platform == 'win32':
+            from ctypes import windll
 
-        try:
-            windll.shcore.SetProcessDpiAwareness(1)
-        except:
-            pass
+            try:
+                # Définit un ID unique pour l'application
+                myappid = 'benoitwattinne.heicconverter.version1.0'
+                windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+            except:
+                pass
+
+            try:
+                windll.shcore.SetProcessDpiAwareness(1)
+            except:
+                pass
             
         self.root.title("HEIC Converter Pro")
-        self.root.geometry("900x700")
+        self.root.geometry("900x800")
         self.root.minsize(800, 600)
         
         # Couleurs modernes - thème sombre élégant
@@ -80,6 +161,34 @@ class ModernHEICConverter:
         self.output_folder = tk.StringVar()
         self.auto_folder_output = tk.BooleanVar(value=True)
         self.output_location = tk.StringVar(value="parent")  # "parent" ou "custom"
+        self.workers = tk.IntVar(value=default_worker_count())
+        self.output_format = tk.StringVar(value=FORMAT_LABELS["jpeg"])
+        self.quality = tk.IntVar(value=ENCODERS["jpeg"].default_quality)
+        self.speed = tk.StringVar(value=SPEED_LABELS["balanced"])
+        self.incremental = tk.BooleanVar(value=False)
+        self.plan_first = tk.BooleanVar(value=False)
+        self.show_preview = tk.BooleanVar(value=True)
+        # Désactivé par défaut : un délai impose le pool de processus, même avec un seul processus
+        self.limit_time = tk.BooleanVar(value=False)
+        self.thumbnails = ThumbnailCache()
+        self.preview_order = []  # sources des miniatures, dans l'ordre de conversion
+        self.preview_offset = 0  # 0 : suit les dernières images converties
+        self.preview_dirty = False
+        self.last_preview_render = 0.0
+        self.save_report = tk.BooleanVar(value=False)
+        self.errors_only = tk.BooleanVar(value=False)
+        self.logbook = LogBook()
+        self.deferred_log_path = None  # journal à écrire une fois la conversion lancée après son plan
+        self.copy_mode = tk.StringVar(value=COPY_MODE_LABELS["copy"])
+        self.dedup = tk.StringVar(value=DEDUP_LABELS["off"])
+        self.images = tk.StringVar(value=IMAGE_LABELS["primary"])
+        self.keep_metadata = tk.BooleanVar(value=True)
+        self.auto_orient = tk.BooleanVar(value=False)
+        self.sidecar = tk.BooleanVar(value=False)
+        self.queue_priority = tk.IntVar(value=0)
+        self.job_queue = JobQueue()
+        self.scheduler = None
+        self.output_size = tk.StringVar(value="Taille originale")
         
     def create_styles(self):
         """Configuration des styles modernes"""
@@ -145,8 +254,25 @@ class ModernHEICConverter:
         # Barre de progression
         self.create_progress_section(main_container)
         
+        # Aperçu, file d'attente et logs se partagent la hauteur restante :
+        # les séparateurs se déplacent à la souris, les logs prennent le surplus
+        panes = tk.PanedWindow(main_container,
+                               orient='vertical',
+                               bg=self.colors['bg_primary'],
+                               bd=0,
+                               sashwidth=8,
+                               sashrelief='flat',
+                               opaqueresize=True)
+        panes.pack(fill='both', expand=True)
+        
+        # Aperçu des images converties
+        panes.add(self.create_preview_section(panes), minsize=PREVIEW_SIZE + 50, stretch='never')
+        
+        # File d'attente
+        panes.add(self.create_queue_section(panes), minsize=60, stretch='never')
+        
         # Zone de logs
-        self.create_logs_section(main_container)
+        panes.add(self.create_logs_section(panes), minsize=120, stretch='always')
         
     def create_input_section(self, parent):
         """Section pour le dossier d'entrée"""
@@ -273,15 +399,239 @@ class ModernHEICConverter:
                                      relief='flat')
         options_frame.pack(fill='x', pady=(0, 20))
         
+        # Options repliées par défaut pour laisser la place aux logs
+        self.options_toggle = tk.Button(options_frame,
+                                        text="▸ Afficher les options",
+                                        font=('Segoe UI', 9),
+                                        bg=self.colors['bg_secondary'],
+                                        fg=self.colors['text_secondary'],
+                                        activebackground=self.colors['bg_tertiary'],
+                                        bd=0,
+                                        relief='flat',
+                                        cursor='hand2',
+                                        anchor='w',
+                                        command=self.toggle_options)
+        self.options_toggle.pack(fill='x', padx=15, pady=(10, 10))
+        
         options_content = tk.Frame(options_frame, bg=self.colors['bg_secondary'])
-        options_content.pack(fill='x', padx=15, pady=15)
+        self.options_content = options_content
+        
+        format_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        format_frame.pack(anchor='w')
+        
+        tk.Label(format_frame,
+                text="Format de sortie :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        format_box = ttk.Combobox(format_frame,
+                                 textvariable=self.output_format,
+                                 values=list(FORMAT_LABELS.values()),
+                                 state='readonly',
+                                 width=20,
+                                 font=('Segoe UI', 9))
+        format_box.pack(side='left', padx=(10, 0))
+        format_box.bind('<<ComboboxSelected>>', self.on_format_selected)
+        
+        tk.Label(format_frame,
+                text="Qualité :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left', padx=(15, 0))
+        
+        self.quality_spinbox = tk.Spinbox(format_frame,
+                                         from_=1,
+                                         to=100,
+                                         textvariable=self.quality,
+                                         width=4,
+                                         font=('Segoe UI', 9),
+                                         bg=self.colors['bg_tertiary'],
+                                         fg=self.colors['text_primary'],
+                                         bd=0,
+                                         relief='flat',
+                                         buttonbackground=self.colors['bg_tertiary'],
+                                         insertbackground=self.colors['text_primary'])
+        self.quality_spinbox.pack(side='left', padx=(10, 0))
         
-        # Placeholder pour futures options
-        tk.Label(options_content,
-                text="Qualité JPEG : Élevée | Format de sortie : .jpg",
+        tk.Label(format_frame,
+                text="Encodage :",
                 font=('Segoe UI', 9),
                 bg=self.colors['bg_secondary'],
-                fg=self.colors['text_muted']).pack(anchor='w')
+                fg=self.colors['text_secondary']).pack(side='left', padx=(15, 0))
+        
+        ttk.Combobox(format_frame,
+                    textvariable=self.speed,
+                    values=list(SPEED_LABELS.values()),
+                    state='readonly',
+                    width=18,
+                    font=('Segoe UI', 9)).pack(side='left', padx=(10, 0))
+        
+        workers_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        workers_frame.pack(anchor='w', pady=(8, 0))
+        
+        tk.Label(workers_frame,
+                text="Processus de conversion en parallèle :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        tk.Spinbox(workers_frame,
+                  from_=1,
+                  to=max(64, default_worker_count()),
+                  textvariable=self.workers,
+                  width=4,
+                  font=('Segoe UI', 9),
+                  bg=self.colors['bg_tertiary'],
+                  fg=self.colors['text_primary'],
+                  bd=0,
+                  relief='flat',
+                  buttonbackground=self.colors['bg_tertiary'],
+                  insertbackground=self.colors['text_primary']).pack(side='left', padx=(10, 0))
+        
+        size_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        size_frame.pack(anchor='w', pady=(8, 0))
+        
+        tk.Label(size_frame,
+                text="Taille des images :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        ttk.Combobox(size_frame,
+                    textvariable=self.output_size,
+                    values=list(SIZE_CHOICES),
+                    state='readonly',
+                    width=32,
+                    font=('Segoe UI', 9)).pack(side='left', padx=(10, 0))
+        
+        copy_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        copy_frame.pack(anchor='w', pady=(8, 0))
+        
+        tk.Label(copy_frame,
+                text="Fichiers non HEIC :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        ttk.Combobox(copy_frame,
+                    textvariable=self.copy_mode,
+                    values=list(COPY_MODE_LABELS.values()),
+                    state='readonly',
+                    width=32,
+                    font=('Segoe UI', 9)).pack(side='left', padx=(10, 0))
+        
+        dedup_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        dedup_frame.pack(anchor='w', pady=(8, 0))
+        
+        tk.Label(dedup_frame,
+                text="Images en double :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        ttk.Combobox(dedup_frame,
+                    textvariable=self.dedup,
+                    values=list(DEDUP_LABELS.values()),
+                    state='readonly',
+                    width=32,
+                    font=('Segoe UI', 9)).pack(side='left', padx=(10, 0))
+        
+        images_frame = tk.Frame(options_content, bg=self.colors['bg_secondary'])
+        images_frame.pack(anchor='w', pady=(8, 0))
+        
+        tk.Label(images_frame,
+                text="Images de chaque fichier :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left')
+        
+        ttk.Combobox(images_frame,
+                    textvariable=self.images,
+                    values=list(IMAGE_LABELS.values()),
+                    state='readonly',
+                    width=32,
+                    font=('Segoe UI', 9)).pack(side='left', padx=(10, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Conversion incrémentale : ignorer les fichiers déjà convertis",
+                      variable=self.incremental,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(8, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Conserver les métadonnées (EXIF, profil ICC, XMP)",
+                      variable=self.keep_metadata,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Redresser les images selon leur orientation EXIF",
+                      variable=self.auto_orient,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Exporter les métadonnées dans un fichier JSON à côté de chaque image",
+                      variable=self.sidecar,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Afficher un aperçu des images converties",
+                      variable=self.show_preview,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text=f"Abandonner une image bloquée plus de {FILE_TIMEOUT_SECONDS // 60} minutes",
+                      variable=self.limit_time,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text="Vérifier avant de convertir : noms en conflit, espace disque, durée estimée",
+                      variable=self.plan_first,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
+        
+        tk.Checkbutton(options_content,
+                      text=f"Enregistrer un rapport de durées ({REPORT_NAME}) dans le dossier de sortie",
+                      variable=self.save_report,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(anchor='w', pady=(4, 0))
         
     def create_conversion_button(self, parent):
         """Bouton de conversion principal"""
@@ -308,6 +658,56 @@ class ModernHEICConverter:
         self.convert_btn.bind("<Enter>", on_enter)
         self.convert_btn.bind("<Leave>", on_leave)
         
+        # Contrôles de la conversion en cours
+        controls_frame = tk.Frame(button_frame, bg=self.colors['bg_primary'])
+        controls_frame.pack()
+        
+        self.pause_btn = tk.Button(controls_frame,
+                                  text="⏸ Pause",
+                                  font=('Segoe UI', 10, 'bold'),
+                                  bg=self.colors['bg_tertiary'],
+                                  fg=self.colors['text_primary'],
+                                  bd=0,
+                                  relief='flat',
+                                  cursor='hand2',
+                                  state='disabled',
+                                  command=self.toggle_pause)
+        self.pause_btn.pack(side='left', padx=5, ipady=4, ipadx=15)
+        
+        self.cancel_btn = tk.Button(controls_frame,
+                                   text="⏹ Annuler",
+                                   font=('Segoe UI', 10, 'bold'),
+                                   bg=self.colors['bg_tertiary'],
+                                   fg=self.colors['text_primary'],
+                                   bd=0,
+                                   relief='flat',
+                                   cursor='hand2',
+                                   state='disabled',
+                                   command=self.cancel_conversion)
+        self.cancel_btn.pack(side='left', padx=5, ipady=4, ipadx=15)
+        
+        self.dry_run_btn = tk.Button(controls_frame,
+                                    text="🧭 Simulation",
+                                    font=('Segoe UI', 10, 'bold'),
+                                    bg=self.colors['bg_tertiary'],
+                                    fg=self.colors['text_primary'],
+                                    bd=0,
+                                    relief='flat',
+                                    cursor='hand2',
+                                    command=lambda: self.start_conversion(dry_run=True))
+        self.dry_run_btn.pack(side='left', padx=5, ipady=4, ipadx=15)
+        
+        self.retry_btn = tk.Button(controls_frame,
+                                  text="🔁 Relancer les échecs",
+                                  font=('Segoe UI', 10, 'bold'),
+                                  bg=self.colors['bg_tertiary'],
+                                  fg=self.colors['text_primary'],
+                                  bd=0,
+                                  relief='flat',
+                                  cursor='hand2',
+                                  command=lambda: self.start_conversion(retry_failed=True))
+        self.retry_btn.pack(side='left', padx=5, ipady=4, ipadx=15)
+        
     def create_progress_section(self, parent):
         """Section de progression"""
         progress_frame = tk.Frame(parent, bg=self.colors['bg_primary'])
@@ -332,6 +732,166 @@ class ModernHEICConverter:
                                    fg=self.colors['text_muted'])
         self.stats_label.pack(pady=(5, 0))
         
+    def create_preview_section(self, parent):
+        """Bandeau de miniatures des dernières images converties"""
+        preview_frame = tk.LabelFrame(parent,
+                                     text=" 🖼 Aperçu ",
+                                     font=('Segoe UI', 12, 'bold'),
+                                     bg=self.colors['bg_secondary'],
+                                     fg=self.colors['text_primary'],
+                                     bd=0,
+                                     relief='flat')
+        
+        strip = tk.Frame(preview_frame, bg=self.colors['bg_secondary'])
+        strip.pack(padx=15, pady=10)
+        
+        for text, step in (("◀", PREVIEW_COUNT), ("▶", -PREVIEW_COUNT)):
+            tk.Button(strip,
+                     text=text,
+                     font=('Segoe UI', 9),
+                     bg=self.colors['bg_tertiary'],
+                     fg=self.colors['text_primary'],
+                     bd=0,
+                     relief='flat',
+                     cursor='hand2',
+                     command=lambda step=step: self.scroll_preview(step)).pack(
+                         side='left' if step > 0 else 'right', fill='y', padx=5, ipadx=4)
+        
+        self.preview_labels = []
+        for _ in range(PREVIEW_COUNT):
+            label = tk.Label(strip,
+                            width=PREVIEW_SIZE,
+                            height=PREVIEW_SIZE + 16,
+                            compound='top',
+                            font=('Segoe UI', 7),
+                            bg=self.colors['bg_tertiary'],
+                            fg=self.colors['text_muted'],
+                            image=self.blank_preview())
+            label.pack(side='left', padx=2)
+            self.preview_labels.append(label)
+        
+        return preview_frame
+        
+    def blank_preview(self):
+        """Image vide qui donne aux cases de l'aperçu leur taille en pixels"""
+        if not hasattr(self, '_blank_preview'):
+            self._blank_preview = tk.PhotoImage(width=1, height=1)
+        return self._blank_preview
+    
+    def scroll_preview(self, step):
+        """Remonte dans les miniatures déjà converties, ou revient aux dernières"""
+        self.preview_offset = max(0, min(self.preview_offset + step,
+                                         len(self.preview_order) - PREVIEW_COUNT))
+        self.render_preview()
+    
+    def add_preview(self, result):
+        """Garde la miniature d'une image convertie ; l'affichage suit à cadence réduite"""
+        self.thumbnails.put(result.task.source, result.preview)
+        self.preview_order.append(result.task.source)
+        if len(self.preview_order) > 2 * len(self.thumbnails) + PREVIEW_COUNT:
+            # Sources dont la miniature a quitté le cache
+            self.preview_order = [source for source in self.preview_order if source in self.thumbnails]
+        if self.preview_offset:
+            self.preview_offset += 1  # la page consultée reste affichée
+        self.preview_dirty = True
+    
+    def render_preview_if_due(self, force=False):
+        """Réaffiche l'aperçu au plus une fois par PREVIEW_REFRESH_MS ; indique s'il l'a fait"""
+        if not self.preview_dirty:
+            return False
+        if not force and (time.monotonic() - self.last_preview_render) * 1000 < PREVIEW_REFRESH_MS:
+            return False
+        self.render_preview()
+        return True
+    
+    def render_preview(self):
+        """Affiche une page de miniatures ; les images Tk sont créées une seule fois"""
+        end = len(self.preview_order) - self.preview_offset
+        sources = [source for source in self.preview_order[:end]
+                   if source in self.thumbnails][-PREVIEW_COUNT:]
+        for index, label in enumerate(self.preview_labels):
+            if index >= len(sources):
+                label.configure(image=self.blank_preview(), text="")
+                continue
+            thumbnail = self.thumbnails.get(sources[index])
+            if thumbnail.photo is None:
+                from PIL import ImageTk
+                thumbnail.photo = ImageTk.PhotoImage(thumbnail.to_image())
+            name = os.path.basename(sources[index])
+            label.configure(image=thumbnail.photo, text=name if len(name) <= 16 else name[:15] + "…")
+        self.preview_dirty = False
+        self.last_preview_render = time.monotonic()
+    
+    def clear_preview(self):
+        self.thumbnails.clear()
+        self.preview_order = []
+        self.preview_offset = 0
+        self.render_preview()
+    
+    def create_queue_section(self, parent):
+        """Section de la file d'attente de conversions"""
+        queue_frame = tk.LabelFrame(parent,
+                                   text=" 📦 File d'attente ",
+                                   font=('Segoe UI', 12, 'bold'),
+                                   bg=self.colors['bg_secondary'],
+                                   fg=self.colors['text_primary'],
+                                   bd=0,
+                                   relief='flat')
+        
+        self.queue_listbox = tk.Listbox(queue_frame,
+                                       height=4,
+                                       font=('Consolas', 9),
+                                       bg=self.colors['bg_tertiary'],
+                                       fg=self.colors['text_primary'],
+                                       selectbackground=self.colors['accent'],
+                                       bd=0,
+                                       relief='flat',
+                                       highlightthickness=0)
+        self.queue_listbox.pack(fill='x', padx=15, pady=(10, 5))
+        
+        queue_controls = tk.Frame(queue_frame, bg=self.colors['bg_secondary'])
+        queue_controls.pack(fill='x', padx=15, pady=(0, 10))
+        
+        for text, command in (("➕ Ajouter les dossiers actuels", self.add_to_queue),
+                              ("🗑 Retirer", self.remove_from_queue),
+                              ("🧹 Retirer les terminées", self.clear_finished_jobs)):
+            tk.Button(queue_controls,
+                     text=text,
+                     font=('Segoe UI', 9),
+                     bg=self.colors['bg_tertiary'],
+                     fg=self.colors['text_primary'],
+                     bd=0,
+                     relief='flat',
+                     cursor='hand2',
+                     command=command).pack(side='left', padx=(0, 5), ipady=2, ipadx=8)
+        
+        tk.Label(queue_controls,
+                text="Priorité :",
+                font=('Segoe UI', 9),
+                bg=self.colors['bg_secondary'],
+                fg=self.colors['text_secondary']).pack(side='left', padx=(10, 0))
+        
+        tk.Spinbox(queue_controls,
+                  from_=-9,
+                  to=9,
+                  textvariable=self.queue_priority,
+                  width=3,
+                  font=('Segoe UI', 9)).pack(side='left', padx=(5, 0))
+        
+        self.queue_btn = tk.Button(queue_controls,
+                                  text="▶ Lancer la file",
+                                  font=('Segoe UI', 9, 'bold'),
+                                  bg=self.colors['accent'],
+                                  fg=self.colors['text_primary'],
+                                  bd=0,
+                                  relief='flat',
+                                  cursor='hand2',
+                                  command=self.toggle_queue)
+        self.queue_btn.pack(side='right', ipady=2, ipadx=8)
+        
+        self.refresh_queue_view()
+        return queue_frame
+        
     def create_logs_section(self, parent):
         """Section des logs"""
         logs_frame = tk.LabelFrame(parent,
@@ -341,11 +901,32 @@ class ModernHEICConverter:
                                   fg=self.colors['text_primary'],
                                   bd=0,
                                   relief='flat')
-        logs_frame.pack(fill='both', expand=True)
+        
+        # Filtre et compteurs par catégorie
+        filter_frame = tk.Frame(logs_frame, bg=self.colors['bg_secondary'])
+        filter_frame.pack(fill='x', padx=15, pady=(10, 0))
+        
+        tk.Checkbutton(filter_frame,
+                      text="Erreurs seulement",
+                      variable=self.errors_only,
+                      command=self.refresh_log_view,
+                      font=('Segoe UI', 9),
+                      bg=self.colors['bg_secondary'],
+                      fg=self.colors['text_secondary'],
+                      selectcolor=self.colors['bg_tertiary'],
+                      activebackground=self.colors['bg_secondary'],
+                      activeforeground=self.colors['text_secondary']).pack(side='left')
+        
+        self.log_counts_label = tk.Label(filter_frame,
+                                        text="",
+                                        font=('Segoe UI', 9),
+                                        bg=self.colors['bg_secondary'],
+                                        fg=self.colors['text_muted'])
+        self.log_counts_label.pack(side='right')
         
         # Zone de texte avec scrollbar
         text_frame = tk.Frame(logs_frame, bg=self.colors['bg_secondary'])
-        text_frame.pack(fill='both', expand=True, padx=15, pady=15)
+        text_frame.pack(fill='both', expand=True, padx=15, pady=(5, 15))
         
         self.output_text = ScrolledText(text_frame,
                                        wrap='word',
@@ -364,7 +945,29 @@ class ModernHEICConverter:
         self.output_text.tag_config('copy', foreground='#0078d4', font=('Consolas', 9))
         self.output_text.tag_config('error', foreground='#d83b01', font=('Consolas', 9, 'bold'))
         self.output_text.tag_config('success', foreground='#16c60c', font=('Consolas', 9, 'bold'))
+        return logs_frame
+        
+    def toggle_options(self):
+        """Affiche ou replie le détail des options"""
+        if self.options_content.winfo_manager():
+            self.options_content.pack_forget()
+            self.options_toggle.configure(text="▸ Afficher les options")
+        else:
+            self.options_content.pack(fill='x', padx=15, pady=(0, 15))
+            self.options_toggle.configure(text="▾ Masquer les options")
         
+    def on_format_selected(self, event=None):
+        """Reprend la qualité par défaut du format choisi"""
+        output_format = self.selected_key(FORMAT_LABELS, self.output_format)
+        self.quality.set(ENCODERS[output_format].default_quality)
+        # PNG est sans perte : la qualité ne s'applique pas
+        self.quality_spinbox.configure(state='disabled' if output_format == "png" else 'normal')
+    
+    @staticmethod
+    def selected_key(labels, variable):
+        """Clé correspondant au libellé sélectionné dans une liste déroulante"""
+        return next(key for key, label in labels.items() if label == variable.get())
+    
     def toggle_output_options(self):
         """Active/désactive les options de sortie selon le nommage automatique"""
         if self.auto_folder_output.get():
@@ -388,173 +991,495 @@ class ModernHEICConverter:
         if folder_path:
             self.output_folder.set(folder_path)
     
-    def generate_output_folder_name(self, input_path):
-        """Génère un nom intelligent pour le dossier de sortie"""
-        input_path = Path(input_path)
-        base_name = input_path.name
-        
-        if self.output_location.get() == "parent":
-            parent_dir = input_path.parent
-        else:
-            parent_dir = input_path
-        
-        # Noms possibles pour le dossier de sortie
-        possible_names = [
-            f"{base_name}_converted",
-            f"{base_name}_JPEG",
-            f"Converted_{base_name}",
-            f"JPEG_{base_name}"
-        ]
-        
-        # Trouve un nom disponible
-        for name in possible_names:
-            output_path = parent_dir / name
-            if not output_path.exists():
-                return str(output_path)
-        
-        # Si tous les noms sont pris, ajoute un numéro
-        counter = 1
-        while True:
-            output_path = parent_dir / f"{base_name}_converted_{counter}"
-            if not output_path.exists():
-                return str(output_path)
-            counter += 1
-    
-    def count_files(self, input_folder):
-        """Compte le nombre total de fichiers"""
-        count = 0
-        for root, dirs, files in os.walk(input_folder):
-            count += len(files)
-        return count
-    
     def log_message(self, message, tag=''):
         """Ajoute un message au journal"""
-        self.output_text.insert(tk.END, message + '\n', tag)
+        self.log_lines([(message, tag)])
+    
+    def log_lines(self, lines):
+        """Ajoute plusieurs messages au journal en une seule insertion
+        
+        Le journal complet est écrit dans un fichier ; la zone de texte ne
+        garde que les dernières lignes, pour que son coût reste constant
+        quelle que soit la taille de la conversion.
+        """
+        self.logbook.add(lines)
+        if self.errors_only.get():
+            lines = [(message, tag) for message, tag in lines if tag == 'error']
+        if lines:
+            self.insert_log_lines(lines)
+        self.update_log_counts()
+    
+    def insert_log_lines(self, lines):
+        """Insère des lignes dans la zone de texte en supprimant les plus anciennes"""
+        chunks = []
+        for message, tag in lines:
+            chunks.extend((message + '\n', tag))
+        self.output_text.insert(tk.END, *chunks)
+        limit = self.logbook.errors.maxlen if self.errors_only.get() else self.logbook.recent.maxlen
+        line_count = int(self.output_text.index('end-1c').split('.')[0]) - 1
+        excess = line_count - limit
+        if excess > 0:
+            self.output_text.delete('1.0', f'{excess + 1}.0')
         self.output_text.see(tk.END)
-        self.root.update_idletasks()
     
-    def start_conversion(self):
-        """Démarre le processus de conversion"""
-        input_path = self.input_folder.get().strip()
+    def refresh_log_view(self):
+        """Réaffiche le journal, filtré ou non, à partir des lignes conservées"""
+        self.output_text.delete(1.0, tk.END)
+        lines = self.logbook.lines(errors_only=self.errors_only.get())
+        if lines:
+            self.insert_log_lines(lines)
+    
+    def update_log_counts(self):
+        """Compteurs par catégorie affichés au-dessus du journal"""
+        counts = self.logbook.counts
+        self.log_counts_label.configure(
+            text=f"📂 {counts.get('folder', 0)} • ✅ {counts.get('convert', 0)} • "
+                 f"📋 {counts.get('copy', 0)} • ❌ {counts.get('error', 0)}")
+    
+    def build_options(self):
+        """Options de conversion correspondant à l'interface"""
+        try:
+            workers = self.workers.get()
+        except tk.TclError:
+            workers = default_worker_count()
         
-        if not input_path:
-            messagebox.showerror("Erreur", "Veuillez sélectionner un dossier d'entrée.")
-            return
+        output_format = self.selected_key(FORMAT_LABELS, self.output_format)
+        try:
+            quality = self.quality.get()
+        except tk.TclError:
+            quality = None
         
-        if not os.path.exists(input_path):
-            messagebox.showerror("Erreur", "Le dossier d'entrée n'existe pas.")
+        options = ConversionOptions(
+            input_folder=self.input_folder.get(),
+            output_folder=None if self.auto_folder_output.get() else self.output_folder.get(),
+            output_location=self.output_location.get(),
+            workers=workers,
+            incremental=self.incremental.get(),
+            sizes=SIZE_CHOICES[self.output_size.get()],
+            output_format=output_format,
+            quality=None if output_format == "png" else quality,
+            speed=self.selected_key(SPEED_LABELS, self.speed),
+            copy_mode=self.selected_key(COPY_MODE_LABELS, self.copy_mode),
+            dedup=self.selected_key(DEDUP_LABELS, self.dedup),
+            plan=self.plan_first.get(),
+            preview_size=PREVIEW_SIZE if self.show_preview.get() else None,
+            images=self.selected_key(IMAGE_LABELS, self.images),
+            keep_metadata=self.keep_metadata.get(),
+            auto_orient=self.auto_orient.get(),
+            sidecar=self.sidecar.get(),
+            timeout=FILE_TIMEOUT_SECONDS if self.limit_time.get() else None)
+        return options
+    
+    def start_conversion(self, dry_run=False, retry_failed=False):
+        """Démarre le processus de conversion, seulement son plan en simulation, ou les fichiers en échec"""
+        try:
+            options = self.build_options()
+            options.dry_run = dry_run
+            options.retry_failed = retry_failed
+            job = ConversionJob(options)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
             return
-        
-        # Détermine le dossier de sortie
-        if self.auto_folder_output.get():
-            output_path = self.generate_output_folder_name(input_path)
-        else:
-            output_path = self.output_folder.get().strip()
-            if not output_path:
-                messagebox.showerror("Erreur", "Veuillez sélectionner un dossier de sortie.")
-                return
-        
-        if input_path == output_path:
-            messagebox.showerror("Erreur", "Le dossier d'entrée et de sortie ne peuvent pas être identiques.")
+        if retry_failed and not len(FailedFiles.load(job.output_folder, job.input_folder)):
+            messagebox.showinfo("Relancer les échecs", "Aucun fichier en échec pour ce dossier de sortie.")
             return
         
         # Lance la conversion
-        self.convert_heic_to_jpg(input_path, output_path)
+        self.convert_heic_to_jpg(job)
     
-    def convert_heic_to_jpg(self, input_folder, output_folder):
-        """Fonction principale de conversion"""
+    def convert_heic_to_jpg(self, job):
+        """Lance la conversion en arrière-plan"""
         # Réinitialise l'interface
+        # Une simulation n'écrit rien, pas même le journal ; avec un plan, le
+        # journal n'est écrit qu'une fois la conversion effectivement lancée
+        log_path = os.path.join(job.output_folder, LOG_NAME)
+        deferred = job.options.plan or job.options.dry_run
+        self.logbook.clear(None if deferred else log_path)
+        self.deferred_log_path = log_path if deferred and not job.options.dry_run else None
         self.output_text.delete(1.0, tk.END)
+        self.update_log_counts()
+        self.clear_preview()
         self.progress_bar['value'] = 0
-        self.convert_btn.configure(state='disabled', text="Conversion en cours...")
+        self.stats_label.configure(text="")
+        if job.options.dry_run:
+            self.convert_btn.configure(state='disabled', text="Simulation en cours...")
+        else:
+            self.convert_btn.configure(state='disabled', text="Conversion en cours...")
+        self.dry_run_btn.configure(state='disabled')
+        self.retry_btn.configure(state='disabled')
+        self.pause_btn.configure(state='normal', text="⏸ Pause")
+        self.cancel_btn.configure(state='normal')
         
-        try:
-            # Compte les fichiers
-            total_files = self.count_files(input_folder)
-            if total_files == 0:
-                self.log_message("❌ Aucun fichier trouvé dans le dossier d'entrée.", 'error')
-                return
-            
-            self.log_message(f"📊 {total_files} fichiers détectés pour traitement.", 'folder')
-            
-            # Crée le dossier de sortie
-            if not os.path.exists(output_folder):
-                os.makedirs(output_folder)
-                self.log_message(f"📁 Dossier de sortie créé : {os.path.basename(output_folder)}", 'folder')
-            
-            processed_files = 0
-            converted_count = 0
-            copied_count = 0
-            
-            # Parcours des fichiers
-            for root, dirs, files in os.walk(input_folder):
-                if not files:
-                    continue
-                
-                relative_path = os.path.relpath(root, input_folder)
-                output_subfolder = os.path.join(output_folder, relative_path)
-                
-                if relative_path != '.':
-                    self.log_message(f"📂 Traitement du dossier : {relative_path}", 'folder')
-                
-                if not os.path.exists(output_subfolder):
-                    os.makedirs(output_subfolder)
-                
-                for filename in files:
-                    processed_files += 1
-                    progress = (processed_files / total_files) * 100
-                    self.progress_bar['value'] = progress
-                    self.progress_label.configure(text=f"Progression : {progress:.1f}% ({processed_files}/{total_files})")
-                    
-                    filepath = os.path.join(root, filename)
-                    
-                    if filename.lower().endswith(('.heic', '.heif')):
-                        # Conversion HEIC vers JPEG
-                        try:
-                            output_filepath = os.path.join(output_subfolder, 
-                                                         os.path.splitext(filename)[0] + ".jpg")
-                            img = Image.open(filepath)
-                            img.save(output_filepath, "JPEG", quality=95)
-                            self.log_message(f"✅ Converti : {filename}", 'convert')
-                            converted_count += 1
-                        except Exception as e:
-                            self.log_message(f"❌ Erreur conversion {filename}: {str(e)}", 'error')
-                    else:
-                        # Copie des autres fichiers
-                        try:
-                            shutil.copy2(filepath, output_subfolder)
-                            self.log_message(f"📋 Copié : {filename}", 'copy')
-                            copied_count += 1
-                        except Exception as e:
-                            self.log_message(f"❌ Erreur copie {filename}: {str(e)}", 'error')
-            
-            # Finalisation
-            self.progress_bar['value'] = 100
-            self.progress_label.configure(text="✅ Conversion terminée !")
-            self.stats_label.configure(text=f"{converted_count} images converties • {copied_count} fichiers copiés")
-            
-            self.log_message("", '')
-            self.log_message("🎉 CONVERSION TERMINÉE AVEC SUCCÈS !", 'success')
-            self.log_message(f"📊 Résumé : {converted_count} conversions, {copied_count} copies", 'success')
-            self.log_message(f"📁 Résultats disponibles dans : {output_folder}", 'success')
+        self.current_folder = None
+        self.job = job
+        self.job.start()
+        self.root.after(UI_REFRESH_MS, self.poll_job)
+    
+    def toggle_pause(self):
+        """Met en pause ou reprend la conversion en cours"""
+        if self.job is None:
+            return
+        if self.job.paused:
+            self.job.resume()
+            self.pause_btn.configure(text="⏸ Pause")
+        else:
+            self.job.pause()
+            self.pause_btn.configure(text="▶ Reprendre")
+            self.progress_label.configure(text="⏸ Conversion en pause")
+    
+    def cancel_conversion(self):
+        """Demande l'annulation de la conversion en cours"""
+        if self.job is None:
+            return
+        self.job.cancel()
+        self.pause_btn.configure(state='disabled')
+        self.cancel_btn.configure(state='disabled')
+        self.progress_label.configure(text="Annulation en cours...")
+    
+    def poll_job(self):
+        """Vide la file d'événements de la conversion à cadence fixe
+
+        Les messages reçus depuis le dernier passage sont insérés en un seul
+        bloc et la progression n'est redessinée qu'une fois, quel que soit le
+        nombre de fichiers traités entre deux rafraîchissements.
+        """
+        lines = []
+        progress = None
+        final_event = None
+        
+        for _ in range(MAX_EVENTS_PER_REFRESH):
+            try:
+                event = self.job.events.get_nowait()
+            except queue.Empty:
+                break
             
-            # Ouvre le dossier de sortie
+            if event.kind == "result":
+                progress = (event.data['processed'], event.data['total'], event.data['total_known'])
+                lines.extend(self.describe_result(event.data['result']))
+                if event.data['result'].preview is not None:
+                    self.add_preview(event.data['result'])
+            elif event.kind == "start":
+                if self.deferred_log_path is not None:
+                    self.logbook.attach(self.deferred_log_path)
+                    self.deferred_log_path = None
+                if event.data['total']:
+                    lines.append((f"🔎 Parcours du dossier (environ {event.data['total']} fichiers lors de la dernière conversion)...", 'folder'))
+                else:
+                    lines.append(("🔎 Parcours du dossier, la conversion démarre au fil des fichiers trouvés...", 'folder'))
+            elif event.kind == "scanned":
+                lines.append((f"📊 {event.data['total']} fichiers détectés pour traitement.", 'folder'))
+            elif event.kind == "plan":
+                lines.extend(self.describe_plan(event.data['plan'], event.data['text']))
+            elif event.kind == "collision":
+                lines.append((f"⚠ Nom déjà pris : {os.path.basename(event.data['source'])} → "
+                              f"{os.path.basename(event.data['destination'])}", 'folder'))
+            elif event.kind == "output_created":
+                lines.append((f"📁 Dossier de sortie créé : {os.path.basename(event.data['path'])}", 'folder'))
+            elif event.kind in FINAL_EVENTS:
+                final_event = event
+                break
+        
+        if lines:
+            start = time.perf_counter()
+            self.log_lines(lines)
+            self.job.report.add_stage('display', time.perf_counter() - start, count=len(lines))
+        
+        start = time.perf_counter()
+        if self.render_preview_if_due(force=final_event is not None):
+            self.job.report.add_stage('display', time.perf_counter() - start, count=0)
+        
+        if progress is not None:
+            processed_files, total_files, total_known = progress
+            percent = (processed_files / total_files) * 100
+            self.progress_bar['value'] = percent
+            if not self.job.paused:
+                # Le total peut encore augmenter tant que le parcours n'est pas terminé
+                suffix = "" if total_known else "+"
+                self.progress_label.configure(text=f"Progression : {percent:.1f}% ({processed_files}/{total_files}{suffix})")
+        
+        if final_event is None:
+            self.root.after(UI_REFRESH_MS, self.poll_job)
+        else:
+            self.finish_conversion(final_event)
+            self.logbook.close()
+    
+    def describe_plan(self, plan, text):
+        """Messages du journal résumant le plan d'une conversion"""
+        lines = [(f"🧭 Plan : {text}", 'folder')]
+        if plan['nested_output']:
+            lines.append(("📁 Le dossier de sortie est dans le dossier d'entrée : il est exclu du parcours", 'folder'))
+        if plan['collision_count']:
+            lines.append((f"⚠ {plan['collision_count']} fichiers renommés pour ne pas "
+                          f"remplacer un autre fichier (IMG_1.jpg → IMG_1_jpg.jpg)", 'folder'))
+        for problem in plan['problems']:
+            lines.append((f"❌ {problem}", 'error'))
+        return lines
+    
+    def describe_result(self, result):
+        """Messages du journal correspondant au traitement d'un fichier"""
+        lines = []
+        if result.task.action == "skip":
+            return lines
+        
+        relative_path = os.path.relpath(os.path.dirname(result.task.source), self.job.input_folder)
+        if relative_path != self.current_folder:
+            self.current_folder = relative_path
+            if relative_path != '.':
+                lines.append((f"📂 Traitement du dossier : {relative_path}", 'folder'))
+        
+        filename = os.path.basename(result.task.source)
+        if result.task.action == "duplicate":
+            original = os.path.relpath(result.task.duplicate_of.source, self.job.input_folder)
+            if not result.ok:
+                lines.append((f"❌ Erreur doublon {filename}: {result.error}", 'error'))
+            elif result.method == "skip":
+                lines.append((f"♻ Doublon ignoré : {filename} (identique à {original})", 'copy'))
+            else:
+                lines.append((f"♻ Doublon : {filename} (identique à {original})", 'copy'))
+        elif result.task.action == "reject":
+            lines.append((f"⛔ Rejeté : {filename} ({result.error})", 'error'))
+        elif result.task.action == "convert":
+            if result.ok:
+                lines.append((f"✅ Converti : {filename}", 'convert'))
+            else:
+                lines.append((f"❌ Erreur conversion {filename}: {result.error}", 'error'))
+        else:
+            if result.ok:
+                if result.method == "hardlink":
+                    lines.append((f"🔗 Lié : {filename}", 'copy'))
+                elif result.method == "skip":
+                    lines.append((f"⏭ Non copié : {filename}", 'copy'))
+                else:
+                    lines.append((f"📋 Copié : {filename}", 'copy'))
+            else:
+                lines.append((f"❌ Erreur copie {filename}: {result.error}", 'error'))
+        return lines
+    
+    def finish_conversion(self, event):
+        """Finalise l'interface à la fin de la conversion"""
+        job = self.job
+        output_folder = job.output_folder
+        self.job = None
+        self.convert_btn.configure(state='normal', text="🚀 Démarrer la conversion")
+        self.dry_run_btn.configure(state='normal')
+        self.retry_btn.configure(state='normal')
+        self.pause_btn.configure(state='disabled', text="⏸ Pause")
+        self.cancel_btn.configure(state='disabled')
+        
+        if event.kind == "planned":
+            self.progress_label.configure(text="🧭 Simulation terminée, rien n'a été converti")
+            self.stats_label.configure(text=event.data['text'])
+            self.log_lines(self.describe_plan(event.data['plan'], event.data['text']))
+            return
+        
+        if event.kind == "empty":
+            self.progress_label.configure(text="Prêt à convertir")
+            self.log_message("❌ Aucun fichier trouvé dans le dossier d'entrée.", 'error')
+            return
+        
+        if event.kind == "error":
+            self.progress_label.configure(text="❌ Conversion interrompue")
+            self.log_message(f"❌ Erreur critique : {event.data['message']}", 'error')
+            messagebox.showerror("Erreur", f"Une erreur est survenue : {event.data['message']}")
+            return
+        
+        converted_count = event.data['converted']
+        copied_count = event.data['copied']
+        stats = f"{converted_count} images converties • {copied_count} fichiers copiés"
+        if event.data['duplicates']:
+            stats += f" • {event.data['duplicates']} doublons"
+        if event.data['skipped']:
+            stats += f" • {event.data['skipped']} déjà à jour"
+        if event.data['rejected']:
+            stats += f" • {event.data['rejected']} rejetés"
+        self.stats_label.configure(text=f"{stats}\n{job.report.format_summary()}")
+        if event.data['failed_files']:
+            self.log_message(f"🩹 {event.data['failed_files']} fichiers en échec listés dans {FAILED_NAME} : "
+                             f"« Relancer les échecs » ne traitera qu'eux", 'error')
+        
+        if self.save_report.get():
+            report_path = os.path.join(output_folder, REPORT_NAME)
             try:
-                os.startfile(output_folder)
-            except:
-                pass
-                
-        except Exception as e:
-            self.log_message(f"❌ Erreur critique : {str(e)}", 'error')
-            messagebox.showerror("Erreur", f"Une erreur est survenue : {str(e)}")
+                job.report.write(report_path)
+                self.log_message(f"⏱ Rapport de durées enregistré : {REPORT_NAME}", 'folder')
+            except OSError as e:
+                self.log_message(f"❌ Erreur d'écriture du rapport : {e}", 'error')
         
-        finally:
-            self.convert_btn.configure(state='normal', text="🚀 Démarrer la conversion")
+        if event.kind == "cancelled":
+            self.progress_label.configure(text="⏹ Conversion annulée")
+            self.log_lines([("", ''),
+                            ("⏹ CONVERSION ANNULÉE", 'error'),
+                            (f"📊 Résumé : {converted_count} conversions, {copied_count} copies", 'folder')])
+            return
+        
+        self.progress_bar['value'] = 100
+        self.progress_label.configure(text="✅ Conversion terminée !")
+        self.log_lines([("", ''),
+                        ("🎉 CONVERSION TERMINÉE AVEC SUCCÈS !", 'success'),
+                        (f"📊 Résumé : {converted_count} conversions, {copied_count} copies", 'success'),
+                        (f"📁 Résultats disponibles dans : {output_folder}", 'success')])
+        
+        # Ouvre le dossier de sortie
+        try:
+            os.startfile(output_folder)
+        except:
+            pass
+    
+    def refresh_queue_view(self):
+        """Réaffiche les conversions de la file"""
+        selection = self.queue_listbox.curselection()
+        self.queue_listbox.delete(0, tk.END)
+        for job in self.job_queue.jobs:
+            progress = f" {job.processed}/{job.total}" if job.status == "running" and job.total else ""
+            output = os.path.basename(job.options.output_folder) if job.options.output_folder else "auto"
+            self.queue_listbox.insert(
+                tk.END,
+                f"#{job.id} {JOB_STATUS_LABELS[job.status]}{progress} • "
+                f"{os.path.basename(os.path.normpath(job.options.input_folder))} → {output}"
+                + (f" • priorité {job.priority}" if job.priority else ""))
+        for index in selection:
+            self.queue_listbox.selection_set(index)
+    
+    def selected_queue_job(self):
+        """Conversion sélectionnée dans la file, ou None"""
+        selection = self.queue_listbox.curselection()
+        if not selection or selection[0] >= len(self.job_queue.jobs):
+            return None
+        return self.job_queue.jobs[selection[0]]
+    
+    def add_to_queue(self):
+        """Ajoute les dossiers et options actuels à la file"""
+        try:
+            priority = self.queue_priority.get()
+        except tk.TclError:
+            priority = 0
+        try:
+            # Conversion en arrière-plan : ses miniatures ne seraient affichées nulle part
+            options = dataclasses.replace(self.build_options(), preview_size=None)
+            job = self.job_queue.add(options, priority)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+        self.log_message(f"📦 Ajouté à la file : #{job.id} {job.options.input_folder}", 'folder')
+        self.refresh_queue_view()
+        if self.scheduler is not None:
+            self.scheduler.wake()
+    
+    def remove_from_queue(self):
+        """Retire la conversion sélectionnée, ou l'annule si elle est en cours"""
+        job = self.selected_queue_job()
+        if job is None:
+            return
+        if job.status == "running":
+            self.scheduler.cancel_job(job.id)
+        else:
+            self.job_queue.remove(job.id)
+        self.refresh_queue_view()
+    
+    def clear_finished_jobs(self):
+        """Retire de la file les conversions terminées"""
+        self.job_queue.clear_finished()
+        self.refresh_queue_view()
+    
+    def toggle_queue(self):
+        """Lance la file, ou l'arrête ; les conversions arrêtées reprendront plus tard"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.queue_btn.configure(state='disabled', text="Arrêt en cours...")
+            return
+        try:
+            workers = self.workers.get()
+        except tk.TclError:
+            workers = default_worker_count()
+        self.scheduler = Scheduler(self.job_queue, workers=workers)
+        self.scheduler.start()
+        self.queue_btn.configure(text="⏹ Arrêter la file")
+        self.root.after(UI_REFRESH_MS, self.poll_queue)
+    
+    def poll_queue(self):
+        """Vide la file d'événements de l'ordonnanceur à cadence fixe"""
+        lines = []
+        final_event = None
+        changed = False
+        for _ in range(MAX_EVENTS_PER_REFRESH):
+            try:
+                event = self.scheduler.events.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if event.kind == "job_started":
+                lines.append((f"📦 File : début de #{event.data['job']} ({event.data['input_folder']})", 'folder'))
+            elif event.kind == "job_finished":
+                job_id, stats = event.data['job'], event.data['stats'] or {}
+                if event.data['status'] == "error":
+                    lines.append((f"❌ File : #{job_id} interrompue : {event.data['message']}", 'error'))
+                elif event.data['status'] == "done":
+                    lines.append((f"✅ File : #{job_id} terminée • {stats.get('converted', 0)} images converties"
+                                  f" • {stats.get('errors', 0)} erreurs", 'success'))
+                else:
+                    lines.append((f"⏹ File : #{job_id} arrêtée", 'folder'))
+            elif event.kind in SCHEDULER_FINAL_EVENTS:
+                final_event = event
+                break
+        
+        if lines:
+            self.log_lines(lines)
+        if changed:
+            self.refresh_queue_view()
+        
+        if final_event is None:
+            self.root.after(UI_REFRESH_MS, self.poll_queue)
+            return
+        self.scheduler = None
+        self.queue_btn.configure(state='normal', text="▶ Lancer la file")
+        if final_event.kind == "idle":
+            self.log_message("🎉 File d'attente terminée", 'success')
+    
+    def on_close(self):
+        """Annule la conversion en cours avant de fermer la fenêtre
+        
+        Les conversions de la file en cours sont arrêtées et reprendront au
+        prochain lancement de la file.
+        """
+        if self.job is not None:
+            self.job.cancel()
+            self.job.join()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler.join()
+        self.root.destroy()
     
     def run(self):
         """Lance l'application"""
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.mainloop()
+    
+    def measure_startup(self, imported, built):
+        """Affiche la fenêtre, mesure le temps jusqu'à ce qu'elle soit utilisable, puis quitte
+        
+        Les durées sont comptées depuis le début du script (le déballage de
+        l'exécutable PyInstaller n'en fait pas partie, voir heiconverter.bench).
+        """
+        self.root.update()  # fenêtre affichée et dessinée, événements en attente traités
+        usable = time.perf_counter()
+        timings = {'imports_ms': round((imported - STARTED) * 1000, 1),
+                   'interface_ms': round((built - imported) * 1000, 1),
+                   'usable_ms': round((usable - STARTED) * 1000, 1)}
+        self.root.destroy()
+        line = json.dumps(timings)
+        if sys.stdout is not None:
+            print(line, flush=True)
+        else:
+            # Exécutable sans console : la mesure est écrite dans un fichier
+            with open(os.path.join(tempfile.gettempdir(), STARTUP_REPORT_NAME), 'a') as f:
+                f.write(line + "\n")
 
 if __name__ == "__main__":
+    # Nécessaire pour le pool de processus dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
+    imported = time.perf_counter()
     app = ModernHEICConverter()
-    app.run()
\ No newline at end of file
+    if "--startup-time" in sys.argv[1:]:
+        app.measure_startup(imported, time.perf_counter())
+    else:
+        app.run()
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""Cœur de conversion HEIC Converter Pro, utilisable sans interface graphique
+
+    from heiconverter import ConversionOptions, run_conversion
+    run_conversion(ConversionOptions("photos", output_folder="photos_jpeg"))
+
+Pillow et le décodeur HEIF ne sont chargés qu'au moment de convertir.
+"""
+from heiconverter.job import ConversionJob, JobEvent, run_conversion
+from heiconverter.options import ConversionOptions
+
+__all__ = ["ConversionJob", "ConversionOptions", "JobEvent", "run_conversion"]
@@ -0,0 +1,9 @@
+"""Point d'entrée `python -m heiconverter`"""
+import multiprocessing
+import sys
+
+from heiconverter.cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
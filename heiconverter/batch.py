@@ -0,0 +1,408 @@
+"""File de conversions persistante et ordonnanceur
+
+La file associe des dossiers d'entrée à leurs options de conversion, avec une
+priorité. Elle est enregistrée dans un fichier JSON et survit aux
+redémarrages : une conversion interrompue reprend au lancement suivant grâce
+au mode incrémental, toujours actif pour les conversions de la file.
+
+L'ordonnanceur exécute plusieurs conversions à la fois sur un même pool de
+processus, qui reste chaud d'une conversion à l'autre.
+
+Utilisation :
+    python -m heiconverter.batch jobs.json      # ajoute les conversions et vide la file
+    python -m heiconverter.batch                # reprend la file enregistrée
+    python -m heiconverter.batch --list         # état de la file
+
+Le fichier de conversions est une liste JSON d'objets reprenant les champs de
+ConversionOptions, plus une priorité facultative :
+    [{"input_folder": "DCIM/2024-05", "output_format": "webp", "priority": 1}]
+"""
+import argparse
+import dataclasses
+import json
+import os
+import queue
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from heiconverter.copying import write_file
+from heiconverter.engine import POOL_KINDS, WorkerPools, default_worker_count
+from heiconverter.job import FINAL_EVENTS, ConversionJob, JobEvent
+from heiconverter.options import ConversionOptions, resolve_output_folder
+
+QUEUE_VERSION = 1
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".heiconverter", "queue.json")
+JOB_STATUSES = ("pending", "running", "done", "error", "cancelled")
+MAX_CONCURRENT_JOBS = 2
+IDLE_WAIT_SECONDS = 0.05
+
+# Événements qui terminent l'ordonnanceur
+SCHEDULER_FINAL_EVENTS = ("idle", "stopped")
+
+
+def options_to_dict(options):
+    """Options de conversion sérialisables en JSON"""
+    data = dataclasses.asdict(options)
+    data['sizes'] = list(data['sizes'])
+    return data
+
+
+def options_from_dict(data):
+    """Options de conversion à partir d'un objet JSON
+
+    Lève ValueError pour un champ inconnu ou un dossier d'entrée manquant.
+    """
+    known = {field.name for field in dataclasses.fields(ConversionOptions)}
+    unknown = sorted(set(data) - known)
+    if unknown:
+        raise ValueError(f"Option de conversion inconnue : {', '.join(unknown)}")
+    if 'input_folder' not in data:
+        raise ValueError("Chaque conversion doit indiquer un dossier d'entrée (input_folder).")
+    if 'sizes' in data:
+        data = dict(data, sizes=tuple(data['sizes']))
+    return ConversionOptions(**data)
+
+
+@dataclass
+class QueuedJob:
+    """Conversion de la file d'attente"""
+    id: int
+    options: ConversionOptions
+    priority: int = 0  # les plus grandes priorités passent en premier
+    status: str = "pending"  # voir JOB_STATUSES
+    message: Optional[str] = None  # erreur éventuelle
+    stats: Optional[dict] = None  # statistiques de la dernière exécution
+    processed: int = 0
+    total: Optional[int] = None
+
+    def to_dict(self):
+        return dict(dataclasses.asdict(self), options=options_to_dict(self.options))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict(data, options=options_from_dict(data['options'])))
+
+
+class JobQueue:
+    """File de conversions enregistrée dans un fichier JSON
+
+    Une seule instance doit utiliser un même fichier à la fois.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.jobs = []
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """Charge la file ; les conversions interrompues redeviennent en attente"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != QUEUE_VERSION:
+            return
+        with self._lock:
+            self.jobs = [QueuedJob.from_dict(entry) for entry in data.get('jobs', [])]
+            for job in self.jobs:
+                if job.status == "running":
+                    job.status = "pending"
+
+    def save(self):
+        """Enregistre la file de façon atomique"""
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            data = {'version': QUEUE_VERSION, 'jobs': [job.to_dict() for job in self.jobs]}
+            write_file(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    def add(self, options, priority=0):
+        """Ajoute une conversion à la file
+
+        Les options sont vérifiées tout de suite : ValueError si elles ne
+        permettent pas de lancer la conversion.
+        """
+        resolve_output_folder(options)
+        with self._lock:
+            job = QueuedJob(max((job.id for job in self.jobs), default=0) + 1, options, priority)
+            self.jobs.append(job)
+            self.save()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return next((job for job in self.jobs if job.id == job_id), None)
+
+    def remove(self, job_id):
+        """Retire une conversion qui n'est pas en cours ; renvoie False sinon"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None or job.status == "running":
+                return False
+            self.jobs.remove(job)
+            self.save()
+            return True
+
+    def clear_finished(self):
+        """Retire les conversions terminées, annulées ou en erreur"""
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.status in ("pending", "running")]
+            self.save()
+
+    def next_pending(self):
+        """Conversion en attente la plus prioritaire, la plus ancienne à priorité égale"""
+        with self._lock:
+            pending = [job for job in self.jobs if job.status == "pending"]
+            return min(pending, key=lambda job: (-job.priority, job.id), default=None)
+
+
+class Scheduler:
+    """Exécute les conversions de la file, plusieurs à la fois, sur des pools partagés
+
+    `max_jobs` conversions tournent en même temps : pendant qu'une conversion
+    parcourt son dossier ou termine ses dernières images, les autres occupent
+    le pool. Le champ `workers` des options de chaque conversion limite le
+    nombre de ses images traitées en parallèle.
+
+    Comme ConversionJob, l'ordonnanceur publie des JobEvent dans `events` :
+    ceux des conversions, complétés par le numéro `job`, ainsi que
+    "job_started", "job_finished" et, pour finir, "idle" (file vide) ou
+    "stopped".
+    """
+
+    def __init__(self, job_queue, max_jobs=MAX_CONCURRENT_JOBS, workers=None, pool="process"):
+        self.queue = job_queue
+        self.max_jobs = max(1, max_jobs)
+        self.workers = workers or default_worker_count()
+        self.pool = pool
+        self.events = queue.Queue()
+        self.running = {}  # numéro -> (QueuedJob, ConversionJob)
+        self.pools = None
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Lance l'ordonnanceur en arrière-plan"""
+        self._thread = threading.Thread(target=self.run, name="Scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompt les conversions en cours, qui reprendront au prochain lancement"""
+        self._stopping.set()
+        self.wake()
+
+    def wake(self):
+        """Signale un changement de la file (ajout d'une conversion)"""
+        self._wakeup.set()
+
+    def cancel_job(self, job_id):
+        """Annule une conversion en cours"""
+        entry = self.running.get(job_id)
+        if entry is not None:
+            entry[1].cancel()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def emit(self, kind, **data):
+        self.events.put(JobEvent(kind, data))
+
+    def _launch(self, queued):
+        """Démarre une conversion de la file"""
+        # Toujours incrémentale : une conversion interrompue reprend où elle s'était arrêtée.
+        # Pas de miniatures : aucun aperçu n'affiche les conversions de la file
+        options = dataclasses.replace(queued.options, incremental=True, preview_size=None)
+        try:
+            job = ConversionJob(options, pools=self.pools)
+        except ValueError as e:
+            self._finish(queued, "error", message=str(e))
+            return
+        # Dossier de sortie figé, pour qu'une reprise écrive au même endroit
+        queued.options.output_folder = job.output_folder
+        queued.status = "running"
+        queued.message = None
+        self.queue.save()
+        self.running[queued.id] = (queued, job)
+        job.start()
+        self.emit("job_started", job=queued.id, input_folder=job.input_folder,
+                  output_folder=job.output_folder)
+
+    def _finish(self, queued, status, message=None, stats=None):
+        queued.status = status
+        queued.message = message
+        queued.stats = stats
+        self.queue.save()
+        self.emit("job_finished", job=queued.id, status=status, message=message, stats=stats)
+
+    def _forward_events(self):
+        """Relaie les événements des conversions en cours ; renvoie False s'il n'y en avait aucun"""
+        received = False
+        for job_id, (queued, job) in list(self.running.items()):
+            while True:
+                try:
+                    event = job.events.get_nowait()
+                except queue.Empty:
+                    break
+                received = True
+                if event.kind == "result":
+                    queued.processed, queued.total = event.data['processed'], event.data['total']
+                self.events.put(JobEvent(event.kind, dict(event.data, job=job_id)))
+                if event.kind in FINAL_EVENTS:
+                    del self.running[job_id]
+                    self._job_ended(queued, event)
+                    break
+        return received
+
+    def _job_ended(self, queued, event):
+        stats = {key: value for key, value in event.data.items()
+                 if key not in ('report', 'output_folder', 'message')}
+        if event.kind == "error":
+            self._finish(queued, "error", message=event.data['message'])
+        elif event.kind == "cancelled":
+            # Arrêt de l'ordonnanceur : la conversion reprendra au prochain lancement
+            self._finish(queued, "pending" if self._stopping.is_set() else "cancelled", stats=stats)
+        elif event.kind == "empty":
+            self._finish(queued, "done", message="Aucun fichier trouvé dans le dossier d'entrée.")
+        else:
+            self._finish(queued, "done", stats=stats)
+
+    def run(self):
+        """Exécute les conversions jusqu'à ce que la file soit vide ou l'ordonnanceur arrêté"""
+        self.pools = WorkerPools(self.workers, self.pool)
+        try:
+            while True:
+                if self._stopping.is_set():
+                    for queued, job in self.running.values():
+                        job.cancel()
+                else:
+                    while len(self.running) < self.max_jobs:
+                        queued = self.queue.next_pending()
+                        if queued is None:
+                            break
+                        self._launch(queued)
+
+                if not self.running:
+                    break
+                if not self._forward_events():
+                    self._wakeup.wait(IDLE_WAIT_SECONDS)
+                    self._wakeup.clear()
+        finally:
+            self.pools.shutdown(cancel=self._stopping.is_set())
+            self.pools = None
+        self.emit("stopped" if self._stopping.is_set() else "idle")
+
+
+def run_queue(job_queue, on_event=None, **scheduler_options):
+    """Exécute la file jusqu'à ce qu'elle soit vide et renvoie l'événement final
+
+    Un Ctrl+C arrête l'ordonnanceur : les conversions en cours restent dans
+    la file et reprendront au lancement suivant.
+    """
+    scheduler = Scheduler(job_queue, **scheduler_options)
+    scheduler.start()
+    while True:
+        try:
+            event = scheduler.events.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            scheduler.stop()
+            continue
+        if on_event is not None:
+            on_event(event)
+        if event.kind in SCHEDULER_FINAL_EVENTS:
+            return event
+
+
+def read_job_file(path):
+    """Conversions d'un fichier JSON : liste de couples (options, priorité)"""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('jobs', [])
+    jobs = []
+    for entry in entries:
+        entry = dict(entry)
+        priority = entry.pop('priority', 0)
+        jobs.append((options_from_dict(entry), priority))
+    return jobs
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m heiconverter.batch",
+        description="Exécute une file de conversions persistante, plusieurs à la fois.")
+    parser.add_argument("job_files", nargs="*", metavar="JOBS",
+                        help="fichiers JSON de conversions à ajouter à la file")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH,
+                        help=f"fichier de la file (par défaut : {DEFAULT_STATE_PATH})")
+    parser.add_argument("--max-jobs", type=int, default=MAX_CONCURRENT_JOBS,
+                        help=f"conversions exécutées en même temps (par défaut : {MAX_CONCURRENT_JOBS})")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help=f"taille du pool partagé (par défaut : {default_worker_count()})")
+    parser.add_argument("--pool", choices=POOL_KINDS, default="process",
+                        help="pool de processus ou de threads (par défaut : process)")
+    parser.add_argument("--list", action="store_true", help="affiche la file et quitte")
+    parser.add_argument("--add-only", action="store_true",
+                        help="ajoute les conversions à la file sans l'exécuter")
+    parser.add_argument("--clear-finished", action="store_true",
+                        help="retire de la file les conversions terminées")
+    return parser
+
+
+def print_json(data):
+    print(json.dumps(data, ensure_ascii=False), flush=True)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers doit être au moins 1")
+
+    job_queue = JobQueue(args.state)
+    try:
+        for path in args.job_files:
+            for options, priority in read_job_file(path):
+                job_queue.add(options, priority)
+    except (OSError, ValueError) as e:
+        print_json({'event': 'error', 'message': str(e)})
+        return 2
+    if args.clear_finished:
+        job_queue.clear_finished()
+
+    if args.list:
+        for job in job_queue.jobs:
+            print_json(job.to_dict())
+        return 0
+    if args.add_only:
+        return 0
+
+    failed = []
+
+    def on_event(event):
+        print_json(event.to_dict())
+        if event.kind == "job_finished" and (event.data['status'] == "error"
+                                             or (event.data['stats'] or {}).get('errors')):
+            failed.append(event.data['job'])
+
+    final_event = run_queue(job_queue, on_event=on_event,
+                            max_jobs=args.max_jobs, workers=args.workers, pool=args.pool)
+    if final_event.kind == "stopped":
+        return 130
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()
+    sys.exit(main())
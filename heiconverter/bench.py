@@ -0,0 +1,396 @@
+"""Banc d'essai du cœur de conversion
+
+Génère un corpus synthétique reproductible (images HEIC de plusieurs
+définitions, fichiers annexes, sous-dossiers) puis le convertit dans
+plusieurs configurations : série, threads, pool de processus, modes de copie
+et encodeurs. Chaque configuration s'exécute dans un processus séparé pour
+que sa mémoire maximale soit mesurée isolément.
+
+Utilisation :
+    python -m heiconverter.bench [--output resultats.json]
+    python -m heiconverter.bench --startup [--gui dist/HEIConverter/HEIConverter.exe]
+
+Le rapport JSON donne pour chaque exécution le débit en fichiers et en Mo par
+seconde, les percentiles de durée de chaque étape et la mémoire maximale.
+
+Avec --startup, seul le démarrage est mesuré, dans des processus neufs :
+interpréteur seul, import du cœur, ligne de commande, premier processus de
+travail prêt (codecs chargés) et fenêtre utilisable (converter.py ou
+l'exécutable PyInstaller, lancé avec --startup-time).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from heiconverter.copying import COPY_MODES
+from heiconverter.encoders import create_encoder
+from heiconverter.engine import default_worker_count, load_codecs
+from heiconverter.job import run_conversion
+from heiconverter.options import ConversionOptions
+from heiconverter.report import STARTUP_REPORT_NAME
+
+CORPUS_MARKER = "corpus.json"
+CORPUS_FILES = "files"  # sous-dossier converti, à côté de CORPUS_MARKER
+CORPUS_VERSION = 1
+RESOLUTIONS = ((1024, 768), (2016, 1512), (4032, 3024))
+OTHER_FILES = (("video.mov", 8 * 1024 * 1024), ("notes.txt", 4 * 1024), ("scan.pdf", 512 * 1024))
+PERCENTILES = (50, 90, 99)
+
+
+def scenarios(workers):
+    """Configurations mesurées, par nom"""
+    result = {
+        "serial": {"workers": 1},
+        "threads": {"workers": workers, "pool": "thread"},
+        "processes": {"workers": workers, "pool": "process"},
+    }
+    for mode in COPY_MODES:
+        if mode != "copy":
+            result[f"copy-{mode}"] = {"workers": workers, "copy_mode": mode}
+    result.update({
+        "jpeg-fast": {"workers": workers, "speed": "fast"},
+        "jpeg-small": {"workers": workers, "speed": "small"},
+        "webp": {"workers": workers, "output_format": "webp"},
+        "avif": {"workers": workers, "output_format": "avif"},
+        "png": {"workers": workers, "output_format": "png"},
+        "heif": {"workers": workers, "output_format": "heif"},
+        "multi-size": {"workers": workers, "sizes": ("full", "web", "thumbnail")},
+    })
+    return result
+
+
+def unavailable_formats(configs):
+    """Formats de sortie des configurations que Pillow ne sait pas écrire, avec la raison
+
+    AVIF, par exemple, demande Pillow 11.2 ou le greffon pillow-avif-plugin.
+    """
+    unavailable = {}
+    for config in configs:
+        output_format = config.get("output_format", "jpeg")
+        if output_format in unavailable:
+            continue
+        try:
+            create_encoder(output_format).check_available()
+        except ValueError as e:
+            unavailable[output_format] = str(e)
+    return unavailable
+
+
+def synthetic_image(Image, width, height, rng):
+    """Image en dégradés, rapide à produire et réaliste à compresser"""
+    horizontal = Image.linear_gradient("L").rotate(rng.choice((90, 270))).resize((width, height))
+    vertical = Image.linear_gradient("L").resize((width, height))
+    radial = Image.radial_gradient("L").resize((width, height))
+    channels = [horizontal, vertical, radial]
+    rng.shuffle(channels)
+    return Image.merge("RGB", channels)
+
+
+def generate_corpus(corpus, images=12, seed=0):
+    """Crée le corpus synthétique dans le sous-dossier CORPUS_FILES de `corpus`
+
+    Les images se répartissent entre les définitions de RESOLUTIONS et entre
+    la racine et deux niveaux de sous-dossiers, avec quelques fichiers non
+    HEIC à copier.
+    """
+    Image = load_codecs()
+    rng = random.Random(seed)
+    folder = os.path.join(corpus, CORPUS_FILES)
+    subfolders = ("", "2023", os.path.join("2023", "vacances"))
+    for subfolder in subfolders:
+        os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+
+    for index in range(images):
+        width, height = RESOLUTIONS[index % len(RESOLUTIONS)]
+        extension = ".HEIC" if index % 4 == 3 else ".heic"
+        path = os.path.join(folder, subfolders[index % len(subfolders)], f"IMG_{index:04d}{extension}")
+        with synthetic_image(Image, width, height, rng) as img:
+            img.save(path, format="HEIF", quality=80)
+
+    for index, (name, size) in enumerate(OTHER_FILES):
+        path = os.path.join(folder, subfolders[index % len(subfolders)], name)
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(size))
+
+    with open(os.path.join(corpus, CORPUS_MARKER), 'w', encoding='utf-8') as f:
+        json.dump({"version": CORPUS_VERSION, "images": images, "seed": seed}, f)
+
+
+def corpus_info(folder):
+    """Nombre et taille des fichiers du corpus"""
+    info = {"path": folder, "heic_files": 0, "other_files": 0, "bytes": 0}
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            info["bytes"] += os.path.getsize(os.path.join(root, name))
+            if name.lower().endswith(('.heic', '.heif')):
+                info["heic_files"] += 1
+            else:
+                info["other_files"] += 1
+    return info
+
+
+def percentile(values, percent):
+    """Percentile par rang le plus proche d'une liste triée"""
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+def summarize_timings(results):
+    """Percentiles de durée de chaque étape, en millisecondes"""
+    stages = {}
+    for result in results:
+        for stage, seconds in result["timings"].items():
+            stages.setdefault(stage, []).append(seconds * 1000)
+    summary = {}
+    for stage, values in stages.items():
+        values.sort()
+        summary[stage] = {f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}
+        summary[stage]["max"] = round(values[-1], 3)
+        summary[stage]["count"] = len(values)
+    return summary
+
+
+def _vm_hwm():
+    """Pic de mémoire résidente du processus courant lu dans /proc, en octets
+
+    Contrairement à ru_maxrss, ce pic repart de zéro à l'exec : il ne
+    compte pas la mémoire du processus parent (génération du corpus).
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """Mémoire résidente maximale du processus et de son plus gros processus de travail
+
+    None si le module resource n'existe pas (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    main = _vm_hwm() or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return {"main": round(main / 1024 / 1024, 1), "workers": round(workers / 1024 / 1024, 1)}
+
+
+def run_single(config):
+    """Exécute une configuration dans le processus courant et renvoie ses mesures"""
+    corpus = config.pop("corpus")
+    output = config.pop("output")
+    input_bytes = config.pop("input_bytes")
+    options = ConversionOptions(input_folder=corpus, output_folder=output, **config)
+
+    results = []
+
+    def on_event(event):
+        if event.kind == "result":
+            results.append(event.data["result"].to_dict())
+
+    start = time.perf_counter()
+    final = run_conversion(options, on_event)
+    seconds = time.perf_counter() - start
+    if final.kind != "done":
+        return {"status": final.kind, "error": final.data.get("message")}
+
+    return {
+        "status": "ok",
+        "seconds": round(seconds, 3),
+        "files": len(results),
+        "errors": sum(1 for result in results if result["status"] == "error"),
+        "files_per_second": round(len(results) / seconds, 2),
+        "mb_per_second": round(input_bytes / 1024 / 1024 / seconds, 2),
+        "stages_ms": summarize_timings(results),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_scenario(name, config, corpus, input_bytes, workdir):
+    """Exécute une configuration dans un processus séparé"""
+    output = tempfile.mkdtemp(prefix=f"{name}-", dir=workdir)
+    shutil.rmtree(output)
+    config = dict(config, corpus=corpus, output=output, input_bytes=input_bytes)
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "heiconverter.bench", "--single", json.dumps(config)],
+            capture_output=True, text=True)
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    if completed.returncode != 0:
+        return {"status": "error", "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout)
+
+
+def startup_commands(gui=None):
+    """Commandes dont le démarrage est mesuré, par nom"""
+    commands = {
+        "python": [sys.executable, "-c", "pass"],
+        "import": [sys.executable, "-c", "import heiconverter"],
+        "cli": [sys.executable, "-m", "heiconverter", "--help"],
+        "worker": [sys.executable, "-c",
+                   "import os\n"
+                   "from heiconverter.engine import WorkerPools\n"
+                   "if __name__ == '__main__':\n"
+                   "    pools = WorkerPools(1)\n"
+                   "    pools.processes.submit(os.getpid).result()\n"
+                   "    pools.shutdown()\n"],
+    }
+    if gui is None:
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "converter.py")
+        gui = script if os.path.exists(script) else None
+    if gui is not None:
+        commands["gui"] = ([sys.executable, gui] if gui.endswith(".py") else [gui]) + ["--startup-time"]
+    return commands
+
+
+def _gui_timings(stdout):
+    """Mesures écrites par l'interface : sur sa sortie, ou dans un fichier sans console"""
+    lines = stdout.strip().splitlines()
+    if not lines:
+        try:
+            with open(os.path.join(tempfile.gettempdir(), STARTUP_REPORT_NAME)) as f:
+                lines = f.read().strip().splitlines()
+        except OSError:
+            return None
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return None
+
+
+def measure_startup(gui=None, repeat=5):
+    """Durée médiane de lancement de chaque commande, jusqu'à sa fin, en millisecondes"""
+    results = {}
+    for name, command in startup_commands(gui).items():
+        durations = []
+        measure = {}
+        for iteration in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run(command, capture_output=True, text=True)
+            durations.append((time.perf_counter() - start) * 1000)
+            if completed.returncode != 0:
+                measure = {"status": "error", "error": completed.stderr.strip().splitlines()[-1:]}
+                break
+            if name == "gui":
+                measure["timings_ms"] = _gui_timings(completed.stdout)
+        else:
+            measure["status"] = "ok"
+            measure["wall_ms"] = round(percentile(sorted(durations), 50), 1)
+        results[name] = measure
+    return results
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report, path=None):
+    """Écrit le rapport JSON dans un fichier, ou sur la sortie standard"""
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m heiconverter.bench",
+        description="Mesure les performances de la conversion sur un corpus synthétique.")
+    parser.add_argument("--corpus",
+                        help="dossier du corpus, généré s'il n'existe pas et réutilisé sinon "
+                             "(par défaut : corpus temporaire)")
+    parser.add_argument("--images", type=int, default=12,
+                        help="nombre d'images HEIC du corpus généré (par défaut : 12)")
+    parser.add_argument("--seed", type=int, default=0, help="graine du corpus généré")
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count(),
+                        help=f"nombre de workers des configurations parallèles "
+                             f"(par défaut : {default_worker_count()})")
+    parser.add_argument("-m", "--modes", nargs="+", metavar="MODE",
+                        help="configurations à mesurer, parmi : "
+                             + ", ".join(scenarios(1)) + " (par défaut : toutes)")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="nombre d'exécutions de chaque configuration (par défaut : 1)")
+    parser.add_argument("-o", "--output", help="fichier du rapport JSON (par défaut : sortie standard)")
+    parser.add_argument("--startup", action="store_true",
+                        help="mesure seulement le démarrage (interpréteur, import, ligne de "
+                             "commande, processus de travail, fenêtre)")
+    parser.add_argument("--gui", metavar="PATH",
+                        help="avec --startup, script ou exécutable de l'interface à mesurer "
+                             "(par défaut : converter.py à côté du paquet)")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(run_single(json.loads(args.single))))
+        return 0
+
+    if args.startup:
+        write_report({"machine": machine_info(),
+                      "startup": measure_startup(args.gui, max(args.repeat, 5))}, args.output)
+        return 0
+
+    available = scenarios(args.workers)
+    modes = args.modes or list(available)
+    unknown = [mode for mode in modes if mode not in available]
+    if unknown:
+        parser.error("configuration inconnue : " + ", ".join(unknown))
+
+    workdir = tempfile.mkdtemp(prefix="heiconverter-bench-",
+                               dir=os.path.dirname(os.path.abspath(args.corpus)) if args.corpus else None)
+    try:
+        corpus = args.corpus or os.path.join(workdir, "corpus")
+        if not os.path.exists(os.path.join(corpus, CORPUS_MARKER)):
+            print(f"Génération du corpus dans {corpus}...", file=sys.stderr)
+            generate_corpus(corpus, args.images, args.seed)
+        corpus = os.path.join(corpus, CORPUS_FILES)
+        info = corpus_info(corpus)
+
+        runs = []
+        unavailable = unavailable_formats(available[mode] for mode in modes)
+        for mode in modes:
+            output_format = available[mode].get("output_format", "jpeg")
+            if output_format in unavailable:
+                print(f"{mode} : format indisponible, configuration ignorée", file=sys.stderr)
+                runs.append({"mode": mode, "config": available[mode], "status": "unavailable",
+                             "error": unavailable[output_format]})
+                continue
+            for iteration in range(args.repeat):
+                print(f"{mode} ({iteration + 1}/{args.repeat})...", file=sys.stderr)
+                measure = run_scenario(mode, available[mode], corpus, info["bytes"], workdir)
+                runs.append({"mode": mode, "iteration": iteration + 1,
+                             "config": available[mode], **measure})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_report({"machine": machine_info(), "corpus": info, "runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Conversion en ligne de commande, sans interface graphique
+
+Chaque événement de la conversion est écrit sur la sortie standard sous
+forme d'une ligne JSON, pour être exploité par d'autres outils.
+"""
+import argparse
+import json
+
+from heiconverter.copying import COPY_MODES
+from heiconverter.dedup import DEDUP_MODES
+from heiconverter.encoders import ENCODERS, JPEG_SUBSAMPLINGS, SPEED_PRESETS
+from heiconverter.engine import POOL_KINDS, default_worker_count
+from heiconverter.job import run_conversion
+from heiconverter.options import ConversionOptions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m heiconverter",
+        description="Convertit un dossier d'images HEIC en JPEG (sous-dossiers compris).")
+    parser.add_argument("input", help="dossier d'entrée")
+    parser.add_argument("-o", "--output",
+                        help="dossier de sortie (par défaut : nom choisi automatiquement)")
+    parser.add_argument("--location", choices=("parent", "current"), default="parent",
+                        help="emplacement du dossier de sortie automatique : "
+                             "dossier parent du dossier d'entrée ou dossier d'entrée lui-même")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help=f"nombre de processus de conversion (par défaut : {default_worker_count()})")
+    parser.add_argument("--pool", choices=POOL_KINDS, default="process",
+                        help="décodage et encodage dans des processus séparés ou dans des threads "
+                             "du processus courant (par défaut : process)")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="mémoire maximale réservée aux images en cours de conversion ; "
+                             "la lecture de nouvelles images attend que de la mémoire se libère "
+                             "(par défaut : sans limite)")
+    parser.add_argument("-f", "--format", dest="output_format", choices=ENCODERS, default="jpeg",
+                        help="format des images produites ; heif conserve les fichiers HEIC "
+                             "d'origine sans les réencoder (par défaut : jpeg)")
+    parser.add_argument("-q", "--quality", type=int, default=None,
+                        help="qualité de 1 à 100 (par défaut : "
+                             + ", ".join(f"{name} {encoder.default_quality}"
+                                         for name, encoder in ENCODERS.items() if name != "png")
+                             + ")")
+    parser.add_argument("--speed", choices=SPEED_PRESETS, default="balanced",
+                        help="compromis entre temps d'encodage et taille des fichiers (par défaut : balanced)")
+    parser.add_argument("--subsampling", choices=JPEG_SUBSAMPLINGS,
+                        help="sous-échantillonnage de la chrominance JPEG (par défaut : celui de Pillow)")
+    parser.add_argument("--progressive", action=argparse.BooleanOptionalAction, default=None,
+                        help="JPEG progressif (par défaut : selon --speed)")
+    parser.add_argument("--optimize", action=argparse.BooleanOptionalAction, default=None,
+                        help="optimisation des tables de Huffman JPEG (par défaut : selon --speed)")
+    parser.add_argument("-s", "--size", dest="sizes", action="append", metavar="SIZE",
+                        help="taille des images produites : full, web (2048 px), thumbnail (320 px) "
+                             "ou bord maximal en pixels. Répétable pour produire plusieurs tailles "
+                             "à partir d'un seul décodage ; la première garde le nom du fichier, "
+                             "les suivantes reçoivent un suffixe (par défaut : full)")
+    parser.add_argument("--images", default="primary", metavar="CHOICE",
+                        help="images exportées de chaque fichier HEIC : primary (image principale), "
+                             "all (toutes les images : rafales, photos Live), aux (toutes les images "
+                             "avec leurs cartes de profondeur et images auxiliaires) ou l'index d'une "
+                             "image (0 pour la première ; image principale si le fichier en compte "
+                             "moins). L'image choisie garde le nom du fichier, les autres reçoivent "
+                             "un suffixe : IMG_0001_image1.jpg, IMG_0001_depth.jpg "
+                             "(par défaut : primary)")
+    parser.add_argument("--metadata", dest="keep_metadata", action=argparse.BooleanOptionalAction,
+                        default=True,
+                        help="recopie l'EXIF (dates, appareil, GPS), le profil ICC et le XMP dans "
+                             "les images produites (par défaut : oui)")
+    parser.add_argument("--auto-orient", action="store_true",
+                        help="redresse les images dont l'EXIF indique encore une rotation et remet "
+                             "l'orientation à 1 (les rotations HEIF sont toujours appliquées)")
+    parser.add_argument("--sidecar", action="store_true",
+                        help="écrit les métadonnées de chaque image dans un fichier JSON à côté "
+                             "de l'image produite (IMG_0001.jpg.json), sans second décodage")
+    parser.add_argument("--copy-mode", choices=COPY_MODES, default="copy",
+                        help="traitement des fichiers non HEIC : copie classique, lien physique, "
+                             "clone copy-on-write, copie rapide dans le noyau ou aucune copie "
+                             "(repli automatique sur la copie classique ; par défaut : copy)")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="off",
+                        help="images HEIC identiques présentes plusieurs fois : convertir une seule "
+                             "fois puis lier (hardlink) ou copier (copy) le résultat, ou seulement les "
+                             "signaler sans rien produire (list) ; par défaut : off")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="ne retraite que les fichiers nouveaux ou modifiés depuis la "
+                             "dernière conversion (reprend aussi une conversion interrompue)")
+    parser.add_argument("--hash", dest="hash_check", action="store_true",
+                        help="avec --incremental, compare le contenu des fichiers dont la date a changé")
+    parser.add_argument("--prune", action="store_true",
+                        help="avec --incremental, supprime les sorties des fichiers sources disparus")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="durée maximale du décodage et de l'encodage d'une image : au-delà, "
+                             "l'image est abandonnée et comptée en erreur (par défaut : sans limite)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="ne traite que les fichiers en échec lors des conversions précédentes "
+                             "vers le même dossier de sortie (liste heiconverter-failed.json)")
+    parser.add_argument("--plan", action="store_true",
+                        help="parcourt d'abord le dossier pour établir la liste complète des fichiers, "
+                             "signaler les collisions de noms et estimer la taille et la durée à partir "
+                             "de quelques images converties en mémoire ; la conversion n'est pas lancée "
+                             "si l'espace disque manque")
+    parser.add_argument("-n", "--dry-run", action="store_true",
+                        help="établit le plan sans rien convertir ni créer : chaque fichier prévu est "
+                             "écrit (événement plan_task), puis le résumé (événement planned)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="enregistre en fin de conversion la durée de chaque étape, les volumes "
+                             "et les erreurs, fichier par fichier (CSV si FILE se termine par .csv, "
+                             "JSON sinon)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile la conversion avec cProfile et enregistre les statistiques "
+                             "dans FILE (lisibles avec python -m pstats) ; combiner avec -j 1 pour "
+                             "inclure le décodage et l'encodage")
+    return parser
+
+
+def options_from_args(args):
+    """Construit les options de conversion à partir des arguments"""
+    return ConversionOptions(input_folder=args.input,
+                             output_folder=args.output,
+                             output_location=args.location,
+                             workers=args.workers,
+                             pool=args.pool,
+                             memory_budget_mb=args.memory_budget,
+                             output_format=args.output_format,
+                             quality=args.quality,
+                             speed=args.speed,
+                             subsampling=args.subsampling,
+                             progressive=args.progressive,
+                             optimize=args.optimize,
+                             incremental=args.incremental,
+                             hash_check=args.hash_check,
+                             prune=args.prune,
+                             copy_mode=args.copy_mode,
+                             dedup=args.dedup,
+                             sizes=tuple(args.sizes or ("full",)),
+                             keep_metadata=args.keep_metadata,
+                             auto_orient=args.auto_orient,
+                             sidecar=args.sidecar,
+                             images=args.images,
+                             timeout=args.timeout,
+                             retry_failed=args.retry_failed,
+                             plan=args.plan,
+                             dry_run=args.dry_run,
+                             report_path=args.report,
+                             profile_path=args.profile)
+
+
+def print_event(event):
+    """Écrit un événement sur la sortie standard en JSON"""
+    print(json.dumps(event.to_dict(), ensure_ascii=False), flush=True)
+
+
+def check_args(parser, args):
+    """Vérifie les arguments que argparse ne peut pas contrôler seul"""
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers doit être au moins 1")
+    if args.memory_budget is not None and args.memory_budget < 1:
+        parser.error("--memory-budget doit être au moins 1")
+    if args.quality is not None and not 1 <= args.quality <= 100:
+        parser.error("--quality doit être compris entre 1 et 100")
+    if (args.hash_check or args.prune) and not args.incremental:
+        parser.error("--hash et --prune nécessitent --incremental")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    try:
+        final_event = run_conversion(options_from_args(args), on_event=print_event)
+    except ValueError as e:
+        print(json.dumps({'event': 'error', 'message': str(e)}, ensure_ascii=False), flush=True)
+        return 2
+
+    if final_event.kind == "cancelled":
+        return 130
+    if (final_event.kind == "error" or final_event.data.get('errors')
+            or final_event.data.get('plan', {}).get('problems')):
+        return 1
+    return 0
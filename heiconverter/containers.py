@@ -0,0 +1,103 @@
+"""Images d'un conteneur HEIF : image principale, autres images, profondeur et images auxiliaires
+
+Un fichier HEIC peut contenir plusieurs images (rafales, photos Live) et,
+pour chacune, des cartes de profondeur et des images auxiliaires (masques
+de portrait, gain HDR...). Le conteneur est analysé une seule fois et les
+images sont décodées l'une après l'autre, chacune libérée avant la suivante.
+
+L'image choisie (l'image principale par défaut) garde le nom du fichier ;
+les autres reçoivent un suffixe fixe :
+
+* IMG_0001_image2.jpg : troisième image du conteneur (index 2) ;
+* IMG_0001_depth.jpg, IMG_0001_image2_depth.jpg : cartes de profondeur ;
+* IMG_0001_hdrgainmap.jpg : image auxiliaire, nommée d'après son type.
+"""
+import io
+import os
+import re
+
+IMAGE_SELECTIONS = ("primary", "all", "aux")
+
+
+def parse_images(text):
+    """Interprète le choix des images : "primary", "all", "aux" ou un index (0 pour la première)"""
+    text = str(text).strip().lower()
+    if text in IMAGE_SELECTIONS:
+        return text
+    try:
+        index = int(text)
+    except ValueError:
+        raise ValueError(f"Choix d'images inconnu : {text!r} (primary, all, aux ou un index)")
+    if index < 0:
+        raise ValueError(f"Index d'image négatif : {index}")
+    return index
+
+
+def part_destination(destination, part):
+    """Fichier d'une image du conteneur : IMG_0001.jpg -> IMG_0001_depth.jpg"""
+    if not part:
+        return destination
+    stem, extension = os.path.splitext(destination)
+    return f"{stem}_{part}{extension}"
+
+
+def aux_part_name(aux_type):
+    """Nom court d'un type d'image auxiliaire : urn:...:aux:hdrgainmap -> hdrgainmap"""
+    name = re.sub(r'[^a-z0-9]+', '', aux_type.rsplit(':', 1)[-1].lower())
+    return name or "aux"
+
+
+def _join(prefix, name):
+    return f"{prefix}_{name}" if prefix else name
+
+
+def _numbered(names, name):
+    """Nom unique dans `names` : depth, depth2, depth3..."""
+    candidate, number = name, 1
+    while candidate in names:
+        number += 1
+        candidate = f"{name}{number}"
+    names.add(candidate)
+    return candidate
+
+
+def container_images(data, selection):
+    """Produit (suffixe, image Pillow) pour les images choisies du conteneur
+
+    Le suffixe est vide pour l'image qui garde le nom du fichier. Chaque
+    image est décodée au moment où elle est produite ; l'appelant la ferme
+    quand il n'en a plus besoin. Un fichier qui n'a pas l'index demandé
+    (photo isolée au milieu de rafales) donne son image principale.
+    """
+    from pillow_heif import open_heif
+
+    heif_file = open_heif(io.BytesIO(data), convert_hdr_to_8bit=True)
+    if selection == "primary":
+        indexes = [heif_file.primary_index]
+    elif isinstance(selection, int):
+        indexes = [selection if selection < len(heif_file) else heif_file.primary_index]
+    else:
+        # Image principale d'abord : elle garde le nom du fichier
+        indexes = [heif_file.primary_index] + [index for index in range(len(heif_file))
+                                               if index != heif_file.primary_index]
+
+    # Seules les images choisies restent référencées : chacune, avec ses
+    # pixels décodés, est libérée à la fin de son tour de boucle
+    selected = [(index, heif_file[index]) for index in indexes]
+    del heif_file
+
+    names = set()
+    while selected:
+        index, heif_image = selected.pop(0)
+        prefix = "" if index == indexes[0] else f"image{index}"
+        names.add(prefix)
+        yield prefix, heif_image.to_pillow()
+
+        if selection == "aux":
+            for depth_image in heif_image.info.get('depth_images', []):
+                yield _numbered(names, _join(prefix, "depth")), depth_image.to_pillow()
+            for aux_type, aux_ids in heif_image.info.get('aux', {}).items():
+                for aux_id in aux_ids:
+                    aux_image = heif_image.get_aux_image(aux_id)
+                    yield _numbered(names, _join(prefix, aux_part_name(aux_type))), aux_image.to_pillow()
+        del heif_image
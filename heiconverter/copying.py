@@ -0,0 +1,127 @@
+"""Stratégies de copie des fichiers qui ne sont pas convertis (vidéos, JPEG...)
+
+Chaque mode se replie automatiquement sur le suivant quand il n'est pas
+possible, par exemple un lien physique entre deux disques différents ou un
+clonage sur un système de fichiers qui ne le gère pas.
+
+Tous les fichiers produits sont d'abord écrits sous un nom temporaire, puis
+renommés : une écriture interrompue ne laisse jamais un fichier tronqué sous
+le nom final, qu'une conversion incrémentale prendrait pour terminé.
+"""
+import errno
+import os
+import shutil
+import sys
+
+from heiconverter.failures import retry_io
+
+COPY_MODES = ("copy", "hardlink", "reflink", "fast", "skip")
+
+# Modes essayés dans l'ordre, jusqu'à la copie classique
+FALLBACKS = {
+    "copy": ("copy",),
+    "fast": ("fast", "copy"),
+    "reflink": ("reflink", "fast", "copy"),
+    "hardlink": ("hardlink", "reflink", "fast", "copy"),
+}
+
+FICLONE = 0x40049409  # ioctl Linux de clonage (btrfs, XFS...)
+TEMP_SUFFIX = ".part"  # fichier en cours d'écriture
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_atomic(path, data):
+    temp_path = path + TEMP_SUFFIX
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+
+
+def write_file(path, data):
+    """Écrit un fichier produit de façon atomique, en retentant les erreurs passagères"""
+    retry_io(_write_atomic, path, data)
+
+
+def _hardlink(source, destination):
+    """Lien physique : aucune donnée copiée, aucun espace disque utilisé"""
+    os.link(source, destination)
+
+
+def _reflink(source, destination):
+    """Clone copy-on-write : les données ne sont dupliquées qu'en cas de modification"""
+    if sys.platform.startswith('linux'):
+        import fcntl
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    elif sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        if libc.clonefile(os.fsencode(source), os.fsencode(destination), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), destination)
+    else:
+        raise OSError(errno.ENOTSUP, "Clonage non disponible sur ce système", destination)
+    shutil.copystat(source, destination)
+
+
+def _fast_copy(source, destination):
+    """Copie dans le noyau avec os.copy_file_range
+
+    Sans copy_file_range, shutil.copyfile utilise déjà les appels rapides du
+    système (sendfile sous Linux, fcopyfile sous macOS).
+    """
+    if hasattr(os, 'copy_file_range'):
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            while os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30):
+                pass
+    else:
+        shutil.copyfile(source, destination)
+    shutil.copystat(source, destination)
+
+
+METHODS = {
+    "copy": shutil.copy2,
+    "fast": _fast_copy,
+    "reflink": _reflink,
+    "hardlink": _hardlink,
+}
+
+
+def _copy_atomic(source, destination, mode):
+    temp_path = destination + TEMP_SUFFIX
+    for method in FALLBACKS[mode]:
+        _remove_quietly(temp_path)
+        try:
+            METHODS[method](source, temp_path)
+            os.replace(temp_path, destination)
+            return method
+        except OSError:
+            _remove_quietly(temp_path)
+            if method == "copy":
+                raise
+        except BaseException:
+            _remove_quietly(temp_path)
+            raise
+
+
+def copy_file(source, destination, mode="copy"):
+    """Copie un fichier selon le mode demandé et renvoie le mode réellement utilisé
+
+    Le mode "skip" ne copie rien. La copie est atomique et les erreurs
+    passagères sont retentées.
+    """
+    if mode == "skip":
+        return "skip"
+    return retry_io(_copy_atomic, source, destination, mode)
@@ -0,0 +1,74 @@
+"""Détection des images sources identiques, pour ne les convertir qu'une fois
+
+Les sauvegardes de téléphone contiennent souvent la même photo dans
+plusieurs dossiers. Les fichiers sont d'abord regroupés par taille : un
+fichier dont la taille est unique ne peut pas être un doublon et n'est
+jamais lu. En cas de taille commune, une empreinte partielle (début et fin
+du fichier) écarte la plupart des faux candidats, et seule une empreinte
+complète identique désigne un doublon.
+"""
+import hashlib
+
+from heiconverter.manifest import file_digest
+
+DEDUP_MODES = ("off", "hardlink", "copy", "list")
+
+# Mode de copie utilisé pour reproduire la sortie de l'original
+DEDUP_COPY_MODES = {"hardlink": "hardlink", "copy": "reflink"}
+
+PARTIAL_CHUNK = 64 * 1024
+
+
+def partial_digest(path, size):
+    """Empreinte du début et de la fin d'un fichier
+
+    Pour un fichier de moins de deux blocs, elle couvre tout le contenu.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_CHUNK))
+        if size > 2 * PARTIAL_CHUNK:
+            f.seek(-PARTIAL_CHUNK, 2)
+        digest.update(f.read(PARTIAL_CHUNK))
+    return digest.hexdigest()
+
+
+class Deduplicator:
+    """Repère, au fil du parcours, les images identiques à une image déjà vue
+
+    Les empreintes complètes sont conservées dans `task.digest`, comme pour
+    la vérification du manifeste, et ne sont calculées qu'une fois.
+    """
+
+    def __init__(self):
+        self._by_size = {}  # taille -> tâches originales de cette taille
+        self._partials = {}  # chemin source -> empreinte partielle
+
+    def _partial(self, task):
+        partial = self._partials.get(task.source)
+        if partial is None:
+            partial = self._partials[task.source] = partial_digest(task.source, task.size)
+        return partial
+
+    @staticmethod
+    def _full(task):
+        if task.digest is None:
+            task.digest = file_digest(task.source)
+        return task.digest
+
+    def original_of(self, task):
+        """Renvoie la tâche de l'image identique déjà vue, ou None
+
+        Une image qui n'est le doublon d'aucune autre devient un original
+        possible pour les suivantes.
+        """
+        candidates = self._by_size.setdefault(task.size, [])
+        if candidates:
+            partial = self._partial(task)
+            for candidate in candidates:
+                if self._partial(candidate) != partial:
+                    continue
+                if task.size <= 2 * PARTIAL_CHUNK or self._full(candidate) == self._full(task):
+                    return candidate
+        candidates.append(task)
+        return None
@@ -0,0 +1,190 @@
+"""Encodeurs des images produites : JPEG, WebP, AVIF, PNG ou HEIF
+
+Chaque encodeur propose un préréglage de vitesse qui arbitre entre le temps
+de calcul et la taille des fichiers :
+
+* "fast" : encodage le plus rapide, fichiers plus gros ;
+* "balanced" : bon compromis (par défaut) ;
+* "small" : fichiers les plus petits, encodage plus lent.
+
+Les encodeurs sont de simples objets transmis aux processus de travail.
+"""
+
+JPEG_QUALITY = 95
+SPEED_PRESETS = ("fast", "balanced", "small")
+JPEG_SUBSAMPLINGS = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+
+class Encoder:
+    """Encodeur de base : format Pillow, extension et réglages d'enregistrement"""
+    name = None
+    pillow_format = None
+    extension = None
+    default_quality = 90
+    modes = ("RGB", "RGBA", "L", "LA")  # modes acceptés sans conversion
+    passthrough = False  # le fichier source peut être repris tel quel
+    builtin = False  # toujours disponible avec Pillow
+
+    def __init__(self, quality=None, speed="balanced"):
+        if speed not in SPEED_PRESETS:
+            raise ValueError(f"Préréglage de vitesse inconnu : {speed!r}")
+        if quality is not None and not 1 <= quality <= 100:
+            raise ValueError("La qualité doit être comprise entre 1 et 100.")
+        self.quality = self.default_quality if quality is None else quality
+        self.speed = speed
+
+    def check_available(self):
+        """Vérifie que Pillow sait écrire ce format (lève ValueError sinon)"""
+        if self.builtin:
+            return
+        from heiconverter.engine import load_codecs
+        Image = load_codecs()
+        Image.init()
+        if self.pillow_format not in Image.SAVE:
+            raise ValueError(f"Le format {self.name.upper()} n'est pas disponible avec cette version de Pillow.")
+
+    def describe(self):
+        """Réglages qui influent sur le fichier produit (pour le manifeste)"""
+        return {'format': self.name, 'quality': self.quality, 'speed': self.speed}
+
+    def save_params(self):
+        return {'quality': self.quality}
+
+    def metadata_params(self, metadata):
+        """Paramètres d'enregistrement des métadonnées (EXIF, ICC, XMP)"""
+        return dict(metadata)
+
+    def prepare(self, image):
+        """Convertit l'image dans un mode que le format sait écrire"""
+        if image.mode in self.modes:
+            return image
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        return image.convert("RGBA" if has_alpha and "RGBA" in self.modes else "RGB")
+
+    def save(self, image, path, metadata=None):
+        prepared = self.prepare(image)
+        params = self.save_params()
+        if metadata:
+            params.update(self.metadata_params(metadata))
+        try:
+            prepared.save(path, self.pillow_format, **params)
+        finally:
+            if prepared is not image:
+                prepared.close()
+
+
+class JpegEncoder(Encoder):
+    name = "jpeg"
+    pillow_format = "JPEG"
+    extension = ".jpg"
+    default_quality = JPEG_QUALITY
+    modes = ("RGB", "L", "CMYK")
+    builtin = True
+
+    def __init__(self, quality=None, speed="balanced", subsampling=None, progressive=None, optimize=None):
+        super().__init__(quality, speed)
+        if subsampling is not None and subsampling not in JPEG_SUBSAMPLINGS:
+            raise ValueError(f"Sous-échantillonnage inconnu : {subsampling!r}")
+        self.subsampling = subsampling
+        # Optimisation des tables de Huffman et JPEG progressif selon la vitesse
+        self.optimize = speed != "fast" if optimize is None else optimize
+        self.progressive = speed == "small" if progressive is None else progressive
+
+    def describe(self):
+        return dict(super().describe(), subsampling=self.subsampling,
+                    optimize=self.optimize, progressive=self.progressive)
+
+    def save_params(self):
+        params = {'quality': self.quality, 'optimize': self.optimize, 'progressive': self.progressive}
+        if self.subsampling is not None:
+            params['subsampling'] = JPEG_SUBSAMPLINGS[self.subsampling]
+        return params
+
+
+class WebpEncoder(Encoder):
+    name = "webp"
+    pillow_format = "WEBP"
+    extension = ".webp"
+    methods = {"fast": 1, "balanced": 4, "small": 6}
+
+    def save_params(self):
+        return {'quality': self.quality, 'method': self.methods[self.speed]}
+
+
+class AvifEncoder(Encoder):
+    name = "avif"
+    pillow_format = "AVIF"
+    extension = ".avif"
+    default_quality = 75
+    speeds = {"fast": 9, "balanced": 6, "small": 3}
+
+    def check_available(self):
+        try:
+            # Greffon pour les versions de Pillow sans AVIF intégré
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+        try:
+            super().check_available()
+        except ValueError as e:
+            raise ValueError(f"{e} Installez Pillow 11.2 ou plus récent, ou pillow-avif-plugin.")
+
+    def save_params(self):
+        return {'quality': self.quality, 'speed': self.speeds[self.speed]}
+
+
+class PngEncoder(Encoder):
+    name = "png"
+    pillow_format = "PNG"
+    extension = ".png"
+    modes = ("RGB", "RGBA", "L", "LA", "I;16")
+    builtin = True
+    levels = {"fast": 1, "balanced": 6, "small": 9}
+
+    def describe(self):
+        # PNG est sans perte : la qualité n'a pas d'effet
+        return {'format': self.name, 'speed': self.speed}
+
+    def save_params(self):
+        return {'compress_level': self.levels[self.speed], 'optimize': self.speed == "small"}
+
+    def metadata_params(self, metadata):
+        # Pillow n'écrit pas le XMP des PNG : il passe par un bloc iTXt standard
+        params = {key: value for key, value in metadata.items() if key != "xmp"}
+        if "xmp" in metadata:
+            from PIL.PngImagePlugin import PngInfo
+            info = PngInfo()
+            xmp = metadata["xmp"]
+            info.add_itxt("XML:com.adobe.xmp", xmp.decode('utf-8', 'replace') if isinstance(xmp, bytes) else xmp)
+            params['pnginfo'] = info
+        return params
+
+
+class HeifEncoder(Encoder):
+    """Conserve le format HEIF
+
+    En taille d'origine, le fichier source est repris tel quel, sans décodage
+    ni réencodage ; les tailles réduites sont réencodées en HEIF.
+    """
+    name = "heif"
+    pillow_format = "HEIF"
+    extension = ".heic"
+    default_quality = 80
+    presets = {"fast": "ultrafast", "balanced": "medium", "small": "slower"}
+    passthrough = True
+
+    def save_params(self):
+        return {'quality': self.quality, 'enc_params': {'preset': self.presets[self.speed]}}
+
+
+ENCODERS = {encoder.name: encoder for encoder in
+            (JpegEncoder, WebpEncoder, AvifEncoder, PngEncoder, HeifEncoder)}
+
+
+def create_encoder(name="jpeg", **settings):
+    """Crée l'encodeur d'un format ("jpeg", "webp", "avif", "png" ou "heif")"""
+    try:
+        encoder_class = ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Format de sortie inconnu : {name!r}")
+    return encoder_class(**settings)
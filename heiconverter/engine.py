@@ -0,0 +1,679 @@
+"""Moteur de conversion parallèle en étapes lecture → décodage → encodage → écriture
+
+Les lectures, les écritures et les copies se font dans des threads du
+processus principal ; seuls le décodage et l'encodage, qui occupent le
+processeur, passent par le pool de processus. Une image décodée ne quitte
+jamais le processus de travail : seuls les octets du fichier source et des
+fichiers encodés transitent entre les étapes.
+
+Le nombre de tâches en vol est borné et, si un budget mémoire est fixé,
+chaque image réserve avant sa lecture une estimation de la mémoire dont elle
+aura besoin, libérée dès que ses fichiers sont écrits.
+
+Avec un délai par fichier, une image dont le décodage et l'encodage
+dépassent ce délai est abandonnée : le pool de processus est remplacé et les
+images qui s'y trouvaient sont relancées dans le nouveau pool. Une image qui
+fait tomber son processus de travail est repérée en rejouant seules les
+images touchées : les autres ne paient pas pour elle.
+"""
+import io
+import json
+import os
+import signal
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Optional
+
+from heiconverter.containers import container_images, part_destination
+from heiconverter.copying import copy_file, write_file
+from heiconverter.dedup import DEDUP_COPY_MODES
+from heiconverter.failures import retry_io
+from heiconverter.encoders import JpegEncoder
+from heiconverter.isobmff import describe_content, image_dimensions, read_header
+from heiconverter.metadata import (auto_orient, describe_metadata, encode_sidecar, image_metadata,
+                                   read_metadata, sidecar_path)
+from heiconverter.preview import make_thumbnail
+from heiconverter.sizes import FULL_SIZE, output_paths, render_sizes
+
+HEIC_EXTENSIONS = ('.heic', '.heif')
+POOL_KINDS = ("process", "thread")
+# Arrêt forcé d'un processus de travail ; sous Windows, os.kill appelle TerminateProcess
+KILL_SIGNAL = getattr(signal, 'SIGKILL', signal.SIGTERM)
+
+# Estimation de la mémoire d'une image décodée
+BYTES_PER_PIXEL = 4
+DECODED_SIZE_RATIO = 24  # taille décodée / taille du fichier, quand l'en-tête est illisible
+
+
+_image_module = None
+
+
+def load_codecs():
+    """Charge Pillow et le décodeur HEIF au premier besoin
+
+    L'import est différé pour que le cœur de conversion reste rapide à
+    importer ; chaque processus de travail le fait une seule fois.
+    """
+    global _image_module
+    if _image_module is None:
+        from PIL import Image
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        _image_module = Image
+    return _image_module
+
+
+def can_decode(format_id):
+    """Indique si Pillow sait ouvrir un format, "AVIF" par exemple, selon sa version"""
+    Image = load_codecs()
+    Image.init()
+    return format_id in Image.OPEN
+
+
+def _init_worker(started=None):
+    """Initialisation d'un processus de travail
+
+    Le numéro du processus est publié dans `started`, pour pouvoir l'arrêter
+    de force quand une image dépasse son délai (voir WorkerPools).
+    """
+    if started is not None:
+        started.put(os.getpid())
+    # Ctrl+C et l'arrêt d'un service, envoyés à tout le groupe de processus,
+    # sont gérés par le processus principal, qui annule proprement
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    load_codecs()
+
+
+def default_worker_count():
+    """Nombre de processus par défaut : un par cœur disponible"""
+    return os.cpu_count() or 1
+
+
+@dataclass
+class OutputSettings:
+    """Réglages des fichiers produits, transmis aux processus de travail"""
+    encoder: object = field(default_factory=JpegEncoder)
+    copy_mode: str = "copy"
+    sizes: tuple = (FULL_SIZE,)
+    dedup_mode: str = "off"  # voir heiconverter.dedup.DEDUP_MODES
+    keep_metadata: bool = True  # recopie l'EXIF, le profil ICC et le XMP
+    auto_orient: bool = False  # redresse les images selon leur orientation EXIF
+    sidecar: bool = False  # exporte les métadonnées dans un fichier JSON annexe
+    images: object = "primary"  # images du conteneur : voir heiconverter.containers.parse_images
+    preview_size: Optional[int] = None  # bord des miniatures d'aperçu, None : pas d'aperçu
+
+
+@dataclass
+class ConversionTask:
+    """Traitement à effectuer sur un fichier source"""
+    source: str
+    destination: str
+    action: str  # "convert", "copy", "duplicate", "reject" (contenu invalide) ou "skip" (déjà à jour)
+    size: Optional[int] = None
+    mtime_ns: Optional[int] = None
+    digest: Optional[str] = None
+    duplicate_of: Optional["ConversionTask"] = None  # image identique déjà convertie
+    outputs: Optional[list] = None  # fichiers produits en plus de la destination, une fois la tâche faite
+    content: Optional[str] = None  # type lu dans l'en-tête, voir heiconverter.isobmff.sniff
+
+
+@dataclass
+class ConversionResult:
+    """Résultat du traitement d'un fichier"""
+    task: ConversionTask
+    error: Optional[str] = None
+    method: Optional[str] = None  # mode de copie réellement utilisé
+    outputs: list = field(default_factory=list)  # fichiers produits en plus de la destination
+    timings: dict = field(default_factory=dict)  # durée de chaque étape, en secondes
+    bytes_out: int = 0  # taille des fichiers produits
+    preview: Optional[object] = None  # miniature d'aperçu, voir heiconverter.preview
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            'action': self.task.action,
+            'source': self.task.source,
+            'destination': self.task.destination,
+            'status': 'ok' if self.ok else 'error',
+            'error': self.error,
+            'method': self.method,
+            'outputs': self.outputs,
+            'original': self.task.duplicate_of.source if self.task.duplicate_of else None,
+            'bytes_out': self.bytes_out,
+            'timings': {stage: round(seconds, 6) for stage, seconds in self.timings.items()},
+        }
+
+
+def read_source(path):
+    """Étape de lecture : contenu complet du fichier source, erreurs passagères retentées"""
+    return retry_io(_read_file, path)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def decoded_images(data, selection):
+    """Produit (suffixe, image décodée) pour les images choisies du fichier source
+
+    L'image principale seule passe par l'ouverture Pillow habituelle ; les
+    autres choix analysent le conteneur une fois (voir heiconverter.containers).
+    L'appelant ferme chaque image.
+    """
+    if selection == "primary":
+        Image = load_codecs()
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            yield "", img
+    else:
+        load_codecs()
+        yield from container_images(data, selection)
+
+
+def encode_sizes(img, settings, timings, preview=False):
+    """Encode une image décodée dans chaque taille de `settings.sizes`
+
+    Les métadonnées sont lues dans l'image déjà décodée. Avec `preview`, la
+    miniature d'aperçu est tirée de la plus petite taille produite. Renvoie
+    les octets encodés et la miniature (ou None).
+    """
+    encoded = {}
+    thumbnail = None
+    smallest = min(settings.sizes, key=lambda size: size.max_edge or float('inf'))
+    metadata = image_metadata(img) if settings.keep_metadata else None
+    previous_image = previous_data = None
+    renditions = render_sizes(img, settings.sizes)
+    while True:
+        start = time.perf_counter()
+        rendition = next(renditions, None)
+        timings['resize'] += time.perf_counter() - start
+        if rendition is None:
+            break
+        size, image = rendition
+        if image is not previous_image:
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            settings.encoder.save(image, buffer, metadata)
+            previous_image, previous_data = image, buffer.getvalue()
+            buffer.close()
+            timings['encode'] += time.perf_counter() - start
+        # Sinon, image déjà plus petite que cette taille : mêmes octets, sans réencodage
+        encoded[size] = previous_data
+        if preview and size == smallest:
+            start = time.perf_counter()
+            thumbnail = make_thumbnail(image, settings.preview_size)
+            timings['preview'] = time.perf_counter() - start
+    return [encoded[size] for size in settings.sizes], thumbnail
+
+
+def encode_image(data, settings):
+    """Étapes de décodage et d'encodage, exécutées dans un processus de travail
+
+    Décode chaque image choisie une seule fois et renvoie, pour chacune, son
+    suffixe et les octets encodés pour chaque taille, dans l'ordre de
+    `settings.sizes`, puis la durée des étapes, la description des
+    métadonnées pour le fichier annexe et la miniature d'aperçu. Les images
+    décodées sont fermées explicitement pour libérer leur mémoire au plus tôt.
+    """
+    parts = []
+    description = thumbnail = None
+    timings = {'decode': 0.0, 'resize': 0.0, 'encode': 0.0}
+    images = decoded_images(data, settings.images)
+    while True:
+        start = time.perf_counter()
+        decoded = next(images, None)
+        timings['decode'] += time.perf_counter() - start
+        if decoded is None:
+            break
+        part, source_img = decoded
+        try:
+            img = auto_orient(source_img) if settings.auto_orient else source_img
+            if settings.sidecar and not part:
+                description = describe_metadata(img)
+            encoded, part_thumbnail = encode_sizes(img, settings, timings,
+                                                   preview=bool(settings.preview_size) and not part)
+            parts.append((part, encoded))
+            thumbnail = thumbnail or part_thumbnail
+            if img is not source_img:
+                img.close()
+        finally:
+            source_img.close()
+    return parts, timings, description, thumbnail
+
+
+def write_outputs(task, settings, parts, description=None):
+    """Étape d'écriture des fichiers encodés et du fichier annexe
+
+    Renvoie les fichiers produits en plus de la destination principale et le
+    nombre d'octets écrits.
+    """
+    outputs = []
+    written = 0
+    for part, encoded in parts:
+        paths = output_paths(part_destination(task.destination, part), settings.sizes)
+        for (size, path), data in zip(paths, encoded):
+            write_file(path, data)
+            written += len(data)
+            if path != task.destination:
+                outputs.append(path)
+    if description is not None:
+        written += write_sidecar(task, description)
+        outputs.append(sidecar_path(task.destination))
+    return outputs, written
+
+
+def write_sidecar(task, description):
+    """Écrit le fichier annexe des métadonnées et renvoie sa taille"""
+    data = encode_sidecar(description, task.source)
+    write_file(sidecar_path(task.destination), data)
+    return len(data)
+
+
+def passthrough(settings):
+    """Même format et même taille : le fichier source est repris sans décodage"""
+    return (settings.encoder.passthrough and settings.sizes == (FULL_SIZE,) and settings.keep_metadata
+            and settings.images == "primary")
+
+
+def convert_image(task, settings, timings, encode=encode_image):
+    """Convertit une image : lecture, décodage et encodage, écriture
+
+    `encode` exécute les étapes de décodage et d'encodage, dans le processus
+    courant par défaut. La durée de chaque étape est ajoutée à `timings`.
+    Renvoie les fichiers produits en plus de la destination principale, le
+    nombre d'octets écrits et la miniature d'aperçu (ou None).
+    """
+    if passthrough(settings):
+        copy_mode = "copy" if settings.copy_mode == "skip" else settings.copy_mode
+        start = time.perf_counter()
+        copy_file(task.source, task.destination, copy_mode)
+        timings['copy'] = time.perf_counter() - start
+        written = task.size or os.path.getsize(task.source)
+        if not settings.sidecar:
+            return [], written, None
+        written += write_sidecar(task, read_metadata(task.source))
+        return [sidecar_path(task.destination)], written, None
+
+    start = time.perf_counter()
+    data = read_source(task.source)
+    timings['read'] = time.perf_counter() - start
+
+    parts, encode_timings, description, thumbnail = encode(data, settings)
+    del data
+    timings.update(encode_timings)
+
+    start = time.perf_counter()
+    outputs, written = write_outputs(task, settings, parts, description)
+    timings['write'] = time.perf_counter() - start
+    return outputs, written, thumbnail
+
+
+def copy_duplicate(task, settings):
+    """Reproduit pour un doublon les fichiers produits pour son original
+
+    Chaque fichier de l'original est repris sous le nom du doublon
+    (IMG_0001_depth.jpg -> IMG_0002_depth.jpg). Renvoie le mode de copie
+    utilisé et les fichiers produits en plus de la destination principale.
+    """
+    if settings.dedup_mode == "list":
+        return "skip", []
+    mode = DEDUP_COPY_MODES[settings.dedup_mode]
+    original = task.duplicate_of
+    originals = original.outputs
+    if originals is None:
+        originals = [path for size, path in output_paths(original.destination, settings.sizes)[1:]]
+        if settings.sidecar:
+            originals.append(sidecar_path(original.destination))
+    original_stem = os.path.splitext(os.path.basename(original.destination))[0]
+    stem = os.path.splitext(task.destination)[0]
+    method = copy_file(original.destination, task.destination, mode)
+    outputs = []
+    for path in originals:
+        target = stem + os.path.basename(path)[len(original_stem):]
+        if path == sidecar_path(original.destination):
+            # Mêmes métadonnées, mais le fichier annexe désigne sa propre source
+            with open(path, encoding='utf-8') as f:
+                description = json.load(f)
+            del description['source']
+            write_sidecar(task, description)
+        else:
+            copy_file(path, target, mode)
+        outputs.append(target)
+    return method, outputs
+
+
+def process_task(task, settings, encode=encode_image):
+    """Exécute une tâche et renvoie son résultat"""
+    result = ConversionResult(task)
+    start = time.perf_counter()
+    if (task.action == "duplicate" and settings.dedup_mode != "list"
+            and not os.path.exists(task.duplicate_of.destination)):
+        # L'original n'a pas pu être converti : le doublon est converti lui-même
+        task.action = "convert"
+    try:
+        if task.action == "convert":
+            result.outputs, result.bytes_out, result.preview = convert_image(
+                task, settings, result.timings, encode)
+            task.outputs = result.outputs
+        elif task.action == "copy":
+            result.method = copy_file(task.source, task.destination, settings.copy_mode)
+            result.timings['copy'] = time.perf_counter() - start
+            if result.method != "skip":
+                result.bytes_out = task.size or os.path.getsize(task.source)
+        elif task.action == "duplicate":
+            result.method, result.outputs = copy_duplicate(task, settings)
+            result.timings['copy'] = time.perf_counter() - start
+        elif task.action == "reject":
+            raise ValueError(f"Pas une image HEIF : {describe_content(task.content)}")
+    except Exception as e:
+        result.error = str(e)
+    result.timings['total'] = time.perf_counter() - start
+    return result
+
+
+def estimate_memory(task):
+    """Estimation de la mémoire nécessaire pour convertir une image
+
+    Fichier lu, image décodée avec ses copies de travail (réductions,
+    conversion de mode) et fichiers encodés. Les dimensions viennent de
+    l'en-tête HEIF, lu sans décoder l'image.
+    """
+    file_size = task.size if task.size is not None else os.path.getsize(task.source)
+    try:
+        dimensions = image_dimensions(read_header(task.source))
+    except OSError:
+        dimensions = None
+    if dimensions is not None:
+        decoded = dimensions[0] * dimensions[1] * BYTES_PER_PIXEL
+    else:
+        decoded = file_size * DECODED_SIZE_RATIO
+    return 2 * file_size + 2 * decoded
+
+
+class MemoryBudget:
+    """Mémoire réservée par les images en cours de conversion"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, amount):
+        """Attend que la réservation tienne dans le budget
+
+        Une image seule passe toujours, même si elle dépasse le budget.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.used == 0 or self.used + amount <= self.limit)
+            self.used += amount
+
+    def release(self, amount):
+        with self._condition:
+            self.used -= amount
+            self._condition.notify_all()
+
+
+class WorkerPools:
+    """Pool de décodage/encodage et threads d'entrées-sorties
+
+    Un moteur crée ses propres pools, mais plusieurs conversions peuvent
+    aussi partager les mêmes (voir heiconverter.batch) : les processus de
+    travail restent alors chauds d'une conversion à l'autre.
+
+    Avec `pool="thread"`, le décodage et l'encodage se font dans des threads
+    du processus courant plutôt que dans des processus séparés : pas de coût
+    de démarrage ni de transfert, mais un parallélisme limité aux moments où
+    Pillow et libheif libèrent le GIL.
+    """
+
+    def __init__(self, workers=None, pool="process", io_threads=None):
+        if pool not in POOL_KINDS:
+            raise ValueError(f"Type de pool inconnu : {pool!r}")
+        self.workers = max(1, workers or default_worker_count())
+        self.pool = pool
+        self._started = weakref.WeakKeyDictionary()  # pool -> file des numéros de ses processus
+        self.processes = self._create_processes()
+        self.threads = ThreadPoolExecutor(max_workers=io_threads or self.workers * 2 + 2,
+                                          thread_name_prefix="ConversionIO")
+        self._lock = threading.Lock()
+        self._timed_out = weakref.WeakSet()  # pools arrêtés pour le délai d'une image
+        self._isolated = None  # processus unique où rejouer une image, créé au besoin
+        self._isolated_lock = threading.Lock()
+
+    def _create_processes(self, workers=None):
+        workers = workers or self.workers
+        if self.pool == "process":
+            # Import différé : multiprocessing alourdit le démarrage sans pool
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            started = multiprocessing.SimpleQueue()
+            processes = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(started,))
+            self._started[processes] = started
+            return processes
+        return ThreadPoolExecutor(max_workers=workers, initializer=load_codecs,
+                                  thread_name_prefix="ConversionCPU")
+
+    def _terminate(self, pool):
+        """Arrête de force les processus d'un pool
+
+        Les processus sont connus par les numéros qu'ils ont publiés au
+        démarrage (voir _init_worker). Les images en cours échouent avec
+        BrokenProcessPool ; des threads ne peuvent pas être arrêtés et
+        finissent leur image en arrière-plan.
+        """
+        started = self._started.pop(pool, None)
+        while started is not None and not started.empty():
+            try:
+                os.kill(started.get(), KILL_SIGNAL)
+            except OSError:
+                pass  # processus déjà terminé
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def replace_processes(self, broken, timed_out=False):
+        """Remplace le pool de décodage/encodage bloqué ou tombé en panne
+
+        `broken` est le pool constaté défaillant : s'il a déjà été remplacé,
+        rien n'est fait. `timed_out` indique qu'il est arrêté à cause du
+        délai d'une image : les autres images qui s'y trouvaient n'y sont
+        pour rien (voir was_stopped).
+        """
+        with self._lock:
+            if self.processes is not broken:
+                return
+            self.processes = self._create_processes()
+            if timed_out:
+                self._timed_out.add(broken)
+        self._terminate(broken)
+
+    def was_stopped(self, pool):
+        """Indique si un pool a été arrêté pour le délai d'une image"""
+        with self._lock:
+            return pool in self._timed_out
+
+    def run_isolated(self, function, *args, timeout=None):
+        """Exécute `function(*args)` seule dans un processus de travail dédié
+
+        Sert à rejouer une image dont le pool est tombé en panne : si ce
+        processus tombe à son tour, l'image en est la cause. Le processus
+        est remplacé après une panne ou un dépassement du délai, dont les
+        exceptions sont propagées.
+        """
+        with self._isolated_lock:
+            if self._isolated is None:
+                self._isolated = self._create_processes(1)
+            try:
+                return self._isolated.submit(function, *args).result(timeout=timeout)
+            except (FutureTimeoutError, BrokenExecutor):
+                isolated, self._isolated = self._isolated, None
+                self._terminate(isolated)
+                raise
+
+    def shutdown(self, cancel=False):
+        """Arrête les threads d'entrées-sorties puis le pool de décodage/encodage"""
+        self.threads.shutdown(wait=True, cancel_futures=cancel)
+        self.processes.shutdown(wait=True, cancel_futures=cancel)
+        with self._isolated_lock:
+            if self._isolated is not None:
+                self._isolated.shutdown(wait=True, cancel_futures=cancel)
+                self._isolated = None
+
+
+class ConversionEngine:
+    """Répartit les tâches sur plusieurs processus et restitue les résultats dans l'ordre
+
+    Avec des `pools` partagés, `workers` borne le nombre d'images de cette
+    conversion décodées ou encodées en même temps, pour laisser de la place
+    aux autres conversions. `timeout` est la durée maximale, en secondes, du
+    décodage et de l'encodage d'une image.
+    """
+
+    def __init__(self, workers=None, settings=None, memory_budget=None, io_threads=None,
+                 pool="process", pools=None, timeout=None):
+        if pool not in POOL_KINDS:
+            raise ValueError(f"Type de pool inconnu : {pool!r}")
+        self.workers = max(1, workers or (pools.workers if pools else default_worker_count()))
+        self.settings = settings or OutputSettings()
+        self.budget = MemoryBudget(memory_budget) if memory_budget else None
+        self.io_threads = io_threads
+        self.pool = pool
+        self.shared = pools is not None
+        self._pools = pools
+        self.timeout = timeout
+        self._encode_slots = None
+        if (self.shared and self.workers < pools.workers) or timeout:
+            # Avec un délai, pas plus d'images soumises que de processus : l'attente n'est pas comptée
+            self._encode_slots = threading.BoundedSemaphore(self.workers)
+        self._converting = {}  # source -> Future des conversions en cours, attendues par leurs doublons
+
+    def __enter__(self):
+        if self._pools is None and (self.workers > 1 or self.timeout):
+            self._pools = WorkerPools(self.workers, self.pool, self.io_threads)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(cancel=exc_type is not None)
+
+    def shutdown(self, cancel=False):
+        """Arrête les pools du moteur ; des pools partagés restent à leur propriétaire"""
+        if self._pools is not None and not self.shared:
+            self._pools.shutdown(cancel)
+            self._pools = None
+
+    def _encode_in_pool(self, data, settings):
+        if self._encode_slots is None:
+            return self._encode_with_retries(data, settings)
+        with self._encode_slots:
+            return self._encode_with_retries(data, settings)
+
+    def _encode_with_retries(self, data, settings):
+        """Encode une image dans le pool, en la relançant si le pool est remplacé entre-temps
+
+        Une image dont le pool a été arrêté pour le délai d'une autre image
+        est relancée autant de fois que nécessaire. Quand un processus tombe
+        en panne, l'image responsable est inconnue : chaque image touchée
+        est rejouée seule, et seule celle qui fait tomber son processus
+        dédié échoue.
+        """
+        while True:
+            processes = self._pools.processes
+            try:
+                return processes.submit(encode_image, data, settings).result(timeout=self.timeout)
+            except FutureTimeoutError:
+                self._pools.replace_processes(processes, timed_out=True)
+                raise self._timeout_error() from None
+            except BrokenExecutor:
+                if self._pools.was_stopped(processes):
+                    continue  # pool arrêté pour le délai d'une autre image
+                self._pools.replace_processes(processes)
+                break
+            except RuntimeError:
+                if processes is self._pools.processes:
+                    raise  # pool arrêté : conversion annulée
+
+        try:
+            return self._pools.run_isolated(encode_image, data, settings, timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self._timeout_error() from None
+        except BrokenExecutor:
+            raise RuntimeError("Le décodage de cette image fait tomber le processus de travail") from None
+
+    def _timeout_error(self):
+        return TimeoutError(f"Délai de {self.timeout:g} s dépassé : image abandonnée")
+
+    def _submit(self, task):
+        """Lance une tâche et renvoie le Future de son résultat"""
+        if (task.action in ("skip", "reject")
+                or (task.action == "copy" and self.settings.copy_mode == "skip")
+                or (task.action == "duplicate" and self.settings.dedup_mode == "list")):
+            # Rien à faire : inutile de passer par les threads
+            future = Future()
+            future.set_result(process_task(task, self.settings))
+            return future
+
+        if task.action == "duplicate":
+            original = self._converting.get(task.duplicate_of.source)
+            if original is not None:
+                return self._after(original, task)
+
+        if task.action != "convert" or self.budget is None:
+            future = self._pools.threads.submit(process_task, task, self.settings, self._encode_in_pool)
+        else:
+            reserved = estimate_memory(task)
+            self.budget.acquire(reserved)
+            future = self._pools.threads.submit(process_task, task, self.settings, self._encode_in_pool)
+            future.add_done_callback(lambda f: self.budget.release(reserved))
+
+        if task.action == "convert":
+            self._converting[task.source] = future
+            future.add_done_callback(lambda f: self._converting.pop(task.source, None))
+        return future
+
+    def _after(self, original, task):
+        """Lance le traitement d'un doublon une fois son original converti
+
+        Le doublon n'occupe pas de thread pendant l'attente : il n'est soumis
+        qu'à la fin de la conversion de l'original.
+        """
+        future = Future()
+
+        def submit(done):
+            try:
+                inner = self._pools.threads.submit(process_task, task, self.settings, self._encode_in_pool)
+            except RuntimeError as e:  # threads arrêtés : conversion annulée
+                future.set_exception(e)
+                return
+            inner.add_done_callback(lambda f: future.set_result(f.result()))
+
+        original.add_done_callback(submit)
+        return future
+
+    def run(self, tasks):
+        """Traite les tâches et renvoie les résultats dans l'ordre de soumission
+
+        Le nombre de tâches en vol est borné, ce qui permet de consommer un
+        générateur de tâches au fur et à mesure sans tout charger en mémoire.
+        """
+        if self._pools is None:
+            for task in tasks:
+                yield process_task(task, self.settings)
+            return
+
+        pending = deque()
+        max_pending = self.workers * 4
+        for task in tasks:
+            pending.append(self._submit(task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
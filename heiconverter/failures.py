@@ -0,0 +1,146 @@
+"""Erreurs passagères et liste des fichiers en échec
+
+Un fichier verrouillé un instant par un antivirus ou un outil de
+synchronisation, ou un partage réseau qui hoquette, ne doit pas faire
+échouer une image : ces erreurs sont retentées quelques fois, avec une
+attente qui double à chaque essai.
+
+Les fichiers qui échouent malgré tout sont mis en quarantaine dans
+heiconverter-failed.json, dans le dossier de sortie, avec leur erreur et le
+nombre de tentatives. Une conversion lancée avec `retry_failed` ne traite
+que ces fichiers, sans reparcourir le dossier d'entrée ; chaque fichier
+réussi quitte la liste. Le nom de sortie attribué à chaque fichier est
+enregistré avec lui : une relance ne voit pas les fichiers qui l'avaient
+fait renommer (IMG_1_heic.jpg à côté de IMG_1.jpg) et reprend donc ce nom.
+"""
+import errno
+import json
+import os
+import time
+
+FAILED_NAME = "heiconverter-failed.json"
+FAILED_VERSION = 1
+
+RETRY_ATTEMPTS = 3  # essais au total pour une opération d'entrée-sortie
+RETRY_DELAY = 0.2  # attente avant le deuxième essai, en secondes, doublée ensuite
+
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EBUSY, errno.EIO, errno.ETIMEDOUT, errno.ECONNRESET,
+                    getattr(errno, 'ESTALE', errno.EIO)}
+# Windows : fichier utilisé par un autre processus, verrou, réseau indisponible
+TRANSIENT_WINERRORS = {32, 33, 53, 64, 121}
+
+
+def is_transient(error):
+    """Indique si une erreur d'entrée-sortie a des chances de disparaître d'elle-même"""
+    if not isinstance(error, OSError):
+        return False
+    return (error.errno in TRANSIENT_ERRNOS
+            or getattr(error, 'winerror', None) in TRANSIENT_WINERRORS)
+
+
+def retry_io(function, *args, attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY):
+    """Appelle `function(*args)` et la retente après une erreur passagère
+
+    Les autres erreurs, et la dernière erreur passagère, sont propagées.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return function(*args)
+        except OSError as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+        time.sleep(delay * 2 ** (attempt - 1))
+
+
+def failed_path(output_folder):
+    return os.path.join(output_folder, FAILED_NAME)
+
+
+class FailedFiles:
+    """Fichiers en échec d'un dossier de sortie, à relancer seuls"""
+
+    def __init__(self, output_folder, input_folder, files=None):
+        self.output_folder = output_folder
+        self.input_folder = os.path.abspath(input_folder)
+        self.files = files if files is not None else {}
+        self._changed = False
+
+    @classmethod
+    def load(cls, output_folder, input_folder):
+        """Liste enregistrée, vide si elle concerne un autre dossier d'entrée"""
+        try:
+            with open(failed_path(output_folder), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(output_folder, input_folder)
+        if data.get('version') != FAILED_VERSION or data.get('input_folder') != os.path.abspath(input_folder):
+            return cls(output_folder, input_folder)
+        return cls(output_folder, input_folder, data.get('files', {}))
+
+    def __len__(self):
+        return len(self.files)
+
+    def key(self, source):
+        return os.path.relpath(source, self.input_folder).replace(os.sep, '/')
+
+    def sources(self):
+        """Chemins des fichiers en échec"""
+        return [os.path.join(self.input_folder, *key.split('/')) for key in self.files]
+
+    def add(self, result):
+        """Enregistre l'échec d'un fichier et compte les tentatives"""
+        key = self.key(result.task.source)
+        previous = self.files.get(key, {})
+        self.files[key] = {
+            'action': result.task.action,
+            'output': os.path.relpath(result.task.destination, self.output_folder).replace(os.sep, '/'),
+            'error': result.error,
+            'attempts': previous.get('attempts', 0) + 1,
+            'last_failure': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self._changed = True
+
+    def destination(self, task):
+        """Destination attribuée à la tâche lors de son échec, ou None
+
+        Le nom n'est repris que si le fichier est aiguillé de la même façon :
+        un fichier rejeté puis réparé reçoit le nom d'une image convertie.
+        """
+        entry = self.files.get(self.key(task.source))
+        if entry is None or 'output' not in entry or entry.get('action') != task.action:
+            return None
+        return os.path.join(self.output_folder, *entry['output'].split('/'))
+
+    def reserved(self, path, source):
+        """Indique si un fichier produit remplacerait un fichier existant d'une autre source
+
+        Sert à la relance des échecs, qui ne parcourt pas les autres
+        fichiers : tout fichier déjà présent dans le dossier de sortie est
+        protégé, sauf la destination enregistrée pour `source`.
+        """
+        if not os.path.exists(path):
+            return False
+        entry = self.files.get(self.key(source), {})
+        own = entry.get('output')
+        return own is None or os.path.normcase(path) != os.path.normcase(
+            os.path.join(self.output_folder, *own.split('/')))
+
+    def discard(self, source):
+        """Retire un fichier réussi ou disparu"""
+        if self.files.pop(self.key(source), None) is not None:
+            self._changed = True
+
+    def save(self):
+        """Enregistre la liste de façon atomique, ou la supprime si elle est vide"""
+        if not self._changed:
+            return
+        path = failed_path(self.output_folder)
+        if not self.files:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            # Import différé : heiconverter.copying dépend de ce module
+            from heiconverter.copying import write_file
+            data = {'version': FAILED_VERSION, 'input_folder': self.input_folder, 'files': self.files}
+            write_file(path, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+        self._changed = False
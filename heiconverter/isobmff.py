@@ -0,0 +1,120 @@
+"""Lecture minimale des boîtes ISO-BMFF (HEIF, AVIF) sans décoder l'image"""
+import struct
+
+# Les métadonnées d'un HEIC (boîte meta) se trouvent en tête de fichier
+HEADER_READ_SIZE = 64 * 1024
+# La boîte ftyp ouvre le fichier et ne fait que quelques dizaines d'octets
+SNIFF_SIZE = 64
+
+# Marques de la boîte ftyp : HEVC d'abord, AVIF ensuite, HEIF générique en dernier
+HEVC_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'hevm', b'hevs'}
+AVIF_BRANDS = {b'avif', b'avis'}
+HEIF_BRANDS = {b'mif1', b'msf1', b'mif2', b'miaf'}
+
+# Signatures des autres formats reconnus
+SIGNATURES = ((b'\xff\xd8\xff', "jpeg"), (b'\x89PNG\r\n\x1a\n', "png"))
+
+CONTENT_DESCRIPTIONS = {
+    "empty": "fichier vide",
+    "isobmff": "conteneur ISO-BMFF sans image HEIF (vidéo ?)",
+    None: "en-tête non reconnu",
+}
+
+
+def read_header(path, size=HEADER_READ_SIZE):
+    """Lit le début d'un fichier"""
+    with open(path, 'rb') as f:
+        return f.read(size)
+
+
+def sniff(data):
+    """Type de contenu d'après les premiers octets d'un fichier
+
+    Renvoie "heif", "avif", "jpeg", "png", "isobmff" (autre conteneur,
+    vidéo par exemple), "empty" ou None si l'en-tête n'est pas reconnu.
+    """
+    if not data:
+        return "empty"
+    for signature, content in SIGNATURES:
+        if data.startswith(signature):
+            return content
+    if len(data) < 12 or data[4:8] != b'ftyp':
+        return None
+    size = min(struct.unpack_from(">I", data)[0], len(data))
+    # Marque principale, version mineure, puis marques compatibles
+    brands = {data[8:12]} | {data[offset:offset + 4] for offset in range(16, size - 3, 4)}
+    if brands & HEVC_BRANDS:
+        return "heif"
+    if brands & AVIF_BRANDS:
+        return "avif"
+    if brands & HEIF_BRANDS:
+        return "heif"
+    return "isobmff"
+
+
+def sniff_file(path):
+    """Type de contenu d'un fichier, voir sniff : seuls quelques octets sont lus"""
+    return sniff(read_header(path, SNIFF_SIZE))
+
+
+def describe_content(content):
+    """Raison du rejet d'un fichier qui n'est pas une image HEIF"""
+    return CONTENT_DESCRIPTIONS.get(content, content)
+
+
+def iter_boxes(data, start=0, end=None):
+    """Produit (type, début du contenu, fin) pour chaque boîte entre start et end
+
+    Les boîtes tronquées par la fin des données sont bornées à `end`.
+    """
+    end = len(data) if end is None else min(end, len(data))
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, min(offset + size, end)
+        offset += size
+
+
+def find_box(data, path, start=0, end=None):
+    """Cherche une boîte par son chemin, par exemple (b'meta', b'iprp', b'ipco')
+
+    Renvoie (début du contenu, fin) ou None. La boîte meta est une « full
+    box » : ses 4 premiers octets (version et drapeaux) sont sautés.
+    """
+    for box_type, box_start, box_end in iter_boxes(data, start, end):
+        if box_type != path[0]:
+            continue
+        if box_type == b'meta':
+            box_start += 4
+        if len(path) == 1:
+            return box_start, box_end
+        return find_box(data, path[1:], box_start, box_end)
+    return None
+
+
+def image_dimensions(data):
+    """Dimensions de la plus grande image décrite dans l'en-tête, ou None
+
+    Les propriétés « ispe » donnent la taille de chaque élément (image
+    principale, tuiles, miniatures) : la plus grande est l'image complète.
+    """
+    found = find_box(data, (b'meta', b'iprp', b'ipco'))
+    if found is None:
+        return None
+    dimensions = []
+    for box_type, box_start, box_end in iter_boxes(data, *found):
+        if box_type == b'ispe' and box_end - box_start >= 12:
+            dimensions.append(struct.unpack_from(">II", data, box_start + 4))
+    if not dimensions:
+        return None
+    return max(dimensions, key=lambda size: size[0] * size[1])
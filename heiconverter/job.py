@@ -0,0 +1,448 @@
+"""Conversion exécutée en arrière-plan, pilotée par une file d'événements"""
+import cProfile
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from heiconverter.dedup import Deduplicator
+from heiconverter.engine import (ConversionEngine, ConversionTask, HEIC_EXTENSIONS, can_decode,
+                                 default_worker_count)
+from heiconverter.failures import FailedFiles
+from heiconverter.isobmff import sniff_file
+from heiconverter.manifest import Manifest
+from heiconverter.options import resolve_output_folder
+from heiconverter.planner import ConversionPlan, resolve_collisions
+from heiconverter.report import RunReport
+from heiconverter.scanner import scan_files, scanned_file
+
+# Événements qui terminent une conversion
+FINAL_EVENTS = ("empty", "done", "planned", "cancelled", "error")
+
+# Extensions annonçant une image HEIF (.hif : appareils Fujifilm)
+HEIF_NAMES = HEIC_EXTENSIONS + ('.hif',)
+# Fichiers dont l'en-tête est lu pour choisir l'action : quelques octets chacun
+SNIFF_EXTENSIONS = HEIF_NAMES + ('.avif', '.jpg', '.jpeg')
+# Extension rendue à une image copiée qui portait un nom HEIC
+CONTENT_EXTENSIONS = {"jpeg": ".jpg", "png": ".png", "avif": ".avif"}
+
+
+@dataclass
+class JobEvent:
+    """Événement émis par une conversion en cours
+
+    Types : "empty", "plan", "plan_task", "planned" (simulation terminée),
+    "output_created", "start", "scanned", "collision", "result", "done",
+    "cancelled" et "error".
+    """
+    kind: str
+    data: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        """Représentation sérialisable en JSON"""
+        event = {'event': self.kind}
+        for key, value in self.data.items():
+            if key == 'result':
+                event.update(value.to_dict())
+            else:
+                event[key] = value
+        return event
+
+
+def output_name(name, action, content, extension=".jpg"):
+    """Nom du fichier produit pour un fichier aiguillé par route_file"""
+    stem = os.path.splitext(name)[0]
+    if action == "convert":
+        return stem + extension
+    if action == "copy" and name.lower().endswith(HEIF_NAMES) and content in CONTENT_EXTENSIONS:
+        return stem + CONTENT_EXTENSIONS[content]
+    return name
+
+
+def route_file(scanned):
+    """Action et type de contenu d'un fichier découvert
+
+    Les images sont aiguillées d'après la boîte ftyp ou la signature en tête
+    du fichier, pas d'après leur extension : un HEIC nommé .jpg est converti,
+    un JPEG nommé .heic est copié sous le nom .jpg (voir output_name) et un
+    .heic qui n'est pas une image est rejeté sans être décodé. Les autres
+    fichiers sont copiés.
+    """
+    lower_name = scanned.name.lower()
+    if not lower_name.endswith(SNIFF_EXTENSIONS):
+        return "copy", None
+    heif_name = lower_name.endswith(HEIF_NAMES)
+    try:
+        content = sniff_file(scanned.path)
+    except OSError:
+        # Fichier illisible : l'erreur sera signalée par le traitement
+        return ("convert", None) if heif_name else ("copy", None)
+
+    if content == "heif" or (content == "avif" and can_decode("AVIF")):
+        return "convert", content
+    if heif_name and content not in CONTENT_EXTENSIONS:
+        return "reject", content
+    return "copy", content
+
+
+def iter_tasks(input_folder, output_folder, files=None, extension=".jpg", create_folders=True,
+               known=None):
+    """Génère les tâches de conversion ou de copie des fichiers découverts
+
+    `extension` est celle des images converties. Les sous-dossiers de
+    sortie sont créés au fil de l'eau, sauf pour un simple plan. `known`
+    (voir Manifest.known_route) évite de relire l'en-tête des fichiers
+    inchangés depuis le passage précédent.
+    """
+    if files is None:
+        files = scan_files(input_folder)
+
+    created_folder = None
+    for scanned in files:
+        output_subfolder = os.path.normpath(os.path.join(output_folder, scanned.relative_dir))
+        if create_folders and output_subfolder != created_folder:
+            os.makedirs(output_subfolder, exist_ok=True)
+            created_folder = output_subfolder
+
+        route = known(scanned) if known is not None else None
+        action, content = route if route is not None else route_file(scanned)
+        destination = os.path.join(output_subfolder,
+                                   output_name(scanned.name, action, content, extension))
+        yield ConversionTask(scanned.path, destination, action,
+                             size=scanned.size, mtime_ns=scanned.mtime_ns, content=content)
+
+
+class ConversionJob:
+    """Conversion d'un dossier dans un thread dédié
+
+    Le thread ne touche jamais à l'interface : il publie des JobEvent dans
+    `events`, que l'appelant vide à son rythme.
+    """
+
+    def __init__(self, options, pools=None, files=None):
+        self.options = options
+        self.pools = pools  # pools partagés avec d'autres conversions, voir heiconverter.batch
+        self.files = files  # ScannedFile à traiter à la place du parcours complet, voir heiconverter.watch
+        self.input_folder = options.input_folder.strip()
+        self.output_folder = resolve_output_folder(options)
+        self.events = queue.Queue()
+        self.stats = {'processed': 0, 'converted': 0, 'copied': 0, 'skipped': 0,
+                      'duplicates': 0, 'rejected': 0, 'errors': 0, 'pruned': 0}
+        self.manifest = None
+        self.failed = None  # fichiers en échec, voir heiconverter.failures
+        self.report = RunReport(keep_files=options.report_path is not None)
+        self.discovered = 0
+        self.estimated_total = None
+        self.scan_complete = False
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._thread = None
+
+    def start(self):
+        """Lance la conversion en arrière-plan"""
+        self._thread = threading.Thread(target=self.run, name="ConversionJob", daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        """Suspend la distribution de nouvelles tâches"""
+        self._running.clear()
+
+    def resume(self):
+        """Reprend une conversion suspendue"""
+        self._running.set()
+
+    def cancel(self):
+        """Demande l'arrêt de la conversion (les tâches en cours se terminent)"""
+        self._cancelled.set()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def emit(self, kind, **data):
+        self.events.put(JobEvent(kind, data))
+
+    def _controlled(self, tasks):
+        """Applique la pause et l'annulation entre deux tâches"""
+        for task in tasks:
+            self._running.wait()
+            if self._cancelled.is_set():
+                return
+            yield task
+
+    def _discover(self, files):
+        """Compte et chronomètre les fichiers au fil du parcours pour ajuster le total"""
+        files = iter(files)
+        while True:
+            start = time.perf_counter()
+            scanned = next(files, None)
+            self.report.add_stage('scan', time.perf_counter() - start, count=int(scanned is not None))
+            if scanned is None:
+                break
+            self.discovered += 1
+            yield scanned
+        self.scan_complete = True
+        if self.discovered:
+            self.emit("scanned", total=self.discovered)
+
+    @property
+    def total(self):
+        """Nombre de fichiers à traiter, estimé tant que le parcours n'est pas terminé"""
+        if self.scan_complete or self.estimated_total is None:
+            return self.discovered
+        return max(self.discovered, self.estimated_total)
+
+    def _scan(self):
+        """Fichiers à traiter : parcours complet, sans le dossier de sortie, ou fichiers fournis"""
+        if self.files is not None:
+            return iter(self.files)
+        return scan_files(self.input_folder, exclude=self.output_folder)
+
+    def _failed_files(self):
+        """Fichiers de la liste des échecs encore présents ; les fichiers disparus la quittent"""
+        files = []
+        for source in self.failed.sources():
+            try:
+                files.append(scanned_file(source, self.input_folder))
+            except OSError:
+                self.failed.discard(source)
+        return files
+
+    def _collision(self, task, previous_destination):
+        self.emit("collision", source=task.source, previous=previous_destination,
+                  destination=task.destination)
+
+    def _resolve_names(self, tasks, settings, on_collision, manifest=None):
+        """Résout les collisions de noms en tenant compte des passages précédents
+
+        Les noms enregistrés dans le manifeste restent à leur fichier. Une
+        relance des échecs reprend le nom attribué à chaque fichier lors de
+        son échec et ne remplace aucun fichier déjà présent d'une autre source.
+        """
+        checks = [manifest.reserved] if manifest is not None else []
+        if self.options.retry_failed:
+            tasks = self._previous_destinations(tasks)
+            checks.append(self.failed.reserved)
+        reserved = None
+        if checks:
+            def reserved(path, source):
+                return any(check(path, source) for check in checks)
+        return resolve_collisions(tasks, settings, on_collision, reserved)
+
+    def _previous_destinations(self, tasks):
+        """Redonne aux fichiers relancés la destination de leur échec"""
+        for task in tasks:
+            task.destination = self.failed.destination(task) or task.destination
+            yield task
+
+    def plan(self, settings):
+        """Établit le plan de la conversion sans rien écrire
+
+        Parcourt le dossier, résout les collisions de noms, écarte les
+        fichiers déjà à jour en mode incrémental et estime la taille et la
+        durée. En simulation, chaque tâche prévue est publiée.
+        """
+        plan = ConversionPlan(self.input_folder, self.output_folder)
+        manifest = None
+        if self.options.incremental:
+            manifest = Manifest.load(self.output_folder, self.input_folder, self.options.settings())
+        tasks = iter_tasks(self.input_folder, self.output_folder, self._scan(),
+                           extension=settings.encoder.extension, create_folders=False,
+                           known=manifest and manifest.known_route)
+        tasks = self._resolve_names(tasks, settings, plan.add_collision, manifest)
+        for task in self._controlled(tasks):
+            if manifest is not None and manifest.check(task):
+                task.action = "skip"
+            plan.add(task)
+            if self.options.dry_run:
+                self.emit("plan_task", source=task.source, destination=task.destination,
+                          action=task.action)
+        if not self.cancelled:
+            plan.estimate(settings, self.options.workers or default_worker_count())
+        return plan
+
+    def _incremental(self, tasks):
+        """Marque comme « skip » les fichiers déjà à jour d'après le manifeste"""
+        for task in tasks:
+            start = time.perf_counter()
+            if self.manifest.check(task, self.options.hash_check):
+                task.action = "skip"
+            self.report.add_stage('check', time.perf_counter() - start)
+            yield task
+
+    def _deduplicate(self, tasks):
+        """Marque comme « duplicate » les images identiques à une image déjà rencontrée"""
+        deduplicator = Deduplicator()
+        for task in tasks:
+            if task.action == "convert":
+                start = time.perf_counter()
+                try:
+                    original = deduplicator.original_of(task)
+                except OSError:
+                    original = None  # l'erreur de lecture sera signalée par la conversion
+                self.report.add_stage('dedup', time.perf_counter() - start)
+                if original is not None:
+                    task.action = "duplicate"
+                    task.duplicate_of = original
+            yield task
+
+    def _record(self, result):
+        """Met à jour les statistiques, le manifeste et la liste des échecs après un fichier"""
+        self.stats['processed'] += 1
+        self.report.add_result(result)
+        if not result.ok:
+            self.failed.add(result)
+            self.stats['errors'] += 1
+            if result.task.action == "reject":
+                self.stats['rejected'] += 1
+            return
+        self.failed.discard(result.task.source)
+        if result.task.action == "skip":
+            self.stats['skipped'] += 1
+            return
+        if result.task.action == "convert":
+            self.stats['converted'] += 1
+        elif result.task.action == "duplicate":
+            self.stats['duplicates'] += 1
+        else:
+            self.stats['copied'] += 1
+        if self.manifest is not None and result.method != "skip":
+            self.manifest.record(result.task, result.outputs)
+            self.manifest.save_if_due()
+
+    def run(self):
+        """Exécute la conversion dans le thread courant
+
+        Avec `profile_path`, le thread est profilé par cProfile. Les processus
+        de travail n'en font pas partie : avec un seul worker, tout le
+        décodage et l'encodage se font dans ce thread et apparaissent au profil.
+        """
+        if self.options.profile_path is None:
+            self._run()
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            self._run()
+        finally:
+            profiler.disable()
+            profiler.dump_stats(self.options.profile_path)
+
+    def _run(self):
+        try:
+            settings = self.options.output_settings()
+            self.failed = FailedFiles.load(self.output_folder, self.input_folder)
+            if self.options.retry_failed:
+                self.files = self._failed_files()
+            if self.options.plan or self.options.dry_run:
+                plan = self.plan(settings)
+                if self.cancelled:
+                    self.emit("cancelled", output_folder=self.output_folder, **self.stats)
+                    return
+                if not plan.files:
+                    self.emit("empty")
+                    return
+                if self.options.dry_run:
+                    self.emit("planned", output_folder=self.output_folder, plan=plan.summary(),
+                              text=plan.format_summary())
+                    return
+                self.emit("plan", plan=plan.summary(), text=plan.format_summary())
+                if plan.problems:
+                    self.emit("error", message=" ".join(plan.problems))
+                    return
+
+            files = self._discover(self._scan())
+            first_file = next(files, None)
+            if first_file is None:
+                self.emit("empty")
+                return
+
+            if not os.path.exists(self.output_folder):
+                os.makedirs(self.output_folder)
+                self.emit("output_created", path=self.output_folder)
+
+            if self.options.incremental:
+                self.manifest = Manifest.load(self.output_folder, self.input_folder,
+                                              self.options.settings())
+                # Le total du passage précédent sert d'estimation pendant le parcours
+                self.estimated_total = self.manifest.file_count
+
+            self.emit("start", total=self.estimated_total)
+
+            tasks = iter_tasks(self.input_folder, self.output_folder,
+                               itertools.chain([first_file], files),
+                               extension=settings.encoder.extension,
+                               known=self.manifest and self.manifest.known_route)
+            tasks = self._resolve_names(tasks, settings, self._collision, self.manifest)
+            if self.manifest is not None:
+                tasks = self._incremental(tasks)
+            if self.options.dedup != "off":
+                tasks = self._deduplicate(tasks)
+
+            try:
+                memory_budget = self.options.memory_budget_mb
+                with ConversionEngine(workers=self.options.workers, settings=settings,
+                                      memory_budget=memory_budget and memory_budget * 1024 * 1024,
+                                      pool=self.options.pool, pools=self.pools,
+                                      timeout=self.options.timeout) as engine:
+                    for result in engine.run(self._controlled(tasks)):
+                        self._record(result)
+                        self.emit("result", result=result, processed=self.stats['processed'],
+                                  total=self.total, total_known=self.scan_complete)
+
+                # Le total et l'élagage n'ont de sens qu'après un parcours complet
+                if self.manifest is not None and self.scan_complete and self.files is None:
+                    self.manifest.file_count = self.discovered
+                    if self.options.prune:
+                        self.stats['pruned'] = self.manifest.prune()
+            finally:
+                # Toujours enregistrer : une conversion interrompue pourra reprendre
+                if self.manifest is not None:
+                    self.manifest.save()
+                self.failed.save()
+
+            self.report.finish()
+            if self.options.report_path is not None:
+                self.report.write(self.options.report_path)
+            self.emit("cancelled" if self.cancelled else "done",
+                      output_folder=self.output_folder, report=self.report.summary(),
+                      failed_files=len(self.failed), **self.stats)
+        except Exception as e:
+            self.emit("error", message=str(e))
+
+
+def run_conversion(options, on_event=None):
+    """Exécute une conversion complète et renvoie son événement final
+
+    `on_event` reçoit chaque JobEvent au fil de l'eau. Un Ctrl+C annule la
+    conversion proprement au lieu de l'interrompre brutalement.
+    """
+    job = ConversionJob(options)
+    job.start()
+    while True:
+        try:
+            event = job.events.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            job.cancel()
+            continue
+        if on_event is not None:
+            on_event(event)
+        if event.kind in FINAL_EVENTS:
+            return event
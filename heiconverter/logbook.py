@@ -0,0 +1,94 @@
+"""Journal de conversion borné en mémoire
+
+Seules les dernières lignes sont conservées pour l'affichage, quel que soit
+le nombre de fichiers traités ; le journal complet est écrit par lots dans
+un fichier. Les erreurs sont gardées à part pour pouvoir être affichées
+seules, et chaque catégorie de message est comptée.
+"""
+import os
+from collections import deque
+
+LOG_NAME = "heiconverter-log.txt"
+MAX_LINES = 2000  # lignes récentes conservées pour l'affichage
+MAX_ERROR_LINES = 5000  # erreurs conservées pour le filtre « erreurs seulement »
+FLUSH_EVERY_LINES = 500
+
+
+class LogBook:
+    """Lignes récentes, erreurs et compteurs par catégorie d'un journal
+
+    Chaque ligne est un couple (message, catégorie), la catégorie servant
+    aussi de tag de couleur dans l'interface ("folder", "convert", "copy",
+    "error", "success" ou "" pour une ligne neutre).
+    """
+
+    def __init__(self, max_lines=MAX_LINES, max_errors=MAX_ERROR_LINES):
+        self.recent = deque(maxlen=max_lines)
+        self.errors = deque(maxlen=max_errors)
+        self.counts = {}
+        self.total = 0
+        self.path = None
+        self._pending = []
+        self._file = None
+
+    def clear(self, path=None):
+        """Vide le journal ; `path` est le fichier du journal complet, ou None"""
+        self.close()
+        self.recent.clear()
+        self.errors.clear()
+        self.counts.clear()
+        self.total = 0
+        self.path = path
+
+    def attach(self, path):
+        """Écrit désormais le journal dans `path`, à commencer par les lignes déjà reçues
+
+        Seules les lignes encore conservées pour l'affichage sont reprises.
+        """
+        self.path = path
+        self._pending.extend(message for message, tag in self.recent)
+
+    def add(self, lines):
+        """Ajoute des lignes (message, catégorie) au journal"""
+        for message, tag in lines:
+            self.recent.append((message, tag))
+            if tag:
+                self.counts[tag] = self.counts.get(tag, 0) + 1
+            if tag == 'error':
+                self.errors.append((message, tag))
+        self.total += len(lines)
+        if self.path is not None:
+            self._pending.extend(message for message, tag in lines)
+            if len(self._pending) >= FLUSH_EVERY_LINES:
+                self.flush()
+
+    def lines(self, errors_only=False):
+        """Lignes conservées pour l'affichage"""
+        return list(self.errors if errors_only else self.recent)
+
+    def flush(self):
+        """Écrit les lignes en attente dans le fichier du journal
+
+        Le fichier est créé à la première écriture, une fois le dossier de
+        sortie créé par la conversion ; d'ici là, les lignes restent en attente.
+        """
+        if not self._pending or self.path is None:
+            return
+        if self._file is None:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                return
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write('\n'.join(self._pending) + '\n')
+        self._file.flush()
+        self._pending.clear()
+
+    def close(self):
+        """Écrit les dernières lignes et ferme le fichier du journal"""
+        try:
+            self.flush()
+        finally:
+            self._pending.clear()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = None
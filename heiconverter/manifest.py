@@ -0,0 +1,226 @@
+"""Manifeste persistant des fichiers déjà traités, pour les conversions incrémentales
+
+Le manifeste est un fichier JSON placé à la racine du dossier de sortie. Il
+associe chaque fichier source (chemin relatif, taille, date de modification
+et éventuellement empreinte du contenu) au fichier produit. Il est
+enregistré régulièrement pendant la conversion : une conversion interrompue
+reprend là où elle s'était arrêtée.
+"""
+import hashlib
+import json
+import os
+import time
+
+from heiconverter.copying import write_file
+
+MANIFEST_NAME = ".heiconverter-manifest.json"
+MANIFEST_VERSION = 1
+
+# Fréquence d'enregistrement pendant une conversion
+SAVE_EVERY_FILES = 200
+SAVE_EVERY_SECONDS = 5.0
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Empreinte BLAKE2 du contenu d'un fichier"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(output_folder):
+    return os.path.join(output_folder, MANIFEST_NAME)
+
+
+def read_manifest(output_folder):
+    """Lit le manifeste d'un dossier de sortie, ou None s'il est absent ou illisible"""
+    try:
+        with open(manifest_path(output_folder), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def belongs_to(output_folder, input_folder):
+    """Indique si le dossier de sortie a été produit à partir de ce dossier d'entrée"""
+    data = read_manifest(output_folder)
+    return data is not None and data.get('input_folder') == os.path.abspath(input_folder)
+
+
+class Manifest:
+    """État des fichiers déjà convertis ou copiés dans un dossier de sortie"""
+
+    def __init__(self, output_folder, input_folder, settings, files=None, file_count=None):
+        self.output_folder = output_folder
+        self.input_folder = os.path.abspath(input_folder)
+        self.settings = settings
+        self.files = files if files is not None else {}
+        self.file_count = file_count  # nombre de fichiers lors du dernier parcours complet
+        self._seen = set()
+        self._owners = None  # sortie (en minuscules) -> clé de son fichier source
+        self._dirty = 0
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def load(cls, output_folder, input_folder, settings):
+        """Charge le manifeste du dossier de sortie
+
+        Les images converties avec d'autres réglages sont oubliées pour être
+        reconverties ; les fichiers simplement copiés restent valables.
+        """
+        data = read_manifest(output_folder)
+        if data is None or data.get('input_folder') != os.path.abspath(input_folder):
+            return cls(output_folder, input_folder, settings)
+        files = data.get('files', {})
+        if data.get('settings') != settings:
+            files = {key: entry for key, entry in files.items() if entry.get('action') == "copy"}
+        return cls(output_folder, input_folder, settings, files, data.get('file_count'))
+
+    def key(self, source):
+        """Clé d'un fichier source : son chemin relatif au dossier d'entrée"""
+        return os.path.relpath(source, self.input_folder).replace(os.sep, '/')
+
+    def check(self, task, hash_check=False):
+        """Indique si la tâche a déjà été réalisée sur la version actuelle du fichier
+
+        Renseigne au passage la taille, la date et, si demandé, l'empreinte
+        du fichier source dans la tâche, pour les enregistrer ensuite.
+        """
+        key = self.key(task.source)
+        self._seen.add(key)
+
+        if task.size is None:
+            stat = os.stat(task.source)
+            task.size = stat.st_size
+            task.mtime_ns = stat.st_mtime_ns
+
+        entry = self.files.get(key)
+        if entry is None or entry.get('action') != task.action or entry.get('size') != task.size:
+            if hash_check:
+                task.digest = file_digest(task.source)
+            return False
+
+        # Nom changé depuis le passage précédent, par exemple par une collision
+        # avec un fichier apparu depuis : l'ancienne sortie n'est plus la bonne
+        if entry['output'] != self.relative_output(task.destination):
+            if hash_check:
+                task.digest = file_digest(task.source)
+            return False
+
+        destination = os.path.join(self.output_folder, entry['output'])
+        if not os.path.exists(destination):
+            return False
+
+        if entry.get('mtime_ns') == task.mtime_ns:
+            task.digest = entry.get('digest')
+            task.outputs = self.extra_outputs(entry)
+            return True
+
+        if hash_check:
+            # Fichier modifié en apparence seulement (copie, synchronisation...)
+            task.digest = file_digest(task.source)
+            if task.digest == entry.get('digest'):
+                entry['mtime_ns'] = task.mtime_ns
+                self._dirty += 1
+                task.outputs = self.extra_outputs(entry)
+                return True
+        return False
+
+    def known_route(self, scanned):
+        """Action et type de contenu enregistrés pour un fichier inchangé, ou None
+
+        Dispense de relire l'en-tête du fichier pour l'aiguiller (voir
+        heiconverter.job.route_file). Le nom du fichier produit est
+        recalculé, puis soumis à la résolution des collisions.
+        """
+        entry = self.files.get(self.key(scanned.path))
+        if (entry is None or 'content' not in entry or entry.get('size') != scanned.size
+                or entry.get('mtime_ns') != scanned.mtime_ns):
+            return None
+        return entry['action'], entry['content']
+
+    def reserved(self, path, source):
+        """Indique si un fichier produit appartient déjà à un autre fichier source
+
+        Protège les sorties d'un passage précédent quand un fichier au même
+        nom apparaît ensuite, par exemple IMG_1.heic ajouté dans un dossier
+        surveillé après IMG_1.jpg. Un nom dont le propriétaire a disparu du
+        dossier d'entrée est libre.
+        """
+        if self._owners is None:
+            self._owners = {}
+            for key, entry in self.files.items():
+                for output in [entry['output']] + entry.get('extra_outputs', []):
+                    self._owners[output.casefold()] = key
+        relative = self.relative_output(path).casefold()
+        owner = self._owners.get(relative)
+        if owner is None or owner == self.key(source):
+            return False
+        entry = self.files.get(owner)
+        if entry is None or relative not in (output.casefold() for output in
+                                             [entry['output']] + entry.get('extra_outputs', [])):
+            return False
+        return os.path.exists(os.path.join(self.input_folder, *owner.split('/')))
+
+    def extra_outputs(self, entry):
+        """Chemins des fichiers produits en plus de la destination principale"""
+        return [os.path.join(self.output_folder, *output.split('/')) for output in entry.get('extra_outputs', [])]
+
+    def relative_output(self, path):
+        return os.path.relpath(path, self.output_folder).replace(os.sep, '/')
+
+    def record(self, task, extra_outputs=()):
+        """Enregistre un fichier traité avec succès et les fichiers qu'il a produits"""
+        entry = {
+            # Un doublon produit les mêmes fichiers qu'une conversion
+            'action': "convert" if task.action == "duplicate" else task.action,
+            'size': task.size,
+            'mtime_ns': task.mtime_ns,
+            'digest': task.digest,
+            'output': self.relative_output(task.destination),
+        }
+        if task.content is not None:
+            entry['content'] = task.content
+        if extra_outputs:
+            entry['extra_outputs'] = [self.relative_output(path) for path in extra_outputs]
+        self.files[self.key(task.source)] = entry
+        self._dirty += 1
+
+    def prune(self):
+        """Supprime les sorties des fichiers sources disparus depuis la dernière conversion
+
+        À n'appeler qu'après un parcours complet du dossier d'entrée.
+        Renvoie le nombre de fichiers retirés.
+        """
+        removed = [key for key in self.files if key not in self._seen]
+        for key in removed:
+            entry = self.files.pop(key)
+            for output in [entry['output']] + entry.get('extra_outputs', []):
+                try:
+                    os.remove(os.path.join(self.output_folder, output))
+                except OSError:
+                    pass
+        self._dirty += len(removed)
+        return len(removed)
+
+    def save_if_due(self):
+        """Enregistre le manifeste si assez de changements se sont accumulés"""
+        if self._dirty and (self._dirty >= SAVE_EVERY_FILES
+                            or time.monotonic() - self._last_save >= SAVE_EVERY_SECONDS):
+            self.save()
+
+    def save(self):
+        """Enregistre le manifeste de façon atomique"""
+        data = {'version': MANIFEST_VERSION,
+                'input_folder': self.input_folder,
+                'settings': self.settings,
+                'file_count': self.file_count,
+                'files': self.files}
+        write_file(manifest_path(self.output_folder), json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self._dirty = 0
+        self._last_save = time.monotonic()
@@ -0,0 +1,120 @@
+"""Métadonnées des images : EXIF, profil ICC et XMP
+
+Les métadonnées sont lues dans l'image déjà décodée pour la conversion, puis
+recopiées dans les fichiers produits. Elles peuvent aussi être exportées dans
+un fichier JSON annexe, à côté de l'image convertie, pour que les outils en
+aval n'aient pas à relire le fichier HEIC d'origine.
+"""
+import io
+import json
+
+METADATA_KEYS = ("exif", "icc_profile", "xmp")
+SIDECAR_SUFFIX = ".json"
+
+# Étiquettes EXIF de base qui désignent des sous-répertoires
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+ORIENTATION = 0x0112
+
+
+def sidecar_path(destination):
+    """Fichier annexe d'une image produite : IMG_0001.jpg -> IMG_0001.jpg.json"""
+    return destination + SIDECAR_SUFFIX
+
+
+def image_metadata(img):
+    """EXIF, profil ICC et XMP d'une image ouverte, tels quels (octets)"""
+    metadata = {}
+    for key in METADATA_KEYS:
+        value = img.info.get(key)
+        if value:
+            metadata[key] = value
+    return metadata
+
+
+def auto_orient(img):
+    """Redresse l'image selon son orientation EXIF et remet l'étiquette à 1
+
+    pillow_heif applique déjà les rotations du conteneur HEIF au décodage ;
+    ceci ne traite que les images dont l'EXIF indique encore une rotation.
+    Renvoie l'image à utiliser pour la suite.
+    """
+    if img.getexif().get(ORIENTATION, 1) == 1:
+        return img
+    from PIL import ImageOps
+    return ImageOps.exif_transpose(img)
+
+
+def _json_value(value):
+    """Valeur EXIF convertie en type JSON"""
+    if isinstance(value, bytes):
+        value = value.rstrip(b'\0')
+        try:
+            return value.decode('ascii')
+        except UnicodeDecodeError:
+            return value.hex()
+    if isinstance(value, str):
+        return value.rstrip('\0')
+    if isinstance(value, (tuple, list)):
+        return [_json_value(item) for item in value]
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    try:
+        return float(value)  # IFDRational
+    except (TypeError, ValueError, ZeroDivisionError):
+        return str(value)
+
+
+def _named_tags(tags, names):
+    return {names.get(tag, str(tag)): _json_value(value) for tag, value in tags.items()}
+
+
+def describe_metadata(img):
+    """Contenu du fichier annexe : dimensions, EXIF lisible, XMP et profil ICC
+
+    Ne contient que des types simples, pour être renvoyé par un processus
+    de travail.
+    """
+    from PIL import ExifTags
+
+    exif = img.getexif()
+    description = {
+        'width': img.width,
+        'height': img.height,
+        'orientation': img.info.get('original_orientation') or exif.get(ORIENTATION, 1),
+        'exif': _named_tags({tag: value for tag, value in exif.items()
+                             if tag not in (EXIF_IFD, GPS_IFD)}, ExifTags.TAGS),
+    }
+    description['exif'].update(_named_tags(exif.get_ifd(EXIF_IFD), ExifTags.TAGS))
+    gps = exif.get_ifd(GPS_IFD)
+    if gps:
+        description['gps'] = _named_tags(gps, ExifTags.GPSTAGS)
+    xmp = img.info.get('xmp')
+    if xmp:
+        description['xmp'] = xmp.decode('utf-8', 'replace') if isinstance(xmp, bytes) else xmp
+    icc_profile = img.info.get('icc_profile')
+    if icc_profile:
+        description['icc_profile'] = _icc_description(icc_profile)
+    return description
+
+
+def _icc_description(icc_profile):
+    """Nom du profil ICC, ou sa taille si Pillow ne sait pas le lire"""
+    try:
+        from PIL import ImageCms
+        return ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))).strip()
+    except Exception:
+        return f"{len(icc_profile)} octets"
+
+
+def encode_sidecar(description, source):
+    """Fichier annexe JSON encodé, prêt à écrire"""
+    return json.dumps(dict(source=source, **description), ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def read_metadata(source):
+    """Métadonnées d'une image qui n'est pas décodée : seul l'en-tête est lu"""
+    from heiconverter.engine import load_codecs
+    Image = load_codecs()
+    with Image.open(source) as img:
+        return describe_metadata(img)
@@ -0,0 +1,151 @@
+"""Options d'une conversion et choix du dossier de sortie"""
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from heiconverter import manifest
+from heiconverter.containers import parse_images
+from heiconverter.dedup import DEDUP_MODES
+from heiconverter.encoders import create_encoder
+from heiconverter.engine import OutputSettings
+from heiconverter.sizes import parse_sizes
+
+
+@dataclass
+class ConversionOptions:
+    """Paramètres d'une conversion, partagés par l'interface et la ligne de commande"""
+    input_folder: str
+    output_folder: Optional[str] = None  # None : nom choisi automatiquement
+    output_location: str = "parent"  # "parent" ou "current"
+    workers: Optional[int] = None  # None : un processus par cœur
+    pool: str = "process"  # "process" ou "thread", voir heiconverter.engine.ConversionEngine
+    memory_budget_mb: Optional[int] = None  # mémoire réservée aux images en vol, None : sans limite
+    output_format: str = "jpeg"  # voir heiconverter.encoders.ENCODERS
+    quality: Optional[int] = None  # None : qualité par défaut du format
+    speed: str = "balanced"  # voir heiconverter.encoders.SPEED_PRESETS
+    subsampling: Optional[str] = None  # JPEG : "4:4:4", "4:2:2" ou "4:2:0"
+    progressive: Optional[bool] = None  # JPEG : None selon la vitesse
+    optimize: Optional[bool] = None  # JPEG, tables de Huffman : None selon la vitesse
+    incremental: bool = False  # ignore les fichiers déjà convertis (manifeste)
+    hash_check: bool = False  # compare aussi le contenu des fichiers modifiés
+    prune: bool = False  # supprime les sorties des fichiers sources disparus
+    copy_mode: str = "copy"  # voir heiconverter.copying.COPY_MODES
+    dedup: str = "off"  # images identiques : voir heiconverter.dedup.DEDUP_MODES
+    sizes: tuple = ("full",)  # voir heiconverter.sizes.parse_size
+    keep_metadata: bool = True  # recopie l'EXIF, le profil ICC et le XMP dans les images produites
+    auto_orient: bool = False  # redresse les images selon leur orientation EXIF
+    sidecar: bool = False  # exporte les métadonnées dans un fichier JSON à côté de chaque image
+    images: str = "primary"  # images de chaque conteneur HEIF : voir heiconverter.containers.parse_images
+    preview_size: Optional[int] = None  # miniatures d'aperçu des images converties (interface)
+    timeout: Optional[float] = None  # durée maximale du décodage et de l'encodage d'une image, en secondes
+    retry_failed: bool = False  # ne traite que les fichiers en échec, voir heiconverter.failures
+    plan: bool = False  # établit un plan avant la conversion et s'arrête en cas de problème
+    dry_run: bool = False  # établit le plan sans rien convertir
+    report_path: Optional[str] = None  # rapport de durées en fin de conversion (.json ou .csv)
+    profile_path: Optional[str] = None  # profil cProfile du thread de conversion (pstats)
+
+    def encoder(self):
+        """Encodeur correspondant au format et aux réglages choisis"""
+        settings = {'quality': self.quality, 'speed': self.speed}
+        if self.output_format == "jpeg":
+            settings.update(subsampling=self.subsampling, progressive=self.progressive,
+                            optimize=self.optimize)
+        return create_encoder(self.output_format, **settings)
+
+    def output_settings(self):
+        """Réglages transmis au moteur de conversion"""
+        return OutputSettings(encoder=self.encoder(),
+                              copy_mode=self.copy_mode,
+                              sizes=parse_sizes(self.sizes),
+                              dedup_mode=self.dedup,
+                              keep_metadata=self.keep_metadata,
+                              auto_orient=self.auto_orient,
+                              sidecar=self.sidecar,
+                              images=parse_images(self.images),
+                              preview_size=self.preview_size)
+
+    def settings(self):
+        """Réglages qui influent sur le contenu des fichiers produits"""
+        return dict(self.encoder().describe(),
+                    sizes=[size.name for size in parse_sizes(self.sizes)],
+                    metadata=self.keep_metadata, auto_orient=self.auto_orient,
+                    sidecar=self.sidecar, images=parse_images(self.images))
+
+
+def generate_output_folder_name(input_path, output_location="parent", reuse_existing=False):
+    """Génère un nom intelligent pour le dossier de sortie
+
+    Avec `reuse_existing`, un dossier déjà produit à partir du même dossier
+    d'entrée est réutilisé plutôt que d'en créer un nouveau.
+    """
+    input_path = Path(input_path)
+    base_name = input_path.name
+
+    if output_location == "parent":
+        parent_dir = input_path.parent
+    else:
+        parent_dir = input_path
+
+    # Noms possibles pour le dossier de sortie
+    possible_names = [
+        f"{base_name}_converted",
+        f"{base_name}_JPEG",
+        f"Converted_{base_name}",
+        f"JPEG_{base_name}"
+    ]
+
+    if reuse_existing:
+        for name in possible_names:
+            output_path = parent_dir / name
+            if manifest.belongs_to(output_path, input_path):
+                return str(output_path)
+
+    # Trouve un nom disponible
+    for name in possible_names:
+        output_path = parent_dir / name
+        if not output_path.exists():
+            return str(output_path)
+
+    # Si tous les noms sont pris, ajoute un numéro
+    counter = 1
+    while True:
+        output_path = parent_dir / f"{base_name}_converted_{counter}"
+        if not output_path.exists():
+            return str(output_path)
+        counter += 1
+
+
+def resolve_output_folder(options):
+    """Vérifie les options et renvoie le dossier de sortie à utiliser
+
+    Lève ValueError avec un message destiné à l'utilisateur si les options
+    ne permettent pas de lancer la conversion.
+    """
+    input_path = (options.input_folder or "").strip()
+    parse_sizes(options.sizes)
+    parse_images(options.images)
+    options.encoder().check_available()
+    if options.dedup not in DEDUP_MODES:
+        raise ValueError(f"Mode de dédoublonnage inconnu : {options.dedup}")
+    if options.timeout is not None and options.timeout <= 0:
+        raise ValueError("Le délai par image doit être positif.")
+
+    if not input_path:
+        raise ValueError("Veuillez sélectionner un dossier d'entrée.")
+
+    if not os.path.exists(input_path):
+        raise ValueError("Le dossier d'entrée n'existe pas.")
+
+    if options.output_folder is None:
+        output_path = generate_output_folder_name(input_path, options.output_location,
+                                                  reuse_existing=options.incremental or options.retry_failed)
+    else:
+        output_path = options.output_folder.strip()
+        if not output_path:
+            raise ValueError("Veuillez sélectionner un dossier de sortie.")
+
+    if input_path == output_path:
+        raise ValueError("Le dossier d'entrée et de sortie ne peuvent pas être identiques.")
+
+    return output_path
@@ -0,0 +1,232 @@
+"""Plan d'une conversion : correspondance source → destination, conflits et estimations
+
+Le plan est établi avant la conversion, en un parcours rapide qui ne lit
+aucune image. Il signale :
+
+* les collisions de noms (IMG_1.heic et IMG_1.jpg donnent tous deux
+  IMG_1.jpg) : le second fichier reçoit l'extension de sa source en
+  suffixe, IMG_1_jpg.jpg, et ne remplace plus le premier ;
+* un dossier de sortie placé dans le dossier d'entrée, qui est alors exclu
+  du parcours ;
+* un manque d'espace disque, d'après la taille des fichiers produits,
+  estimée en convertissant en mémoire quelques images réparties dans le
+  dossier.
+"""
+import os
+import shutil
+import time
+
+from heiconverter.engine import encode_image, passthrough, read_source
+from heiconverter.metadata import sidecar_path
+from heiconverter.scanner import is_inside
+from heiconverter.sizes import output_paths
+
+PLAN_SAMPLES = 5  # images converties pour estimer la taille et la durée
+FREE_SPACE_MARGIN = 1.1  # marge sur l'espace disque estimé
+MAX_LISTED_COLLISIONS = 100  # collisions détaillées dans le résumé
+
+# Modes de copie qui n'occupent pas de place supplémentaire
+SPACE_FREE_COPY_MODES = ("hardlink", "skip")
+
+
+def planned_outputs(task, settings, destination=None):
+    """Fichiers que produira une tâche, connus sans décoder l'image
+
+    `destination` remplace celle de la tâche, pour essayer un autre nom.
+    Les images supplémentaires d'un conteneur (voir
+    heiconverter.containers) ne sont connues qu'au décodage.
+    """
+    destination = destination or task.destination
+    if task.action == "reject":
+        return []
+    if task.action != "convert":
+        return [destination]
+    paths = [path for size, path in output_paths(destination, settings.sizes)]
+    if settings.sidecar:
+        paths.append(sidecar_path(destination))
+    return paths
+
+
+def name_key(path):
+    """Clé d'un nom de fichier produit, insensible à la casse comme Windows et macOS"""
+    return os.path.basename(path).casefold()
+
+
+def collision_destination(task, settings, is_taken):
+    """Premier nom libre d'un fichier en conflit : IMG_1.heic -> IMG_1_heic.jpg, IMG_1_heic_2.jpg...
+
+    `is_taken(path)` indique si un fichier produit porterait un nom déjà pris.
+    """
+    stem, extension = os.path.splitext(task.destination)
+    base = f"{stem}_{os.path.splitext(task.source)[1].lstrip('.')}"
+    candidate, number = base + extension, 1
+    while any(is_taken(path) for path in planned_outputs(task, settings, candidate)):
+        number += 1
+        candidate = f"{base}_{number}{extension}"
+    return candidate
+
+
+def resolve_collisions(tasks, settings, on_collision=None, reserved=None):
+    """Renomme au fil de l'eau les fichiers dont un fichier produit porte un nom déjà pris
+
+    Les noms pris sont retenus par dossier de sortie, sans tenir compte de
+    la casse : le premier fichier à réclamer un nom le garde, les suivants
+    sont renommés, copies comprises (un JPEG nommé A.heic est copié sous le
+    nom A.jpg). Les tâches passent une à une, sans attendre la fin du
+    parcours d'un dossier. `reserved(path, source)` indique en plus si un
+    nom appartient déjà à un autre fichier source (voir Manifest.reserved).
+    `on_collision(task, previous_destination)` est appelé pour chaque
+    fichier renommé.
+    """
+    claimed = {}  # dossier de sortie -> clés des noms déjà pris
+
+    for task in tasks:
+        names = claimed.setdefault(os.path.dirname(task.destination), set())
+
+        def is_taken(path):
+            return name_key(path) in names or (reserved is not None and reserved(path, task.source))
+
+        if any(is_taken(path) for path in planned_outputs(task, settings)):
+            previous = task.destination
+            task.destination = collision_destination(task, settings, is_taken)
+            if on_collision is not None:
+                on_collision(task, previous)
+        names.update(name_key(path) for path in planned_outputs(task, settings))
+        yield task
+
+
+def free_space(path):
+    """Espace libre sur le disque du dossier, même s'il n'existe pas encore"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return shutil.disk_usage(path).free
+
+
+def format_bytes(size):
+    for unit, scale in (("Go", 1024 ** 3), ("Mo", 1024 ** 2), ("Ko", 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size} octets"
+
+
+class ConversionPlan:
+    """Tâches prévues d'une conversion et estimations qui en découlent"""
+
+    def __init__(self, input_folder, output_folder):
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.nested_output = is_inside(os.path.abspath(output_folder), os.path.abspath(input_folder))
+        self.counts = {'convert': 0, 'copy': 0, 'skip': 0, 'reject': 0}
+        self.bytes_in = {'convert': 0, 'copy': 0, 'skip': 0, 'reject': 0}
+        self.collisions = []  # (source, destination renommée)
+        self.conversions = []  # tâches à convertir, parmi lesquelles les échantillons sont choisis
+        self.samples = 0
+        self.seconds_per_image = None
+        self.size_ratio = None
+        self.estimated_bytes_out = None
+        self.estimated_seconds = None
+        self.free_bytes = None
+        self.problems = []
+
+    @property
+    def files(self):
+        return sum(self.counts.values())
+
+    def add(self, task):
+        self.counts[task.action] += 1
+        self.bytes_in[task.action] += task.size or 0
+        if task.action == "convert":
+            self.conversions.append(task)
+
+    def add_collision(self, task, previous_destination):
+        self.collisions.append((task.source, task.destination))
+
+    def sample(self, settings):
+        """Convertit en mémoire quelques images réparties dans le dossier
+
+        Donne la durée moyenne d'une conversion et le rapport entre la taille
+        des fichiers produits et celle des fichiers sources. Les images
+        illisibles sont ignorées.
+        """
+        if passthrough(settings):
+            self.size_ratio, self.seconds_per_image = 1.0, 0.0
+            return
+        count = len(self.conversions)
+        picked = [self.conversions[i * count // PLAN_SAMPLES] for i in range(min(PLAN_SAMPLES, count))]
+        bytes_in = bytes_out = 0
+        seconds = 0.0
+        for task in picked:
+            start = time.perf_counter()
+            try:
+                data = read_source(task.source)
+                parts, timings, description, thumbnail = encode_image(data, settings)
+            except Exception:
+                continue
+            seconds += time.perf_counter() - start
+            bytes_in += len(data)
+            bytes_out += sum(len(encoded) for part, sizes in parts for encoded in sizes)
+            self.samples += 1
+        if self.samples:
+            self.seconds_per_image = seconds / self.samples
+            self.size_ratio = bytes_out / bytes_in if bytes_in else 1.0
+
+    def estimate(self, settings, workers):
+        """Estime la taille produite et la durée, puis vérifie l'espace disque
+
+        Les copies comptent pour leur taille, sauf en lien physique ou sans
+        copie ; la durée ne tient compte que des conversions, réparties sur
+        `workers` processus.
+        """
+        self.sample(settings)
+        copied = 0 if settings.copy_mode in SPACE_FREE_COPY_MODES else self.bytes_in['copy']
+        if self.size_ratio is not None:
+            self.estimated_bytes_out = round(self.bytes_in['convert'] * self.size_ratio) + copied
+            self.estimated_seconds = self.seconds_per_image * self.counts['convert'] / max(1, workers)
+        elif not self.counts['convert']:
+            self.estimated_bytes_out, self.estimated_seconds = copied, 0.0
+
+        self.free_bytes = free_space(self.output_folder)
+        if (self.estimated_bytes_out is not None
+                and self.estimated_bytes_out * FREE_SPACE_MARGIN > self.free_bytes):
+            self.problems.append(
+                f"Espace disque insuffisant : environ {format_bytes(self.estimated_bytes_out)} "
+                f"nécessaires, {format_bytes(self.free_bytes)} libres.")
+
+    def summary(self):
+        """Résumé sérialisable en JSON"""
+        return {
+            'files': self.files,
+            'actions': dict(self.counts),
+            'bytes_in': sum(self.bytes_in.values()),
+            'estimated_bytes_out': self.estimated_bytes_out,
+            'estimated_seconds': (round(self.estimated_seconds, 1)
+                                  if self.estimated_seconds is not None else None),
+            'free_bytes': self.free_bytes,
+            'samples': self.samples,
+            'nested_output': self.nested_output,
+            'collision_count': len(self.collisions),
+            'collisions': [{'source': source, 'destination': destination}
+                           for source, destination in self.collisions[:MAX_LISTED_COLLISIONS]],
+            'problems': self.problems,
+        }
+
+    def format_summary(self):
+        """Résumé d'une ligne pour l'interface"""
+        text = (f"{self.counts['convert']} à convertir, {self.counts['copy']} à copier, "
+                f"{self.counts['skip']} déjà à jour")
+        if self.counts['reject']:
+            text += f", {self.counts['reject']} rejetés (pas des images HEIF)"
+        if self.estimated_bytes_out is not None:
+            text += f" • environ {format_bytes(self.estimated_bytes_out)}"
+        if self.estimated_seconds is not None:
+            if self.estimated_seconds >= 60:
+                text += f" en {self.estimated_seconds / 60:.0f} min"
+            else:
+                text += f" en {self.estimated_seconds:.0f} s"
+        if self.free_bytes is not None:
+            text += f" • {format_bytes(self.free_bytes)} libres"
+        return text
@@ -0,0 +1,88 @@
+"""Miniatures d'aperçu des images converties
+
+La miniature est tirée, dans le processus de travail, de la plus petite
+taille déjà produite pour l'encodage : l'aperçu n'ajoute jamais de second
+décodage. Seuls ses pixels bruts, quelques dizaines de Ko, remontent au
+processus principal, qui les garde dans un cache LRU de taille bornée.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+PREVIEW_SIZE = 96  # bord maximal des miniatures, en pixels
+PREVIEW_CACHE_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class Thumbnail:
+    """Pixels bruts d'une miniature, à reconstruire avec Image.frombytes"""
+    mode: str
+    size: tuple
+    data: bytes
+    photo: Any = None  # image Tk, créée au premier affichage
+
+    def to_image(self):
+        from PIL import Image
+        return Image.frombytes(self.mode, self.size, self.data)
+
+
+def make_thumbnail(image, max_edge=PREVIEW_SIZE):
+    """Miniature d'une image déjà décodée (et en général déjà réduite)
+
+    Une réduction entière par blocs, sans copie préalable de l'image,
+    précède le filtre final : quelques millisecondes par image.
+    """
+    thumbnail = image
+    if max(image.size) > max_edge:
+        factor = max(image.size) // max_edge
+        thumbnail = image.reduce(factor) if factor > 1 else image.copy()
+        thumbnail.thumbnail((max_edge, max_edge))
+    if thumbnail.mode not in ("RGB", "L"):
+        converted = thumbnail.convert("RGB")
+        if thumbnail is not image:
+            thumbnail.close()
+        thumbnail = converted
+    result = Thumbnail(thumbnail.mode, thumbnail.size, thumbnail.tobytes())
+    if thumbnail is not image:
+        thumbnail.close()
+    return result
+
+
+class ThumbnailCache:
+    """Cache LRU des miniatures, borné par le volume de leurs pixels"""
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def put(self, key, thumbnail):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.used -= len(old.data)
+        self._items[key] = thumbnail
+        self.used += len(thumbnail.data)
+        while self.used > self.max_bytes and len(self._items) > 1:
+            key, evicted = self._items.popitem(last=False)
+            self.used -= len(evicted.data)
+
+    def get(self, key):
+        """Miniature d'une clé, marquée comme récemment utilisée, ou None"""
+        thumbnail = self._items.get(key)
+        if thumbnail is not None:
+            self._items.move_to_end(key)
+        return thumbnail
+
+    def keys(self):
+        """Clés de la moins à la plus récemment utilisée"""
+        return list(self._items)
+
+    def clear(self):
+        self._items.clear()
+        self.used = 0
@@ -0,0 +1,149 @@
+"""Mesures d'une conversion : durée des étapes, volumes et erreurs
+
+Le rapport cumule le temps passé dans chaque étape (parcours, lecture,
+décodage, encodage, écriture, copie, affichage du journal...) pour savoir
+où part le temps d'une conversion lente. Il peut être enregistré en JSON
+(synthèse et détail par fichier) ou en CSV (une ligne par fichier).
+"""
+import csv
+import json
+import threading
+import time
+
+REPORT_NAME = "heiconverter-report.json"
+# Mesure du démarrage de l'interface (converter.py --startup-time) sans console,
+# dans le dossier temporaire
+STARTUP_REPORT_NAME = "heiconverter-startup.json"
+
+# Étapes connues, dans l'ordre d'affichage
+STAGE_LABELS = {
+    'scan': "parcours",
+    'check': "vérification",
+    'dedup': "doublons",
+    'read': "lecture",
+    'decode': "décodage",
+    'resize': "réduction",
+    'encode': "encodage",
+    'preview': "aperçu",
+    'write': "écriture",
+    'copy': "copie",
+    'display': "affichage",
+}
+FILE_FIELDS = ('source', 'destination', 'action', 'status', 'error', 'method', 'original',
+               'bytes_in', 'bytes_out')
+
+
+class RunReport:
+    """Durée des étapes, volumes et erreurs d'une conversion
+
+    Alimenté par le thread de conversion et, pour l'affichage, par
+    l'interface : les mises à jour sont protégées par un verrou. Le détail
+    par fichier n'est conservé que si `keep_files` est vrai.
+    """
+
+    def __init__(self, keep_files=False):
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.stages = {}  # étape -> [durée cumulée en secondes, nombre de mesures]
+        self.files = {}  # action -> nombre de fichiers
+        self.errors = {}  # action -> nombre d'erreurs
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rows = [] if keep_files else None
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds, count=1):
+        """Ajoute une mesure de durée à une étape"""
+        with self._lock:
+            total = self.stages.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+
+    def add_result(self, result):
+        """Ajoute les mesures d'un fichier traité"""
+        task = result.task
+        bytes_in = (task.size or 0) if task.action != "skip" else 0
+        with self._lock:
+            self.files[task.action] = self.files.get(task.action, 0) + 1
+            if not result.ok:
+                self.errors[task.action] = self.errors.get(task.action, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += result.bytes_out
+            for stage, seconds in result.timings.items():
+                if stage != 'total':
+                    total = self.stages.setdefault(stage, [0.0, 0])
+                    total[0] += seconds
+                    total[1] += 1
+            if self.rows is not None:
+                row = {key: value for key, value in result.to_dict().items() if key in FILE_FIELDS}
+                row.update(bytes_in=bytes_in, bytes_out=result.bytes_out)
+                row.update({stage: round(seconds, 6) for stage, seconds in result.timings.items()})
+                self.rows.append(row)
+
+    def finish(self):
+        """Fige la durée totale de la conversion"""
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self):
+        """Synthèse sérialisable en JSON"""
+        with self._lock:
+            elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+            stages = {stage: {'seconds': round(seconds, 3), 'count': count,
+                              'mean_ms': round(seconds * 1000 / count, 3) if count else None}
+                      for stage, (seconds, count) in self._ordered_stages()}
+            return {
+                'elapsed_seconds': round(elapsed, 3),
+                'files': dict(self.files),
+                'errors': dict(self.errors),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'mb_per_second': round(self.bytes_in / 1024 / 1024 / elapsed, 2) if elapsed else None,
+                'stages': stages,
+            }
+
+    def _ordered_stages(self):
+        known = [(stage, self.stages[stage]) for stage in STAGE_LABELS if stage in self.stages]
+        others = [(stage, total) for stage, total in self.stages.items() if stage not in STAGE_LABELS]
+        return known + others
+
+    def format_summary(self, limit=3):
+        """Résumé d'une ligne : les étapes les plus coûteuses et le débit
+
+        Les étapes parallèles se chevauchent : les parts sont calculées sur le
+        temps cumulé de toutes les étapes, pas sur la durée de la conversion.
+        """
+        summary = self.summary()
+        stages = summary['stages']
+        cumulated = sum(stage['seconds'] for stage in stages.values())
+        parts = []
+        if cumulated:
+            heaviest = sorted(stages.items(), key=lambda item: item[1]['seconds'], reverse=True)
+            for stage, measure in heaviest[:limit]:
+                share = measure['seconds'] * 100 / cumulated
+                parts.append(f"{STAGE_LABELS.get(stage, stage)} {share:.0f} %")
+        text = f"{summary['elapsed_seconds']:.1f} s"
+        if summary['mb_per_second']:
+            text += f" • {summary['mb_per_second']:.1f} Mo/s"
+        if parts:
+            text += " • " + ", ".join(parts)
+        return text
+
+    def write(self, path):
+        """Enregistre le rapport, en CSV si le fichier se termine par .csv, en JSON sinon"""
+        if path.lower().endswith('.csv'):
+            self._write_csv(path)
+        else:
+            report = self.summary()
+            if self.rows is not None:
+                report['files_detail'] = self.rows
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+                f.write('\n')
+
+    def _write_csv(self, path):
+        stages = [stage for stage, total in self._ordered_stages()]
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(FILE_FIELDS) + stages + ['total'],
+                                    extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.rows or ())
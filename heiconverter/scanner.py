@@ -0,0 +1,67 @@
+"""Parcours du dossier d'entrée en un seul passage avec os.scandir"""
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class ScannedFile:
+    """Fichier découvert pendant le parcours, avec les informations de os.scandir"""
+    path: str
+    relative_dir: str  # "." pour la racine du dossier d'entrée
+    name: str
+    size: int
+    mtime_ns: int
+
+
+def is_inside(path, folder):
+    """Indique si `path` est `folder` ou se trouve dans ce dossier"""
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+
+def scan_files(input_folder, exclude=None):
+    """Produit les fichiers du dossier et de ses sous-dossiers au fur et à mesure
+
+    Même ordre que os.walk (fichiers d'un dossier puis ses sous-dossiers),
+    sans second parcours pour compter : la taille et la date viennent du
+    DirEntry, qui ne fait au plus qu'un appel à stat par fichier. Comme
+    os.walk, les dossiers illisibles sont ignorés et les liens symboliques
+    vers des dossiers ne sont pas suivis. Le dossier `exclude` (un dossier
+    de sortie placé dans le dossier d'entrée) n'est pas parcouru.
+    """
+    if exclude is not None:
+        exclude = os.path.normcase(os.path.abspath(exclude))
+    stack = [(input_folder, '.')]
+    while stack:
+        folder, relative_dir = stack.pop()
+        subfolders = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink() and not (
+                                    exclude is not None
+                                    and os.path.normcase(os.path.abspath(entry.path)) == exclude):
+                                subfolders.append(entry)
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield ScannedFile(entry.path, relative_dir, entry.name,
+                                      stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            continue
+
+        for entry in reversed(subfolders):
+            child_dir = entry.name if relative_dir == '.' else os.path.join(relative_dir, entry.name)
+            stack.append((entry.path, child_dir))
+
+
+def scanned_file(path, input_folder):
+    """Informations d'un fichier isolé du dossier d'entrée, comme les produirait le parcours
+
+    Lève OSError si le fichier n'existe plus.
+    """
+    stat = os.stat(path)
+    relative_dir = os.path.relpath(os.path.dirname(path), input_folder)
+    return ScannedFile(path, relative_dir, os.path.basename(path), stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,94 @@
+"""Tailles de sortie : image entière, taille web, miniature ou bord maximal libre
+
+Toutes les tailles d'une image sont produites à partir d'un seul décodage :
+chaque taille est réduite à partir de la précédente, de la plus grande à la
+plus petite, ce qui évite de redécoder ou de réduire plusieurs fois l'image
+entière.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Préréglages : nom -> bord maximal en pixels (None : taille d'origine)
+SIZE_PRESETS = {
+    "full": None,
+    "web": 2048,
+    "thumbnail": 320,
+}
+
+
+@dataclass(frozen=True)
+class OutputSize:
+    """Taille d'une image produite"""
+    name: str
+    max_edge: Optional[int] = None
+
+    def fit(self, size):
+        """Dimensions réduites pour tenir dans le bord maximal, ou None si inutile"""
+        width, height = size
+        if self.max_edge is None or max(width, height) <= self.max_edge:
+            return None
+        scale = self.max_edge / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+FULL_SIZE = OutputSize("full")
+
+
+def parse_size(text):
+    """Interprète un préréglage ("full", "web", "thumbnail") ou un bord maximal en pixels"""
+    text = text.strip().lower()
+    if text in SIZE_PRESETS:
+        return OutputSize(text, SIZE_PRESETS[text])
+    try:
+        max_edge = int(text.removesuffix("px"))
+    except ValueError:
+        raise ValueError(f"Taille inconnue : {text!r} (full, web, thumbnail ou un nombre de pixels)")
+    if max_edge < 16:
+        raise ValueError(f"Taille trop petite : {max_edge} px")
+    return OutputSize(f"{max_edge}px", max_edge)
+
+
+def parse_sizes(texts):
+    """Interprète une liste de tailles en retirant les doublons"""
+    sizes = []
+    for text in texts:
+        size = parse_size(text)
+        if size not in sizes:
+            sizes.append(size)
+    return tuple(sizes) or (FULL_SIZE,)
+
+
+def output_paths(destination, sizes):
+    """Fichier produit pour chaque taille
+
+    La première taille prend le nom de destination, les suivantes y ajoutent
+    leur nom : IMG_0001.jpg, IMG_0001_thumbnail.jpg...
+    """
+    stem, extension = os.path.splitext(destination)
+    paths = [(sizes[0], destination)]
+    for size in sizes[1:]:
+        paths.append((size, f"{stem}_{size.name}{extension}"))
+    return paths
+
+
+def render_sizes(img, sizes):
+    """Produit (taille, image) de la plus grande à la plus petite taille
+
+    Chaque réduction part de l'image précédente ; les images intermédiaires
+    sont libérées dès qu'elles ne servent plus.
+    """
+    from PIL import Image
+
+    current = img
+    for size in sorted(sizes, key=lambda s: s.max_edge or float('inf'), reverse=True):
+        target = size.fit(current.size)
+        if target is not None:
+            # reducing_gap : réduction entière rapide avant le filtre de qualité
+            resized = current.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            if current is not img:
+                current.close()
+            current = resized
+        yield size, current
+    if current is not img:
+        current.close()
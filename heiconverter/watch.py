@@ -0,0 +1,374 @@
+"""Surveillance d'un dossier de dépôt et conversion continue
+
+Au lancement, une conversion incrémentale rattrape les changements survenus
+depuis la dernière exécution. Ensuite, seuls les fichiers nouveaux ou
+modifiés sont convertis, dans l'arborescence miroir du dossier de sortie.
+
+Sous Linux, les changements sont signalés par inotify, sans aucun travail
+tant que rien ne bouge ; ailleurs, ou si inotify est indisponible, le
+dossier est parcouru à intervalle régulier. Un fichier n'est traité qu'une
+fois resté inchangé pendant `debounce` secondes, pour ne pas convertir une
+copie en cours d'écriture.
+
+Utilisation :
+    python -m heiconverter.watch dossier_de_depot -o dossier_de_sortie [options]
+"""
+import ctypes
+import ctypes.util
+import dataclasses
+import json
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import time
+
+from heiconverter import cli
+from heiconverter.engine import WorkerPools
+from heiconverter.job import FINAL_EVENTS, ConversionJob, JobEvent
+from heiconverter.options import resolve_output_folder
+from heiconverter.scanner import is_inside, scan_files, scanned_file
+
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+DEBOUNCE_SECONDS = 1.0
+POLL_INTERVAL_SECONDS = 2.0
+IDLE_WAIT_SECONDS = 1.0  # attente maximale sans changement, pour réagir à un arrêt
+
+# Fichiers temporaires des outils de copie et des navigateurs, jamais traités
+TEMPORARY_SUFFIXES = ('.tmp', '.part', '.partial', '.crdownload', '.download', '~')
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_temporary(name):
+    """Fichier caché ou temporaire, en cours de copie ou de téléchargement"""
+    return name.startswith('.') or name.lower().endswith(TEMPORARY_SUFFIXES)
+
+
+class PollingWatcher:
+    """Détecte les changements en comparant des parcours successifs
+
+    Fonctionne partout, mais chaque parcours coûte un appel à stat par
+    fichier, même quand rien ne change.
+    """
+
+    name = "poll"
+    overflowed = False
+
+    def __init__(self, folder, exclude=None, interval=POLL_INTERVAL_SECONDS):
+        self.folder = folder
+        self.exclude = exclude
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self):
+        return {scanned.path: (scanned.size, scanned.mtime_ns)
+                for scanned in scan_files(self.folder, exclude=self.exclude)}
+
+    def wait(self, timeout):
+        """Attend au plus `timeout` secondes et renvoie les fichiers changés"""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, delay))
+        snapshot = self._scan()
+        changed = {path for path, signature in snapshot.items()
+                   if self._snapshot.get(path) != signature}
+        self._snapshot = snapshot
+        self._next_scan = time.monotonic() + self.interval
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Détecte les changements avec inotify (Linux), sans coût au repos
+
+    Chaque sous-dossier reçoit sa propre surveillance, y compris ceux créés
+    pendant la surveillance. Lève OSError si inotify est indisponible ou si
+    la limite de surveillances du système est atteinte.
+    """
+
+    name = "inotify"
+
+    def __init__(self, folder, exclude=None):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify n'est disponible que sous Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.folder = folder
+        self.exclude = exclude
+        self.overflowed = False
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._folders = {}  # descripteur de surveillance -> dossier
+        try:
+            self._watch_tree(folder)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), folder)
+        self._folders[wd] = folder
+
+    def _watch_tree(self, folder):
+        """Surveille un dossier et ses sous-dossiers ; renvoie les fichiers qu'ils contiennent déjà"""
+        if self.exclude and is_inside(folder, self.exclude):
+            return set()
+        self._watch(folder)
+        files = set()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            return files
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    files |= self._watch_tree(entry.path)
+                elif entry.is_file():
+                    files.add(entry.path)
+            except FileNotFoundError:
+                continue
+        return files
+
+    def wait(self, timeout):
+        """Attend au plus `timeout` secondes et renvoie les fichiers changés
+
+        Si la file d'événements du noyau a débordé, `overflowed` passe à
+        True : des changements ont pu être perdus.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                folder = self._folders.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Les fichiers arrivés avant la surveillance du dossier comptent aussi
+                        try:
+                            changed |= self._watch_tree(path)
+                        except OSError:
+                            self.overflowed = True
+                elif not (self.exclude and is_inside(path, self.exclude)):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(folder, exclude=None, backend="auto", poll_interval=POLL_INTERVAL_SECONDS):
+    """Surveillance du dossier : inotify si possible, parcours périodiques sinon"""
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(folder, exclude)
+        except (OSError, AttributeError):
+            if backend == "inotify":
+                raise
+    return PollingWatcher(folder, exclude, poll_interval)
+
+
+class WatchService:
+    """Conversion continue d'un dossier surveillé
+
+    Les conversions sont incrémentales et partagent les mêmes processus de
+    travail du début à la fin, pour qu'une nouvelle photo soit convertie
+    sans attendre le démarrage d'un pool.
+    """
+
+    def __init__(self, options, debounce=DEBOUNCE_SECONDS, backend="auto",
+                 poll_interval=POLL_INTERVAL_SECONDS, on_event=None):
+        self.options = dataclasses.replace(options, incremental=True)
+        # Dossier de sortie figé : toutes les conversions écrivent au même endroit
+        self.options.output_folder = resolve_output_folder(self.options)
+        self.input_folder = os.path.abspath(self.options.input_folder.strip())
+        self.debounce = debounce
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.on_event = on_event
+        self._pools = None
+
+    def emit(self, kind, **data):
+        if self.on_event is not None:
+            self.on_event(JobEvent(kind, data))
+
+    def convert(self, files=None):
+        """Convertit les fichiers donnés, ou tout le dossier, et renvoie l'événement final
+
+        Un Ctrl+C annule la conversion en cours puis interrompt la surveillance.
+        """
+        job = ConversionJob(self.options, pools=self._pools, files=files)
+        job.start()
+        interrupted = False
+        while True:
+            try:
+                event = job.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except KeyboardInterrupt:
+                job.cancel()
+                interrupted = True
+                continue
+            self.emit(event.kind, **event.data)
+            if event.kind in FINAL_EVENTS:
+                break
+        if interrupted:
+            raise KeyboardInterrupt
+        return event
+
+    def _ready_files(self, pending, now):
+        """Fichiers restés inchangés pendant le délai d'attente, retirés de `pending`"""
+        ready = []
+        for path, (changed_at, signature) in list(pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            try:
+                scanned = scanned_file(path, self.input_folder)
+            except OSError:
+                del pending[path]  # supprimé ou renommé entre-temps
+                continue
+            if (scanned.size, scanned.mtime_ns) == signature:
+                ready.append(scanned)
+                del pending[path]
+            else:
+                pending[path] = (now, (scanned.size, scanned.mtime_ns))
+        return ready
+
+    def run(self):
+        """Surveille le dossier jusqu'à un Ctrl+C ou un SIGTERM"""
+        output_folder = os.path.abspath(self.options.output_folder)
+        watcher = create_watcher(self.input_folder, exclude=output_folder,
+                                 backend=self.backend, poll_interval=self.poll_interval)
+        self._pools = WorkerPools(self.options.workers, self.options.pool)
+        try:
+            self.emit("watching", input_folder=self.input_folder, output_folder=output_folder,
+                      backend=watcher.name)
+            # Rattrape les changements survenus pendant l'arrêt de la surveillance
+            self.convert()
+            pending = {}  # chemin -> (date du dernier changement, (taille, date de modification))
+            while True:
+                timeout = self.debounce if pending else IDLE_WAIT_SECONDS
+                changed = watcher.wait(timeout)
+                now = time.monotonic()
+                for path in changed:
+                    if is_temporary(os.path.basename(path)):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    pending[path] = (now, (stat.st_size, stat.st_mtime_ns))
+
+                if watcher.overflowed:
+                    # Des événements ont été perdus : un parcours complet les rattrape
+                    watcher.overflowed = False
+                    pending.clear()
+                    self.convert()
+                    continue
+
+                ready = self._ready_files(pending, now)
+                if ready:
+                    ready.sort(key=lambda scanned: scanned.path)
+                    self.emit("changes", count=len(ready))
+                    self.convert(ready)
+        finally:
+            watcher.close()
+            self._pools.shutdown(cancel=True)
+            self._pools = None
+
+
+def build_parser():
+    parser = cli.build_parser()
+    parser.prog = "python -m heiconverter.watch"
+    parser.description = ("Surveille un dossier et convertit en continu les fichiers nouveaux "
+                          "ou modifiés (conversion toujours incrémentale).")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, metavar="SECONDS",
+                        help="délai sans changement avant de traiter un fichier, pour ne pas "
+                             f"convertir une copie en cours (par défaut : {DEBOUNCE_SECONDS})")
+    parser.add_argument("--backend", choices=WATCH_BACKENDS, default="auto",
+                        help="inotify (Linux) ou parcours périodiques (par défaut : auto)")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS, metavar="SECONDS",
+                        help=f"intervalle entre deux parcours en mode poll (par défaut : {POLL_INTERVAL_SECONDS})")
+    return parser
+
+
+_main_pid = None  # processus qui a installé le gestionnaire de SIGTERM
+
+
+def _terminate(signum, frame):
+    # Un processus créé par fork hérite du gestionnaire : seul le principal s'arrête ainsi
+    if os.getpid() == _main_pid:
+        raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.incremental = True
+    cli.check_args(parser, args)
+    if args.debounce < 0 or args.poll_interval <= 0:
+        parser.error("--debounce et --poll-interval doivent être positifs")
+    if args.plan or args.dry_run or args.retry_failed:
+        parser.error("--plan, --dry-run et --retry-failed ne s'appliquent pas à la surveillance d'un dossier")
+
+    # Arrêt propre aussi quand le service est arrêté par le système
+    global _main_pid
+    _main_pid = os.getpid()
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        service = WatchService(cli.options_from_args(args), debounce=args.debounce,
+                               backend=args.backend, poll_interval=args.poll_interval,
+                               on_event=cli.print_event)
+        service.run()
+    except ValueError as e:
+        print(json.dumps({'event': 'error', 'message': str(e)}, ensure_ascii=False), flush=True)
+        return 2
+    except OSError as e:
+        print(json.dumps({'event': 'error', 'message': str(e)}, ensure_ascii=False), flush=True)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()
+    sys.exit(main())
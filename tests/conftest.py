@@ -0,0 +1,30 @@
+"""Images de test fabriquées en mémoire"""
+import io
+
+import pytest
+from PIL import Image
+
+
+def image_bytes(format_name, color="blue", size=(16, 16)):
+    """Octets d'une petite image unie dans le format demandé (JPEG, PNG, HEIF...)"""
+    if format_name == "HEIF":
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=format_name)
+    return buffer.getvalue()
+
+
+# En-tête HEIC valide suivi d'un contenu illisible : aiguillé vers la
+# conversion, puis en échec au décodage
+BROKEN_HEIC = b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic" + b"\x00" * 64
+
+
+@pytest.fixture
+def heic_bytes():
+    return image_bytes("HEIF")
+
+
+@pytest.fixture
+def jpeg_bytes():
+    return image_bytes("JPEG", color="red")
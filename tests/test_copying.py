@@ -0,0 +1,62 @@
+"""Copie atomique et repli sur les modes de copie plus simples"""
+import os
+
+import pytest
+
+from heiconverter import copying
+from heiconverter.copying import COPY_MODES, TEMP_SUFFIX, copy_file, write_file
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "video.mov"
+    path.write_bytes(b"donnees" * 1000)
+    return path
+
+
+@pytest.mark.parametrize("mode", [mode for mode in COPY_MODES if mode != "skip"])
+def test_every_mode_produces_the_same_file(tmp_path, source, mode):
+    destination = tmp_path / f"copie-{mode}.mov"
+    used = copy_file(str(source), str(destination), mode)
+    assert used in copying.FALLBACKS[mode]
+    assert destination.read_bytes() == source.read_bytes()
+    assert not os.path.exists(str(destination) + TEMP_SUFFIX)
+
+
+def test_skip_copies_nothing(tmp_path, source):
+    assert copy_file(str(source), str(tmp_path / "copie.mov"), "skip") == "skip"
+    assert not (tmp_path / "copie.mov").exists()
+
+
+def test_falls_back_to_next_mode(tmp_path, source, monkeypatch):
+    def unsupported(src, dst):
+        raise OSError(18, "Lien impossible entre deux disques")  # EXDEV
+
+    monkeypatch.setitem(copying.METHODS, "hardlink", unsupported)
+    monkeypatch.setitem(copying.METHODS, "reflink", unsupported)
+    destination = tmp_path / "copie.mov"
+    assert copy_file(str(source), str(destination), "hardlink") == "fast"
+    assert destination.read_bytes() == source.read_bytes()
+
+
+def test_failed_copy_leaves_nothing(tmp_path, source, monkeypatch):
+    def half_written(src, dst):
+        with open(dst, 'wb') as f:
+            f.write(b"tronque")
+        raise OSError(28, "Plus de place")  # ENOSPC
+
+    monkeypatch.setitem(copying.METHODS, "copy", half_written)
+    destination = tmp_path / "copie.mov"
+    destination.write_bytes(b"ancienne version")
+    with pytest.raises(OSError):
+        copy_file(str(source), str(destination), "copy")
+    assert destination.read_bytes() == b"ancienne version"
+    assert not os.path.exists(str(destination) + TEMP_SUFFIX)
+
+
+def test_write_file_replaces_atomically(tmp_path):
+    path = tmp_path / "image.jpg"
+    write_file(str(path), b"premiere")
+    write_file(str(path), b"seconde")
+    assert path.read_bytes() == b"seconde"
+    assert os.listdir(tmp_path) == ["image.jpg"]
@@ -0,0 +1,42 @@
+"""Pools de processus : arrêt forcé d'une image bloquée, image qui fait tomber son processus"""
+import os
+import time
+from concurrent.futures import BrokenExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from heiconverter.engine import WorkerPools
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def pools():
+    pools = WorkerPools(1)
+    yield pools
+    pools.shutdown(cancel=True)
+
+
+def test_timed_out_worker_is_killed(pools):
+    processes = pools.processes
+    pid = processes.submit(os.getpid).result(timeout=30)
+    future = processes.submit(time.sleep, 60)
+    with pytest.raises(FutureTimeoutError):
+        future.result(timeout=0.5)
+
+    pools.replace_processes(processes, timed_out=True)
+    with pytest.raises(BrokenExecutor):
+        future.result(timeout=10)  # bien avant la fin de l'attente de 60 s
+    assert pools.was_stopped(processes)
+    assert pools.processes is not processes
+    assert pools.processes.submit(os.getpid).result(timeout=30) != pid
+
+
+def test_crash_is_attributed_to_the_isolated_image(pools):
+    with pytest.raises(BrokenExecutor):
+        pools.run_isolated(crash, timeout=30)
+    # Le processus dédié est remplacé pour l'image suivante
+    assert pools.run_isolated(abs, -3, timeout=30) == 3
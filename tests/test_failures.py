@@ -0,0 +1,119 @@
+"""Liste des fichiers en échec et relance des échecs"""
+import os
+from types import SimpleNamespace
+
+from heiconverter.engine import ConversionTask
+from heiconverter.failures import FailedFiles, failed_path, is_transient, retry_io
+from heiconverter.job import ConversionJob
+from heiconverter.options import ConversionOptions
+from heiconverter.scanner import scanned_file
+
+from tests.conftest import BROKEN_HEIC
+
+
+def failed_result(task, error="illisible"):
+    return SimpleNamespace(task=task, error=error)
+
+
+def test_round_trip(tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    failed = FailedFiles(str(output), str(tmp_path / "in"))
+    task = ConversionTask(str(tmp_path / "in" / "sub" / "a.heic"), str(output / "sub" / "a_heic.jpg"), "convert")
+    failed.add(failed_result(task))
+    failed.add(failed_result(task))
+    failed.save()
+
+    loaded = FailedFiles.load(str(output), str(tmp_path / "in"))
+    assert loaded.sources() == [task.source]
+    assert loaded.files["sub/a.heic"]["attempts"] == 2
+    assert loaded.destination(task) == task.destination
+    assert loaded.destination(ConversionTask(task.source, "", "reject")) is None
+
+
+def test_other_input_folder_is_ignored(tmp_path):
+    failed = FailedFiles(str(tmp_path), str(tmp_path / "in"))
+    failed.add(failed_result(ConversionTask(str(tmp_path / "in" / "a.heic"), str(tmp_path / "a.jpg"), "convert")))
+    failed.save()
+    assert len(FailedFiles.load(str(tmp_path), str(tmp_path / "other"))) == 0
+
+
+def test_empty_list_removes_file(tmp_path):
+    failed = FailedFiles(str(tmp_path), str(tmp_path / "in"))
+    source = str(tmp_path / "in" / "a.heic")
+    failed.add(failed_result(ConversionTask(source, str(tmp_path / "a.jpg"), "convert")))
+    failed.save()
+    failed.discard(source)
+    failed.save()
+    assert not os.path.exists(failed_path(str(tmp_path)))
+
+
+def test_retry_io_retries_transient_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError(16, "busy")  # EBUSY
+        return "ok"
+
+    assert retry_io(flaky, delay=0) == "ok"
+    assert len(calls) == 3
+    assert not is_transient(FileNotFoundError(2, "absent"))
+
+
+def run_job(options, files=None):
+    job = ConversionJob(options, files=files)
+    job.run()
+    events = []
+    while not job.events.empty():
+        events.append(job.events.get())
+    return {event.data["result"].task.source: event.data["result"]
+            for event in events if event.kind == "result"}
+
+
+def test_retry_failed_keeps_collision_rename(tmp_path, heic_bytes, jpeg_bytes):
+    """Un HEIC renommé pour ne pas remplacer une copie garde ce nom à la relance"""
+    input_folder, output_folder = tmp_path / "in", tmp_path / "out"
+    input_folder.mkdir()
+    jpeg, heic = input_folder / "i.jpg", input_folder / "i.heic"
+    jpeg.write_bytes(jpeg_bytes)
+    heic.write_bytes(BROKEN_HEIC)
+    options = ConversionOptions(str(input_folder), str(output_folder), workers=1)
+
+    # La copie réclame i.jpg en premier ; le HEIC illisible devient i_heic.jpg et échoue
+    results = run_job(options, [scanned_file(str(jpeg), str(input_folder)),
+                                scanned_file(str(heic), str(input_folder))])
+    assert results[str(jpeg)].ok
+    assert not results[str(heic)].ok
+    assert results[str(heic)].task.destination == str(output_folder / "i_heic.jpg")
+
+    heic.write_bytes(heic_bytes)
+    options.retry_failed = True
+    results = run_job(options)
+
+    assert list(results) == [str(heic)]
+    assert results[str(heic)].ok
+    assert (output_folder / "i.jpg").read_bytes() == jpeg_bytes
+    assert (output_folder / "i_heic.jpg").exists()
+    assert len(FailedFiles.load(str(output_folder), str(input_folder))) == 0
+
+
+def test_retry_failed_protects_existing_outputs(tmp_path, heic_bytes, jpeg_bytes):
+    """Sans nom enregistré (rejet puis réparation), les fichiers présents sont protégés"""
+    input_folder, output_folder = tmp_path / "in", tmp_path / "out"
+    input_folder.mkdir()
+    output_folder.mkdir()
+    heic = input_folder / "i.heic"
+    heic.write_bytes(heic_bytes)
+    (output_folder / "i.jpg").write_bytes(jpeg_bytes)
+    failed = FailedFiles(str(output_folder), str(input_folder))
+    failed.add(failed_result(ConversionTask(str(heic), str(output_folder / "i.heic"), "reject")))
+    failed.save()
+
+    options = ConversionOptions(str(input_folder), str(output_folder), workers=1, retry_failed=True)
+    results = run_job(options)
+
+    assert results[str(heic)].ok
+    assert (output_folder / "i.jpg").read_bytes() == jpeg_bytes
+    assert results[str(heic)].task.destination == str(output_folder / "i_heic.jpg")
@@ -0,0 +1,54 @@
+"""Aiguillage des fichiers d'après leur en-tête"""
+import struct
+
+import pytest
+
+from heiconverter.isobmff import describe_content, image_dimensions, sniff, sniff_file
+
+from tests.conftest import image_bytes
+
+
+def ftyp(major, *compatible):
+    brands = major + b"\x00\x00\x00\x00" + b"".join(compatible)
+    return struct.pack(">I", 8 + len(brands)) + b"ftyp" + brands
+
+
+@pytest.mark.parametrize("data, content", [
+    (b"", "empty"),
+    (b"\xff\xd8\xff\xe0" + b"\x00" * 16, "jpeg"),
+    (b"\x89PNG\r\n\x1a\n" + b"\x00" * 16, "png"),
+    (ftyp(b"heic", b"mif1", b"heic"), "heif"),
+    (ftyp(b"mif1", b"heix"), "heif"),
+    (ftyp(b"avif", b"mif1", b"miaf"), "avif"),
+    (ftyp(b"mif1", b"miaf"), "heif"),
+    (ftyp(b"isom", b"mp41"), "isobmff"),
+    (b"\x00\x00\x00\x18ftyp", None),  # boîte tronquée avant la marque
+    (b"texte sans signature", None),
+])
+def test_sniff(data, content):
+    assert sniff(data) == content
+
+
+def test_compatible_brands_are_bounded_by_box_size():
+    # La marque heic qui suit la boîte ftyp n'en fait pas partie
+    data = ftyp(b"isom", b"mp41") + b"heic" * 4
+    assert sniff(data) == "isobmff"
+
+
+def test_sniff_real_files(tmp_path, heic_bytes, jpeg_bytes):
+    heic, jpeg = tmp_path / "a.jpg", tmp_path / "b.heic"
+    heic.write_bytes(heic_bytes)
+    jpeg.write_bytes(jpeg_bytes)
+    assert sniff_file(str(heic)) == "heif"
+    assert sniff_file(str(jpeg)) == "jpeg"
+    assert sniff(image_bytes("PNG")) == "png"
+
+
+def test_image_dimensions():
+    assert image_dimensions(image_bytes("HEIF", size=(128, 96))) == (128, 96)
+    assert image_dimensions(b"\xff\xd8\xff") is None
+
+
+def test_describe_content():
+    assert describe_content("empty") == "fichier vide"
+    assert describe_content(None) == "en-tête non reconnu"
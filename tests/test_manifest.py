@@ -0,0 +1,122 @@
+"""Manifeste des conversions incrémentales"""
+import os
+
+import pytest
+
+from heiconverter.engine import ConversionTask
+from heiconverter.manifest import Manifest, belongs_to
+from heiconverter.scanner import scanned_file
+
+SETTINGS = {'format': "jpeg", 'quality': 90}
+
+
+@pytest.fixture
+def folders(tmp_path):
+    input_folder, output_folder = tmp_path / "in", tmp_path / "out"
+    input_folder.mkdir()
+    output_folder.mkdir()
+    return input_folder, output_folder
+
+
+def converted(input_folder, output_folder, name="a.heic", output="a.jpg", content=b"heic"):
+    """Fichier source et sortie déjà produite, avec la tâche correspondante"""
+    source = input_folder / name
+    source.write_bytes(content)
+    (output_folder / output).write_bytes(b"jpeg")
+    return ConversionTask(str(source), str(output_folder / output), "convert", content="heif")
+
+
+def fresh(task, destination=None):
+    """Tâche du passage suivant pour le même fichier"""
+    return ConversionTask(task.source, destination or task.destination, task.action)
+
+
+def test_unchanged_file_is_up_to_date(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    assert not manifest.check(task)
+    manifest.record(task)
+    manifest.save()
+
+    manifest = Manifest.load(str(output_folder), str(input_folder), SETTINGS)
+    assert manifest.check(fresh(task))
+    assert belongs_to(str(output_folder), str(input_folder))
+
+
+def test_other_destination_is_not_up_to_date(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    manifest.check(task)
+    manifest.record(task)
+    assert not manifest.check(fresh(task, str(output_folder / "a_heic.jpg")))
+
+
+def test_missing_output_or_modified_source(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    manifest.check(task)
+    manifest.record(task)
+
+    os.utime(task.source, ns=(0, 0))
+    assert not manifest.check(fresh(task))
+    os.remove(task.destination)
+    assert not manifest.check(fresh(task))
+
+
+def test_hash_check_accepts_touched_file(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    manifest.check(task, hash_check=True)
+    manifest.record(task)
+
+    os.utime(task.source, ns=(0, 0))
+    assert manifest.check(fresh(task), hash_check=True)
+
+
+def test_other_settings_forget_conversions(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    manifest.check(task)
+    manifest.record(task)
+    manifest.save()
+
+    manifest = Manifest.load(str(output_folder), str(input_folder), dict(SETTINGS, quality=50))
+    assert not manifest.check(fresh(task))
+
+
+def test_prune_removes_outputs_of_deleted_sources(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    kept = converted(input_folder, output_folder)
+    deleted = converted(input_folder, output_folder, "b.heic", "b.jpg")
+    (output_folder / "b_web.jpg").write_bytes(b"jpeg")
+    for task in (kept, deleted):
+        manifest.check(task)
+        manifest.record(task, [str(output_folder / "b_web.jpg")] if task is deleted else ())
+    manifest.save()
+
+    os.remove(deleted.source)
+    manifest = Manifest.load(str(output_folder), str(input_folder), SETTINGS)
+    manifest.check(fresh(kept))
+    assert manifest.prune() == 1
+    assert sorted(os.listdir(output_folder)) == [".heiconverter-manifest.json", "a.jpg"]
+
+
+def test_known_route_and_reserved_names(folders):
+    input_folder, output_folder = folders
+    manifest = Manifest(str(output_folder), str(input_folder), SETTINGS)
+    task = converted(input_folder, output_folder)
+    manifest.check(task)
+    manifest.record(task)
+
+    assert manifest.known_route(scanned_file(task.source, str(input_folder))) == ("convert", "heif")
+    other = str(input_folder / "a.jpg")
+    assert manifest.reserved(str(output_folder / "A.JPG"), other)
+    assert not manifest.reserved(task.destination, task.source)
+    os.remove(task.source)
+    assert not manifest.reserved(task.destination, other)
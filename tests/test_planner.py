@@ -0,0 +1,74 @@
+"""Résolution des collisions de noms"""
+import os
+
+from heiconverter.engine import ConversionTask, OutputSettings
+from heiconverter.planner import collision_destination, planned_outputs, resolve_collisions
+from heiconverter.sizes import parse_sizes
+
+
+def task(source, destination, action="convert"):
+    return ConversionTask(os.path.join("in", source), os.path.join("out", destination), action)
+
+
+def resolve(tasks, settings=None, reserved=None):
+    collisions = []
+    resolved = list(resolve_collisions(tasks, settings or OutputSettings(),
+                                       lambda task, previous: collisions.append((task.source, previous)),
+                                       reserved))
+    return [os.path.basename(task.destination) for task in resolved], collisions
+
+
+def test_later_file_is_renamed():
+    names, collisions = resolve([task("IMG_1.heic", "IMG_1.jpg"), task("IMG_1.jpg", "IMG_1.jpg", "copy")])
+    assert names == ["IMG_1.jpg", "IMG_1_jpg.jpg"]
+    assert collisions == [(os.path.join("in", "IMG_1.jpg"), os.path.join("out", "IMG_1.jpg"))]
+
+
+def test_names_are_compared_without_case():
+    names, _ = resolve([task("IMG_1.heic", "IMG_1.jpg"), task("IMG_1.HEIC", "IMG_1.jpg")])
+    assert names == ["IMG_1.jpg", "IMG_1_HEIC.jpg"]
+
+
+def test_counter_until_name_is_free():
+    names, _ = resolve([
+        task("IMG_1_heic.jpg", "IMG_1_heic.jpg", "copy"),
+        task("IMG_1.jpg", "IMG_1.jpg", "copy"),
+        task("IMG_1.heic", "IMG_1.jpg"),
+        task("IMG_1.HEIC", "IMG_1.jpg"),
+    ])
+    # IMG_1_HEIC_2.jpg est déjà pris, à la casse près
+    assert names == ["IMG_1_heic.jpg", "IMG_1.jpg", "IMG_1_heic_2.jpg", "IMG_1_HEIC_3.jpg"]
+
+
+def test_other_folders_do_not_collide():
+    names, collisions = resolve([task("a/IMG_1.heic", "a/IMG_1.jpg"), task("b/IMG_1.heic", "b/IMG_1.jpg")])
+    assert names == ["IMG_1.jpg", "IMG_1.jpg"]
+    assert collisions == []
+
+
+def test_every_size_is_claimed():
+    settings = OutputSettings(sizes=parse_sizes(("full", "web")))
+    first, second = task("IMG_1.heic", "IMG_1.jpg"), task("IMG_1_web.jpg", "IMG_1_web.jpg", "copy")
+    names, _ = resolve([first, second], settings)
+    assert len(planned_outputs(first, settings)) == 2
+    assert names[1] != "IMG_1_web.jpg"
+
+
+def test_rejected_files_claim_nothing():
+    names, collisions = resolve([task("IMG_1.heic", "IMG_1.heic", "reject"),
+                                 task("img_1.heic", "img_1.heic", "copy")])
+    assert names == ["IMG_1.heic", "img_1.heic"]
+    assert collisions == []
+
+
+def test_reserved_names():
+    names, _ = resolve([task("IMG_1.heic", "IMG_1.jpg")],
+                       reserved=lambda path, source: os.path.basename(path) == "IMG_1.jpg")
+    assert names == ["IMG_1_heic.jpg"]
+
+
+def test_collision_destination():
+    taken = {"IMG_1_heic.jpg", "IMG_1_heic_2.jpg"}
+    destination = collision_destination(task("IMG_1.heic", "IMG_1.jpg"), OutputSettings(),
+                                        lambda path: os.path.basename(path) in taken)
+    assert os.path.basename(destination) == "IMG_1_heic_3.jpg"
@@ -0,0 +1,61 @@
+"""Parcours du dossier d'entrée"""
+import os
+
+from heiconverter.scanner import is_inside, scan_files, scanned_file
+
+
+def make_tree(root, paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_bytes(b"x" * len(path))
+
+
+def relative(files):
+    return [os.path.join(file.relative_dir, file.name) for file in files]
+
+
+def test_files_of_a_folder_come_before_its_subfolders(tmp_path):
+    make_tree(tmp_path, ["a.heic", "b.jpg", "sub/c.heic", "sub/deep/d.heic", "other/e.heic"])
+    files = list(scan_files(str(tmp_path)))
+    paths = relative(files)
+    assert sorted(paths) == sorted([os.path.join(".", "a.heic"), os.path.join(".", "b.jpg"),
+                                    os.path.join("sub", "c.heic"),
+                                    os.path.join("sub", "deep", "d.heic"),
+                                    os.path.join("other", "e.heic")])
+    assert {paths[0], paths[1]} == {os.path.join(".", "a.heic"), os.path.join(".", "b.jpg")}
+    assert paths.index(os.path.join("sub", "c.heic")) < paths.index(os.path.join("sub", "deep", "d.heic"))
+    by_name = {file.name: file for file in files}
+    assert by_name["a.heic"].size == len("a.heic")
+    assert by_name["a.heic"].mtime_ns == os.stat(tmp_path / "a.heic").st_mtime_ns
+
+
+def test_excluded_output_folder(tmp_path):
+    make_tree(tmp_path, ["a.heic", "out/a.jpg"])
+    assert relative(scan_files(str(tmp_path), exclude=str(tmp_path / "out"))) == [os.path.join(".", "a.heic")]
+
+
+def test_symlinked_folders_are_not_followed(tmp_path):
+    make_tree(tmp_path, ["real/a.heic"])
+    try:
+        os.symlink(tmp_path / "real", tmp_path / "link", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        return  # liens symboliques non autorisés (Windows sans privilège)
+    assert relative(scan_files(str(tmp_path))) == [os.path.join("real", "a.heic")]
+
+
+def test_missing_folder_yields_nothing(tmp_path):
+    assert list(scan_files(str(tmp_path / "absent"))) == []
+
+
+def test_scanned_file(tmp_path):
+    make_tree(tmp_path, ["sub/a.heic"])
+    file = scanned_file(str(tmp_path / "sub" / "a.heic"), str(tmp_path))
+    assert (file.relative_dir, file.name, file.size) == ("sub", "a.heic", len("sub/a.heic"))
+
+
+def test_is_inside():
+    folder = os.path.join(os.sep, "photos")
+    assert is_inside(folder, folder)
+    assert is_inside(os.path.join(folder, "out"), folder)
+    assert not is_inside(folder + "-out", folder)